@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Native protocol compression benchmark.
+
+Rows of representative tables are serialized into INSERT data blocks exactly the way clickhouse_driver sends them
+to ClickHouse, with each available compression method. Bytes which would go over the wire and CPU time spent
+are reported, no ClickHouse server is needed.
+
+Compression requires optional packages:
+    pip install clickhouse-cityhash lz4 zstd
+
+Usage:
+    python benchmarks/ch_compression.py [rows number] [compress block size]
+"""
+
+import datetime
+import random
+import sys
+import time
+
+from decimal import Decimal
+from types import SimpleNamespace
+
+from clickhouse_driver import defines
+from clickhouse_driver.block import RowOrientedBlock
+from clickhouse_driver.bufferedwriter import BufferedSocketWriter
+from clickhouse_driver.client import Client
+from clickhouse_driver.context import Context
+from clickhouse_driver.streams.native import BlockOutputStream
+
+COMPRESSIONS = [None, 'lz4', 'lz4hc', 'zstd']
+
+
+class CountingSocket(object):
+    """Socket which counts bytes sent"""
+
+    sent = 0
+
+    def sendall(self, data):
+        self.sent += len(data)
+
+
+def orders(rows_num):
+    """Narrow table of numbers, dates and low-cardinality strings"""
+    columns = [
+        ('id', 'UInt64'),
+        ('customer_id', 'UInt32'),
+        ('status', 'String'),
+        ('amount', 'Decimal(12, 2)'),
+        ('created_at', 'DateTime'),
+        ('tb_upd', 'DateTime64(3)'),
+        ('operation', 'UInt8'),
+    ]
+    started = datetime.datetime(2020, 1, 1)
+    statuses = ['new', 'paid', 'shipped', 'delivered', 'cancelled']
+    rows = [
+        (
+            i,
+            random.randint(1, 100000),
+            random.choice(statuses),
+            Decimal(random.randint(100, 10000000)) / 100,
+            started + datetime.timedelta(seconds=i),
+            started + datetime.timedelta(seconds=i),
+            0,
+        )
+        for i in range(rows_num)
+    ]
+    return columns, rows
+
+
+def events(rows_num):
+    """Wide table with free text and nullable columns"""
+    columns = [
+        ('id', 'UInt64'),
+        ('session', 'String'),
+        ('url', 'String'),
+        ('user_agent', 'String'),
+        ('referrer', 'Nullable(String)'),
+        ('duration', 'Float64'),
+        ('ts', 'DateTime'),
+    ]
+    started = datetime.datetime(2020, 1, 1)
+    agents = ['Mozilla/5.0 (X11; Linux x86_64) Chrome/{}.0'.format(v) for v in range(60, 90)]
+    rows = [
+        (
+            i,
+            '%032x' % random.getrandbits(128),
+            'https://example.com/catalog/{}/item/{}?page={}'.format(i % 50, random.randint(1, 10 ** 6), i % 7),
+            random.choice(agents),
+            None if i % 3 else 'https://search.example.org/?q={}'.format(random.randint(1, 1000)),
+            random.random() * 100,
+            started + datetime.timedelta(seconds=i // 10),
+        )
+        for i in range(rows_num)
+    ]
+    return columns, rows
+
+
+def context():
+    """Context of a connection to ClickHouse server of the same revision as driver"""
+    ctx = Context()
+    ctx.settings = {}
+    ctx.client_settings = Client('localhost').client_settings
+    ctx.server_info = SimpleNamespace(used_revision=defines.CLIENT_REVISION, get_timezone=lambda: 'UTC')
+    return ctx
+
+
+def output_stream(compression, compress_block_size, fout, ctx):
+    if compression is None:
+        return BlockOutputStream(fout, ctx)
+
+    # compressed stream requires optional packages
+    from clickhouse_driver.compression import get_compressor_cls
+    from clickhouse_driver.streams.compressed import CompressedBlockOutputStream
+    return CompressedBlockOutputStream(get_compressor_cls(compression), compress_block_size, fout, ctx)
+
+
+def measure(columns, rows, compression, compress_block_size, ctx):
+    """
+    :return: (bytes sent, CPU sec)
+    """
+    socket = CountingSocket()
+    fout = BufferedSocketWriter(socket, defines.BUFFER_SIZE)
+    stream = output_stream(compression, compress_block_size, fout, ctx)
+
+    started = time.process_time()
+    # rows are sent in blocks of insert_block_size rows, as driver does
+    for i in range(0, len(rows), defines.DEFAULT_INSERT_BLOCK_SIZE):
+        stream.write(RowOrientedBlock(columns, rows[i:i + defines.DEFAULT_INSERT_BLOCK_SIZE], types_check=False))
+    fout.flush()
+    return socket.sent, time.process_time() - started
+
+
+def main():
+    rows_num = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    compress_block_size = int(sys.argv[2]) if len(sys.argv) > 2 else defines.DEFAULT_COMPRESS_BLOCK_SIZE
+
+    random.seed(0)
+    ctx = context()
+    print('rows={} compress_block_size={}'.format(rows_num, compress_block_size))
+    print('{:<8} {:<6} {:>12} {:>7} {:>9}'.format('table', 'codec', 'bytes', 'ratio', 'cpu sec'))
+    for table in (orders, events):
+        columns, rows = table(rows_num)
+        raw = None
+        for compression in COMPRESSIONS:
+            try:
+                sent, cpu = measure(columns, rows, compression, compress_block_size, ctx)
+            except Exception as ex:
+                print('{:<8} {:<6} not available: {}'.format(table.__name__, str(compression), ex))
+                continue
+            raw = raw or sent
+            print('{:<8} {:<6} {:>12} {:>7.2f} {:>9.3f}'.format(
+                table.__name__, str(compression), sent, raw / sent, cpu))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Event overhead benchmark.
+
+Event is compared with the former Event class, which built its rows iterator as an attribute
+and stored the iterator in the event. Measured are:
+    creation of per-row events as WriteRowsEvent.EachRow dispatch does, with and without per-row timestamp
+    memory held by one event with one row
+    iteration over rows of an event
+    pickled size, as event is stored in write-ahead log
+
+Usage:
+    python benchmarks/event.py [rows number]
+"""
+
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class LegacyEvent(object):
+    """Event as it was before attributes were slotted"""
+
+    ts = None
+    pymysqlreplication_event = None
+    row = None
+    rows = None
+    schema = None
+    table = None
+    log_file = None
+    source = None
+    wal_position = None
+    primary_key = None
+    filename = None
+    fieldnames = None
+    query = None
+    alter = None
+    _iter = None
+
+    def __iter__(self):
+        if self.pymysqlreplication_event is not None:
+            self._iter = iter(self.pymysqlreplication_event.rows)
+        elif self.row is not None:
+            self._iter = iter([self.row])
+        else:
+            self._iter = iter(self.rows)
+        return self
+
+    def __next__(self):
+        item = next(self._iter)
+        if self.pymysqlreplication_event is not None:
+            if 'after_values' in item:
+                return item['after_values']
+            else:
+                return item['values']
+        else:
+            return item
+
+
+def each_row(event_class, rows, ts_per_row):
+    """Build one event per row"""
+    events = []
+    ts = datetime.utcnow()
+    for row in rows:
+        event = event_class()
+        event.ts = datetime.utcnow() if ts_per_row else ts
+        event.schema = 'db'
+        event.table = 'table'
+        event.row = row
+        events.append(event)
+    return events
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def memory(event_class, rows):
+    """Bytes allocated per event, rows themselves are allocated beforehand"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    events = each_row(event_class, rows, False)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(events)
+
+
+def iterate(events):
+    num = 0
+    for event in events:
+        for _ in event:
+            num += 1
+    return num
+
+
+def main():
+    # package is importable once its root is in sys.path
+    from clickhouse_mysql.event.event import Event
+
+    rows_num = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    rows = [{'id': i, 'a': i * 2, 'b': 'value'} for i in range(rows_num)]
+
+    print('{} rows'.format(rows_num))
+    print('{:<12} {:>18} {:>18} {:>12} {:>12} {:>10}'.format(
+        'class', 'each row, ts/row', 'each row, ts/event', 'iterate', 'bytes/event', 'pickled'))
+
+    for name, event_class in (('LegacyEvent', LegacyEvent), ('Event', Event)):
+        ts_per_row, _ = timed(each_row, event_class, rows, True)
+        ts_per_event, events = timed(each_row, event_class, rows, False)
+        iteration, _ = timed(iterate, events)
+        print('{:<12} {:>16.1f}ms {:>16.1f}ms {:>10.1f}ms {:>12.1f} {:>10}'.format(
+            name,
+            ts_per_row * 1000,
+            ts_per_event * 1000,
+            iteration * 1000,
+            memory(event_class, rows),
+            len(pickle.dumps(events[0], protocol=pickle.HIGHEST_PROTOCOL)),
+        ))
+
+
+if __name__ == '__main__':
+    main()
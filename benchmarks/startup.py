@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Startup time benchmark.
+
+Each scenario is run in a fresh interpreter several times, median wall time is reported along with
+third-party modules the scenario has loaded. 'eager' scenario loads all readers, writers and db clients,
+as every command did before they were imported on demand, and is the reference to compare with.
+
+Requires package dependencies installed, no MySQL or ClickHouse server is needed.
+
+Usage:
+    python benchmarks/startup.py [runs number]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ['MySQLdb', 'pymysqlreplication', 'clickhouse_driver', 'requests', 'requests_toolbelt', 'pkg_resources']
+
+# print heavy modules loaded, at exit - --help exits from inside of argparse
+REPORT = """
+import atexit, sys
+atexit.register(lambda: print('loaded:' + ','.join(m for m in {modules} if m in sys.modules)))
+""".format(modules=HEAVY_MODULES)
+
+SCENARIOS = [
+    ('python', 'pass'),
+    ('import', 'import clickhouse_mysql'),
+    ('--help', "import sys; sys.argv = ['clickhouse-mysql', '--help']; import clickhouse_mysql; clickhouse_mysql.main()"),
+    ('eager', '; '.join([
+        'import clickhouse_mysql',
+        'import clickhouse_mysql.reader.mysqlreader',
+        'import clickhouse_mysql.reader.csvreader',
+        'import clickhouse_mysql.reader.multireader',
+        'import clickhouse_mysql.writer.chwriter',
+        'import clickhouse_mysql.writer.csvwriter',
+        'import clickhouse_mysql.writer.tbcsvwriter',
+        'import clickhouse_mysql.writer.poolwriter',
+        'import clickhouse_mysql.writer.processwriter',
+        'import clickhouse_mysql.tablemigrator',
+        'import clickhouse_mysql.dbclient.chclient',
+        'import clickhouse_mysql.dbclient.chcluster',
+    ])),
+]
+
+
+def run(code):
+    """
+    Run code in a fresh interpreter
+    :param code: python code
+    :return: (seconds, loaded heavy modules)
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([root, os.environ.get('PYTHONPATH', '')]))
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', REPORT + code],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    duration = time.perf_counter() - start
+
+    loaded = ''
+    for line in result.stdout.splitlines():
+        if line.startswith('loaded:'):
+            loaded = line[len('loaded:'):]
+    if result.returncode != 0:
+        loaded = 'FAILED: ' + result.stderr.strip().splitlines()[-1]
+    return duration, loaded
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    print('{:<10} {:>10} {:>10}  {}'.format('scenario', 'median ms', 'min ms', 'loaded'))
+    for name, code in SCENARIOS:
+        durations = []
+        loaded = ''
+        for _ in range(runs):
+            duration, loaded = run(code)
+            durations.append(duration)
+        print('{:<10} {:>10.1f} {:>10.1f}  {}'.format(
+            name,
+            statistics.median(durations) * 1000,
+            min(durations) * 1000,
+            loaded or '-',
+        ))
+
+
+if __name__ == '__main__':
+    main()
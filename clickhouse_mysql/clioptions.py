@@ -96,22 +96,41 @@ class CLIOptions(Options):
 
         'tb_host': 'https://ui.tinybird.co',
         'tb_token': None,
+        'tb_upload_workers': 4,
 
         'config_file': '/etc/clickhouse-mysql/clickhouse-mysql.conf',
         'log_file': None,
         'log_level': None,
+        'trace_sample_rate': 0,
+        'trace_report_interval': 60,
+        'profile_duration': 30,
+        'profile_dir': None,
         'nice_pause': None,
         'dry': False,
         'daemon': False,
         'pid_file': '/tmp/reader.pid',
         'binlog_position_file': None,
+        'binlog_gtid_file': None,
         'mempool': False,
         'mempool_max_events_num': 100000,
         'mempool_max_rows_num': 100000,
         'mempool_max_flush_interval': 60,
+        'mempool_spill_threshold': None,
+        'mempool_spill_dir': None,
+        'mempool_wal_dir': None,
+        'mempool_wal_segment_size': 10000,
+        'mempool_wal_fsync': False,
+        'mempool_adaptive': False,
+        'mempool_min_events_num': 100,
+        'mempool_target_flush_latency': 1,
         'csvpool': False,
         'csvpool_file_path_prefix': '/tmp/csvpool_',
         'csvpool_keep_files': False,
+        'csvpool_ring_buffer_size': 0,
+        'csvpool_writers': 2,
+        'csvpool_part_size': 0,
+        'fanout': None,
+        'fanout_buffer_size': 1000,
         'create_table_sql_template': False,
         'create_table_sql': False,
         'with_create_database': False,
@@ -133,10 +152,17 @@ class CLIOptions(Options):
         'src_tables_where_clauses': None,
         'src_tables_prefixes': None,
         'src_wait': False,
+        'src_heartbeat': None,
         'src_resume': False,
         'src_binlog_file': None,
         'src_binlog_position': None,
+        'src_auto_position': False,
+        'src_gtid_set': None,
+        'src_decode_workers': 0,
+        'src_track_ddl': False,
         'src_file': None,
+        'src_file_batch_size': 10000,
+        'src_file_workers': 1,
 
         #
         # dst section
@@ -146,12 +172,21 @@ class CLIOptions(Options):
         'dst_port': 9000,
         'dst_user': 'default',
         'dst_password': '',
+        'dst_compression': None,
+        'dst_compress_block_size': None,
         'dst_schema': None,
         'dst_distribute': False,
         'dst_cluster': None,
         'dst_table': None,
         'dst_table_prefix': None,
         'dst_create_table': False,
+        'dst_alter_table': False,
+        'dst_insert_retries': 0,
+        'dst_insert_retry_backoff': 1,
+        'dst_insert_deduplicate': False,
+        'dst_dead_letter_file': None,
+        'dst_insert_into_shards': False,
+        'dst_sharding_key': None,
 
         #
         # converters section
@@ -160,6 +195,10 @@ class CLIOptions(Options):
         'column_skip': [],
         'ch_converter_file': None,
         'ch_converter_class': None,
+        'ch_precise_types': False,
+        'ch_advise_types': False,
+        'ch_advise_sample_rows': 10000,
+        'ch_advise_layout': False,
     }
 
     def options(self):
@@ -189,6 +228,13 @@ class CLIOptions(Options):
             help='Tinybird host'
         )
 
+        argparser.add_argument(
+            '--tb-upload-workers',
+            type=int,
+            default=self.default_options['tb_upload_workers'],
+            help='Number of CSV parts uploaded into Tinybird concurrently. Used with --csvpool-part-size. Ex.: 4'
+        )
+
         argparser.add_argument(
             '--config-file',
             type=str,
@@ -207,6 +253,33 @@ class CLIOptions(Options):
             default=self.default_options['log_level'],
             help='Log Level. Default - NOTSET'
         )
+        argparser.add_argument(
+            '--trace-sample-rate',
+            type=int,
+            default=self.default_options['trace_sample_rate'],
+            help='Trace each N-th binlog event through reader, pool and writers and log per-stage timings. '
+                 'Tracing can be switched on/off at runtime with SIGUSR2. Default - 0, tracing disabled. '
+                 'Ex.: 1000'
+        )
+        argparser.add_argument(
+            '--trace-report-interval',
+            type=int,
+            default=self.default_options['trace_report_interval'],
+            help='Log per-stage tracing timings each N seconds. Ex.: 60'
+        )
+        argparser.add_argument(
+            '--profile-duration',
+            type=int,
+            default=self.default_options['profile_duration'],
+            help='Profile running process for N seconds on SIGUSR1: stacks of all threads are sampled and written '
+                 'into --profile-dir along with per-stage timings. Second SIGUSR1 stops profiling earlier. Ex.: 30'
+        )
+        argparser.add_argument(
+            '--profile-dir',
+            type=str,
+            default=self.default_options['profile_dir'],
+            help='Dir to write profiles into. Default - temp dir. Ex.: /var/log/clickhouse-mysql'
+        )
         argparser.add_argument(
             '--nice-pause',
             type=int,
@@ -236,6 +309,13 @@ class CLIOptions(Options):
             default=self.default_options['binlog_position_file'],
             help='File to write binlog position to during bin log reading and to read position from on start'
         )
+        argparser.add_argument(
+            '--binlog-gtid-file',
+            type=str,
+            default=self.default_options['binlog_gtid_file'],
+            help='File to write executed GTID set to during bin log reading and to read GTID set from on start '
+                 'with --src-auto-position. Ex.: /tmp/clickhouse-mysql-binlog.gtid'
+        )
         argparser.add_argument(
             '--mempool',
             action='store_true',
@@ -259,6 +339,65 @@ class CLIOptions(Options):
             default=self.default_options['mempool_max_flush_interval'],
             help='Max seconds number between pool flushes'
         )
+        argparser.add_argument(
+            '--mempool-spill-threshold',
+            type=int,
+            default=self.default_options['mempool_spill_threshold'],
+            help='Max number of events to be kept in pool memory. When exceeded, buckets waiting for flush are '
+                 'spilled to disk. Buckets failed to flush are kept in pool and are flushed again in order when '
+                 'destination recovers. Default - not specified, do not spill. Ex.: 1000000'
+        )
+        argparser.add_argument(
+            '--mempool-spill-dir',
+            type=str,
+            default=self.default_options['mempool_spill_dir'],
+            help='Dir for buckets spilled to disk. Default - temp dir. Ex.: /var/lib/clickhouse-mysql/spill'
+        )
+        argparser.add_argument(
+            '--mempool-wal-dir',
+            type=str,
+            default=self.default_options['mempool_wal_dir'],
+            help='Dir for write-ahead log of pool. Events are written to the log before binlog position is moved '
+                 'forward and are removed from the log after they are flushed by writers, thus events kept in pool '
+                 'survive process crash and are replayed on start. See --mempool-wal-fsync for OS crash. '
+                 'Not supported with --csvpool (including csvpool --fanout destination) - CSV files are uploaded by '
+                 'background processes, pool does not know when events are uploaded. '
+                 'Default - not specified, no log. Ex.: /var/lib/clickhouse-mysql/wal'
+        )
+        argparser.add_argument(
+            '--mempool-wal-segment-size',
+            type=int,
+            default=self.default_options['mempool_wal_segment_size'],
+            help='Max number of events in one write-ahead log segment file. Ex.: 10000'
+        )
+        argparser.add_argument(
+            '--mempool-wal-fsync',
+            action='store_true',
+            help='fsync write-ahead log after each batch of events, thus events survive OS crash or power loss. '
+                 'Without it only completed segments are fsync-ed'
+        )
+        argparser.add_argument(
+            '--mempool-adaptive',
+            action='store_true',
+            default=self.default_options['mempool_adaptive'],
+            help='Adjust number of events pooled per table between --mempool-min-events-num and '
+                 '--mempool-max-events-num by flush latency: failed or slower than --mempool-target-flush-latency '
+                 'flush halves it, fast flush of full pool grows it. Applies to synchronous writers only - '
+                 'csvpool uploads in background processes, its latency and failures are not seen by pool, '
+                 'so csvpool always pools --mempool-max-events-num. Ex.: --mempool-adaptive'
+        )
+        argparser.add_argument(
+            '--mempool-min-events-num',
+            type=int,
+            default=self.default_options['mempool_min_events_num'],
+            help='Min events number to pool per table with --mempool-adaptive. Ex.: 100'
+        )
+        argparser.add_argument(
+            '--mempool-target-flush-latency',
+            type=float,
+            default=self.default_options['mempool_target_flush_latency'],
+            help='Seconds, max latency of pool flush with --mempool-adaptive. Ex.: 1.5'
+        )
         argparser.add_argument(
             '--csvpool',
             action='store_true',
@@ -276,6 +415,43 @@ class CLIOptions(Options):
             action='store_true',
             help='Keep CSV pool files. Useful for debugging'
         )
+        argparser.add_argument(
+            '--csvpool-ring-buffer-size',
+            type=int,
+            default=self.default_options['csvpool_ring_buffer_size'],
+            help='Size (in MB) of shared memory ring buffer to hand over events to long-living CSV writer processes. '
+                 'Default - 0, start new CSV writer process for each pool flush. Ex.: 64'
+        )
+        argparser.add_argument(
+            '--csvpool-writers',
+            type=int,
+            default=self.default_options['csvpool_writers'],
+            help='Number of long-living CSV writer processes. Used with --csvpool-ring-buffer-size. Ex.: 2'
+        )
+        argparser.add_argument(
+            '--csvpool-part-size',
+            type=int,
+            default=self.default_options['csvpool_part_size'],
+            help='Size (in MB) of CSV file part. CSV file reaching this size is continued in the next part, '
+                 'each part is uploaded in its own request. Default - 0, one file per pool flush. Ex.: 64'
+        )
+        argparser.add_argument(
+            '--fanout',
+            type=str,
+            default=self.default_options['fanout'],
+            help='Comma-separated list of destinations to write the same data into, binlog is read and decoded once. '
+                 'Destinations: clickhouse, csvpool, file. Each destination has its own pool with --mempool. '
+                 'Events queued for destinations survive crash with --mempool-wal-dir only. '
+                 'Failed destination stops reading, the rest of destinations are flushed. '
+                 'Ex.: clickhouse,csvpool'
+        )
+        argparser.add_argument(
+            '--fanout-buffer-size',
+            type=int,
+            default=self.default_options['fanout_buffer_size'],
+            help='Max number of batches queued per destination with --fanout. '
+                 'Reader waits for slow destination only when its queue is full. Ex.: 1000'
+        )
         argparser.add_argument(
             '--create-table-sql-template',
             action='store_true',
@@ -389,6 +565,15 @@ class CLIOptions(Options):
             action='store_true',
             help='Wait indefinitely for new records to come.'
         )
+        argparser.add_argument(
+            '--src-heartbeat',
+            type=int,
+            default=self.default_options['src_heartbeat'],
+            help='Keep binlog stream open and ask MySQL to send replication heartbeat each specified (in sec) '
+                 'period of binlog inactivity. Used with --src-wait. New events are received as soon as they are '
+                 'written to binlog instead of re-opening the stream each --nice-pause seconds, '
+                 'heartbeats trigger pool flushes. Ex.: 5'
+        )
         argparser.add_argument(
             '--src-resume',
             action='store_true',
@@ -408,11 +593,57 @@ class CLIOptions(Options):
             help='Binlog position to be used when reading from src. Related to `binlog-position-file`. '
                  'Ex.: 5703'
         )
+        argparser.add_argument(
+            '--src-auto-position',
+            action='store_true',
+            help='Position binlog stream by GTID set instead of binlog file and position. '
+                 'GTID set is read from `binlog-gtid-file` or specified with `src-gtid-set`. '
+                 'Reading can be resumed from another server of replication topology, ex.: after failover'
+        )
+        argparser.add_argument(
+            '--src-gtid-set',
+            type=str,
+            default=self.default_options['src_gtid_set'],
+            help='GTID set of transactions already read from src. Used with `src-auto-position`, '
+                 'overrides GTID set from `binlog-gtid-file`. '
+                 'Ex.: 3e11fa47-71ca-11e1-9e33-c80aa9429562:1-5'
+        )
+        argparser.add_argument(
+            '--src-decode-workers',
+            type=int,
+            default=self.default_options['src_decode_workers'],
+            help='Number of worker processes to decode binlog rows in. '
+                 'Rows events are distributed between workers by table, binlog order is preserved. '
+                 '0 means decode rows in the reader process. '
+                 'Ex.: 4'
+        )
+        argparser.add_argument(
+            '--src-track-ddl',
+            action='store_true',
+            default=self.default_options['src_track_ddl'],
+            help='Track ALTER TABLE statements of listened tables: rows following ALTER are decoded with new table schema '
+                 'and rows read before ALTER are written before it. Ex.: --src-track-ddl'
+        )
         argparser.add_argument(
             '--src-file',
             type=str,
             default=self.default_options['src_file'],
-            help='Source file to read data from. CSV'
+            help='Source CSV file(s) to read data from - file, dir of *.csv files or glob, '
+                 'comma-separated list is accepted. Each file is read into table named after the file. '
+                 'Ex.: /data/dump/*.csv'
+        )
+        argparser.add_argument(
+            '--src-file-batch-size',
+            type=int,
+            default=self.default_options['src_file_batch_size'],
+            help='Max number of rows read from CSV file(s) to be sent in one event. Ex.: 50000'
+        )
+        argparser.add_argument(
+            '--src-file-workers',
+            type=int,
+            default=self.default_options['src_file_workers'],
+            help='Number of processes to parse CSV files in parallel, each file is parsed by one process. '
+                 'Ex.: 4'
         )
 
         #
@@ -448,6 +679,21 @@ class CLIOptions(Options):
             default=self.default_options['dst_password'],
             help='Password to be used when writing to dst. Ex.: qwerty'
         )
+        argparser.add_argument(
+            '--dst-compression',
+            type=str,
+            choices=['lz4', 'lz4hc', 'zstd'],
+            default=self.default_options['dst_compression'],
+            help='Compress data sent to ClickHouse with native protocol compression. '
+                 'Requires clickhouse-cityhash and lz4 or zstd packages. Ex.: zstd'
+        )
+        argparser.add_argument(
+            '--dst-compress-block-size',
+            type=int,
+            default=self.default_options['dst_compress_block_size'],
+            help='Size of compressed block sent to ClickHouse, bytes. Not specified - driver default (1MB). '
+                 'Ex.: 4194304'
+        )
         argparser.add_argument(
             '--dst-schema',
             type=str,
@@ -486,6 +732,61 @@ class CLIOptions(Options):
             action='store_true',
             help='Prepare and run CREATE TABLE SQL statement(s).'
         )
+        argparser.add_argument(
+            '--dst-alter-table',
+            action='store_true',
+            default=self.default_options['dst_alter_table'],
+            help='Apply ALTER TABLE statements of listened tables to ClickHouse tables: columns are added, dropped, '
+                 'modified and renamed. ALTER failed in ClickHouse (ex.: of sort key column) stops reading, '
+                 'binlog position is left before the statement. Implies --src-track-ddl. Ex.: --dst-alter-table'
+        )
+        argparser.add_argument(
+            '--dst-insert-retries',
+            type=int,
+            default=self.default_options['dst_insert_retries'],
+            help='Number of retries of INSERT into ClickHouse failed because of connection problems or server '
+                 'overload. Pause between retries is doubled each time. 0 - do not retry. '
+                 'INSERT still failing after retries (or failed with not retryable error) is an error, not just '
+                 'a log record: with --mempool the batch is kept in pool and written again later, without --mempool '
+                 'reader exits with code 1 in non-blocking mode and logs the error in blocking mode. Ex.: 5'
+        )
+        argparser.add_argument(
+            '--dst-insert-retry-backoff',
+            type=float,
+            default=self.default_options['dst_insert_retry_backoff'],
+            help='Pause before the first retry of INSERT into ClickHouse, sec. Ex.: 0.5'
+        )
+        argparser.add_argument(
+            '--dst-insert-deduplicate',
+            action='store_true',
+            default=self.default_options['dst_insert_deduplicate'],
+            help='Attach insert_deduplication_token built from table and binlog positions to each INSERT, '
+                 'so retried and replayed batches are deduplicated by ClickHouse. Requires ClickHouse 22.2+ '
+                 'and Replicated*MergeTree tables (or non_replicated_deduplication_window for MergeTree). '
+                 'Ex.: --dst-insert-deduplicate'
+        )
+        argparser.add_argument(
+            '--dst-dead-letter-file',
+            type=str,
+            default=self.default_options['dst_dead_letter_file'],
+            help='File to append rows, which ClickHouse refuses to insert, to - one JSON per line along with '
+                 'binlog position of the row. Batch with bad rows is split until bad rows are isolated, '
+                 'the rest of rows are inserted. Not specified - bad rows are logged. Ex.: /var/log/dead-letter.json'
+        )
+        argparser.add_argument(
+            '--dst-insert-into-shards',
+            action='store_true',
+            default=self.default_options['dst_insert_into_shards'],
+            help='Insert rows directly into local tables of the shards of --dst-cluster instead of Distributed table. '
+                 'Cluster topology is read from system.clusters. Ex.: --dst-insert-into-shards'
+        )
+        argparser.add_argument(
+            '--dst-sharding-key',
+            type=str,
+            default=self.default_options['dst_sharding_key'],
+            help='Comma-separated list of columns to spread rows over shards by, used with --dst-insert-into-shards. '
+                 'Not specified - rows are spread round-robin according to shards weights. Ex.: id'
+        )
 
         #
         # converters section
@@ -519,6 +820,40 @@ class CLIOptions(Options):
             default=self.default_options['ch_converter_class'],
             help='Converter class name in --ch-converter-file file'
         )
+        argparser.add_argument(
+            '--ch-precise-types',
+            action='store_true',
+            default=self.default_options['ch_precise_types'],
+            help='Map DECIMAL to Decimal(P, S), DATETIME(n) and TIMESTAMP(n) to DateTime64(n), TIME to seconds, '
+                 'ENUM to Enum with its values and SET to Array(LowCardinality(String)) when creating tables, '
+                 'and write these values as is instead of converting them to String. '
+                 'Tables created without this option have to be re-created. Ex.: --ch-precise-types'
+        )
+        argparser.add_argument(
+            '--ch-advise-types',
+            action='store_true',
+            default=self.default_options['ch_advise_types'],
+            help='Sample each MySQL table when creating tables and advise ClickHouse columns: '
+                 'LowCardinality for String columns with few distinct values, CODEC(ZSTD) for long strings, '
+                 'CODEC(Delta, ZSTD) and CODEC(DoubleDelta, ZSTD) for monotonic numbers and dates. '
+                 'Ex.: --ch-advise-types'
+        )
+        argparser.add_argument(
+            '--ch-advise-sample-rows',
+            type=int,
+            default=self.default_options['ch_advise_sample_rows'],
+            help='Max number of rows to sample from each table for --ch-advise-types. Ex.: 10000'
+        )
+        argparser.add_argument(
+            '--ch-advise-layout',
+            action='store_true',
+            default=self.default_options['ch_advise_layout'],
+            help='Advise data skipping indexes and PARTITION BY of created tables based on MySQL index statistics and rows estimate: '
+                 'low cardinality indexed columns get set() data skipping indexes, ORDER BY stays the primary key '
+                 'as ReplacingMergeTree replaces rows having the same sort key only, '
+                 'partitions granularity (day, week, month, year or none) is chosen to keep partitions big and few. '
+                 'Ex.: --ch-advise-layout'
+        )
 
         args = argparser.parse_args()
 
@@ -529,23 +864,42 @@ class CLIOptions(Options):
 
             'tb_host': args.tb_host,
             'tb_token': args.tb_token,
+            'tb_upload_workers': args.tb_upload_workers,
 
 
             'config_file': args.config_file,
             'log_file': args.log_file,
             'log_level': args.log_level,
+            'trace_sample_rate': args.trace_sample_rate,
+            'trace_report_interval': args.trace_report_interval,
+            'profile_duration': args.profile_duration,
+            'profile_dir': args.profile_dir,
             'nice_pause': args.nice_pause,
             'dry': args.dry,
             'daemon': args.daemon,
             'pid_file': args.pid_file,
             'binlog_position_file': args.binlog_position_file,
+            'binlog_gtid_file': args.binlog_gtid_file,
             'mempool': args.mempool, # csvpool assumes mempool to be enabled
             'mempool_max_events_num': args.mempool_max_events_num,
             'mempool_max_rows_num': args.mempool_max_rows_num,
             'mempool_max_flush_interval': args.mempool_max_flush_interval,
+            'mempool_spill_threshold': args.mempool_spill_threshold,
+            'mempool_spill_dir': args.mempool_spill_dir,
+            'mempool_wal_dir': args.mempool_wal_dir,
+            'mempool_wal_segment_size': args.mempool_wal_segment_size,
+            'mempool_wal_fsync': args.mempool_wal_fsync,
+            'mempool_adaptive': args.mempool_adaptive,
+            'mempool_min_events_num': args.mempool_min_events_num,
+            'mempool_target_flush_latency': args.mempool_target_flush_latency,
             'csvpool': args.csvpool,
             'csvpool_file_path_prefix': args.csvpool_file_path_prefix,
             'csvpool_keep_files': args.csvpool_keep_files,
+            'csvpool_ring_buffer_size': args.csvpool_ring_buffer_size,
+            'csvpool_writers': args.csvpool_writers,
+            'csvpool_part_size': args.csvpool_part_size,
+            'fanout': [x for x in args.fanout.split(',') if x] if args.fanout else self.default_options['fanout'],
+            'fanout_buffer_size': args.fanout_buffer_size,
             'create_table_sql_template': args.create_table_sql_template,
             'create_table_sql': args.create_table_sql,
             'with_create_database': args.with_create_database,
@@ -567,10 +921,17 @@ class CLIOptions(Options):
             'src_tables_where_clauses': [x for x in args.src_tables_where_clauses.split(',') if x] if args.src_tables_where_clauses else self.default_options['src_tables_where_clauses'],
             'src_tables_prefixes': [x for x in args.src_tables_prefixes.split(',') if x] if args.src_tables_prefixes else self.default_options['src_tables_prefixes'],
             'src_wait': args.src_wait,
+            'src_heartbeat': args.src_heartbeat,
             'src_resume': args.src_resume,
             'src_binlog_file': args.src_binlog_file,
             'src_binlog_position': args.src_binlog_position,
+            'src_auto_position': args.src_auto_position,
+            'src_gtid_set': args.src_gtid_set,
+            'src_decode_workers': args.src_decode_workers,
+            'src_track_ddl': args.src_track_ddl,
             'src_file': args.src_file,
+            'src_file_batch_size': args.src_file_batch_size,
+            'src_file_workers': args.src_file_workers,
 
             #
             # dst section
@@ -580,12 +941,21 @@ class CLIOptions(Options):
             'dst_port': args.dst_port,
             'dst_user': args.dst_user,
             'dst_password': args.dst_password,
+            'dst_compression': args.dst_compression,
+            'dst_compress_block_size': args.dst_compress_block_size,
             'dst_schema': args.dst_schema,
             'dst_distribute': args.dst_distribute,
             'dst_cluster': args.dst_cluster,
             'dst_table': args.dst_table,
             'dst_table_prefix': args.dst_table_prefix,
             'dst_create_table': args.dst_create_table,
+            'dst_alter_table': args.dst_alter_table,
+            'dst_insert_retries': args.dst_insert_retries,
+            'dst_insert_retry_backoff': args.dst_insert_retry_backoff,
+            'dst_insert_deduplicate': args.dst_insert_deduplicate,
+            'dst_dead_letter_file': args.dst_dead_letter_file,
+            'dst_insert_into_shards': args.dst_insert_into_shards,
+            'dst_sharding_key': [x for x in args.dst_sharding_key.split(',') if x] if args.dst_sharding_key else self.default_options['dst_sharding_key'],
 
             #
             # converters section
@@ -594,6 +964,10 @@ class CLIOptions(Options):
             'column_skip': CLIOptions.join_lists(args.column_skip),
             'ch_converter_file': args.ch_converter_file,
             'ch_converter_class': args.ch_converter_class,
+            'ch_precise_types': args.ch_precise_types,
+            'ch_advise_types': args.ch_advise_types,
+            'ch_advise_sample_rows': args.ch_advise_sample_rows,
+            'ch_advise_layout': args.ch_advise_layout,
         }
 
 from configobj import ConfigObj
@@ -772,3 +1146,31 @@ class AggregatedOptions(object):
             str += '\n'
 
         return str
+
+
+class SourceOptions(AggregatedOptions):
+    """
+    Options of one of multiple sources.
+    Options specified in source's section override aggregated options, the rest are taken from aggregated options
+    """
+
+    options = None
+    overrides = None
+
+    def __init__(self, options, overrides):
+        """
+        :param options: AggregatedOptions
+        :param overrides: dict of source-specific options. Ex.: {'src_host': '10.0.0.1', 'src_server_id': '2'}
+        """
+        self.options = options
+        self.overrides = overrides
+
+    def get(self, *coordinates):
+        value = self.get_from_src(self.overrides, *coordinates)
+        if value is not None:
+            return value
+
+        return self.options.get(*coordinates)
+
+    def __str__(self):
+        return 'SOURCE OPTIONS:\n' + pprint.pformat(self.overrides) + '\n' + str(self.options)
@@ -1,25 +1,15 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import inspect
 import logging
 import os
-from clickhouse_mysql.reader.mysqlreader import MySQLReader
-from clickhouse_mysql.reader.csvreader import CSVReader
-
-from clickhouse_mysql.writer.chwriter import CHWriter
-from clickhouse_mysql.writer.csvwriter import CSVWriter
-from clickhouse_mysql.writer.tbcsvwriter import TBCSVWriter
-from clickhouse_mysql.writer.poolwriter import PoolWriter
-from clickhouse_mysql.writer.processwriter import ProcessWriter
-from clickhouse_mysql.objectbuilder import ObjectBuilder
-
-from clickhouse_mysql.converter.csvwriteconverter import CSVWriteConverter
-from clickhouse_mysql.converter.chwriteconverter import CHWriteConverter
-from clickhouse_mysql.tablesqlbuilder import TableSQLBuilder
-from clickhouse_mysql.tablemigrator import TableMigrator
-from clickhouse_mysql.clioptions import Options, AggregatedOptions
 
-from clickhouse_mysql.dbclient.chclient import CHClient
+# readers, writers, table builders and db clients are imported by the methods building them,
+# thus only modules (and their MySQLdb, clickhouse_driver, pymysqlreplication, requests)
+# of the selected action are loaded, and --help or --create-table-sql start fast
+from clickhouse_mysql.objectbuilder import ObjectBuilder
+from clickhouse_mysql.clioptions import Options, AggregatedOptions, SourceOptions
 
 from clickhouse_mysql.util import Util
 
@@ -39,26 +29,6 @@ class Config(object):
         # get aggregated options from all sources (config, cli, env)
         self.options = AggregatedOptions()
 
-        log_file = None
-        log_pos = None
-        if self.options['binlog_position_file'] and self.options.get_bool('src_resume') and os.path.exists(self.options['binlog_position_file']):
-            try:
-                with open(self.options['binlog_position_file'], 'r') as f:
-                    position = f.read()
-                    log_file, log_pos = position.split(':')
-                    log_pos = int(log_pos)
-                    print("binlog position from file {} is {}:{}".format(
-                        self.options['binlog_position_file'],
-                        log_file,
-                        log_pos
-                    ))
-            except Exception as e:
-                log_file = None
-                log_pos = None
-                logging.exception(e)
-                logging.info("can't read binlog position from file {}".format(
-                    self.options['binlog_position_file'],
-                ))
         # build application config out of aggregated options
         self.config = {
             #
@@ -67,11 +37,16 @@ class Config(object):
             'tinybird': {
                 'host': self.options['tb_host'],
                 'token': self.options['tb_token'],
+                'upload_workers': self.options.get_int('tb_upload_workers'),
             },
             'app': {
                 'config_file': self.options['config_file'],
                 'log_file': self.options['log_file'],
                 'log_level': Options.log_level_from_string(self.options['log_level']),
+                'trace_sample_rate': self.options.get_int('trace_sample_rate'),
+                'trace_report_interval': self.options.get_int('trace_report_interval'),
+                'profile_duration': self.options.get_int('profile_duration'),
+                'profile_dir': self.options['profile_dir'],
                 'dry': self.options.get_bool('dry'),
                 'daemon': self.options.get_bool('daemon'),
                 'create_table_sql_template': self.options.get_bool('create_table_sql_template'),
@@ -81,11 +56,24 @@ class Config(object):
                 'migrate_table': self.options.get_bool('migrate_table'),
                 'pid_file': self.options['pid_file'],
                 'binlog_position_file': self.options['binlog_position_file'],
+                'binlog_gtid_file': self.options['binlog_gtid_file'],
                 'mempool': self.options.get_bool('mempool') or self.options.get_bool('csvpool'), # csvpool assumes mempool to be enabled
                 'mempool_max_events_num': self.options.get_int('mempool_max_events_num'),
                 'mempool_max_rows_num': self.options.get_int('mempool_max_rows_num'),
                 'mempool_max_flush_interval': self.options.get_int('mempool_max_flush_interval'),
+                'mempool_spill_threshold': self.options.get_int('mempool_spill_threshold'),
+                'mempool_spill_dir': self.options['mempool_spill_dir'],
+                'mempool_wal_dir': self.options['mempool_wal_dir'],
+                'mempool_wal_segment_size': self.options.get_int('mempool_wal_segment_size'),
+                'mempool_wal_fsync': self.options.get_bool('mempool_wal_fsync'),
+                'mempool_adaptive': self.options.get_bool('mempool_adaptive'),
+                'mempool_min_events_num': self.options.get_int('mempool_min_events_num'),
+                'mempool_target_flush_latency': float(self.options['mempool_target_flush_latency']),
                 'csvpool': self.options.get_bool('csvpool'),
+                'csvpool_ring_buffer_size': self.options.get_int('csvpool_ring_buffer_size'),
+                'csvpool_writers': self.options.get_int('csvpool_writers'),
+                'fanout': self.options.get_list('fanout'),
+                'fanout_buffer_size': self.options.get_int('fanout_buffer_size'),
                 'pump_data': self.options.get_bool('pump_data'),
                 'install': self.options.get_bool('install'),
             },
@@ -98,6 +86,7 @@ class Config(object):
                     'converter_file': self.options['ch_converter_file'],
                     'converter_class': self.options['ch_converter_class'],
                     'column_skip': self.options['column_skip'],
+                    'precise_types': self.options.get_bool('ch_precise_types'),
                 },
                 'csv': {
                     'column_default_value': self.options['column_default_value'],
@@ -125,6 +114,8 @@ class Config(object):
                         'port': self.options.get_int('dst_port'),
                         'user': self.options['dst_user'],
                         'password': self.options['dst_password'],
+                        'compression': self.options['dst_compression'],
+                        'compress_block_size': self.options.get_int('dst_compress_block_size'),
                     },
                     'dst_schema': self.options['dst_schema'],
                     'dst_distribute': self.options['dst_distribute'],
@@ -132,6 +123,10 @@ class Config(object):
                     'dst_table': self.options['dst_table'],
                     'dst_table_prefix': self.options['dst_table_prefix'],
                     'dst_create_table': self.options.get_bool('dst_create_table'),
+                    'advise_types': self.options.get_bool('ch_advise_types'),
+                    'advise_sample_rows': self.options.get_int('ch_advise_sample_rows'),
+                    'advise_layout': self.options.get_bool('ch_advise_layout'),
+                    'dst_alter_table': self.options.get_bool('dst_alter_table'),
                 },
             },
 
@@ -156,6 +151,8 @@ class Config(object):
                         'port': self.options.get_int('dst_port'),
                         'user': self.options['dst_user'],
                         'password': self.options['dst_password'],
+                        'compression': self.options['dst_compression'],
+                        'compress_block_size': self.options.get_int('dst_compress_block_size'),
                     },
                     'dst_schema': self.options['dst_schema'],
                     'dst_distribute': self.options['dst_distribute'],
@@ -170,25 +167,12 @@ class Config(object):
             #
             #
             'reader': {
-                'mysql': {
-                    'connection_settings': {
-                        'host': self.options['src_host'],
-                        'port': self.options.get_int('src_port'),
-                        'user': self.options['src_user'],
-                        'password': self.options['src_password'],
-                    },
-                    'server_id': self.options.get_int('src_server_id'),
-                    'schemas': self.options.get_list('src_schemas'),
-                    'tables': self.options.get_list('src_tables'),
-                    'tables_prefixes': self.options.get_list('src_tables_prefixes'),
-                    'blocking': self.options.get_bool('src_wait'),
-                    'resume_stream': self.options.get_bool('src_resume'),
-                    'nice_pause': 0 if self.options.get_int('nice_pause') is None else self.options.get_int('nice_pause'),
-                    'log_file': self.options['src_binlog_file'] if self.options['src_binlog_file'] else log_file,
-                    'log_pos': self.options.get_int('src_binlog_position') if self.options.get_int('src_binlog_position') else log_pos,
-                },
+                'mysql': self.reader_mysql_config(self.options),
+                'sources': self.reader_sources_config(),
                 'file': {
                     'csv_file_path': self.options['src_file'],
+                    'batch_size': self.options.get_int('src_file_batch_size'),
+                    'workers_num': self.options.get_int('src_file_workers'),
                     'nice_pause': 0 if self.options.get_int('nice_pause') is None else self.options.get_int('nice_pause'),
                 },
             },
@@ -203,17 +187,27 @@ class Config(object):
                         'port': self.options.get_int('dst_port'),
                         'user': self.options['dst_user'],
                         'password': self.options['dst_password'],
+                        'compression': self.options['dst_compression'],
+                        'compress_block_size': self.options.get_int('dst_compress_block_size'),
                     },
                     'dst_schema': self.options['dst_schema'],
                     'dst_distribute': self.options['dst_distribute'],
                     'dst_table': self.options['dst_table'],
                     'dst_table_prefix': self.options['dst_table_prefix'],
+                    'insert_retries': self.options.get_int('dst_insert_retries'),
+                    'insert_retry_backoff': float(self.options['dst_insert_retry_backoff']),
+                    'insert_deduplicate': self.options.get_bool('dst_insert_deduplicate'),
+                    'dead_letter_file': self.options['dst_dead_letter_file'],
+                    'dst_cluster': self.options['dst_cluster'],
+                    'insert_into_shards': self.options.get_bool('dst_insert_into_shards'),
+                    'sharding_key': self.options.get_list('dst_sharding_key'),
                 },
                 'file': {
                     'csv_file_path': self.options['dst_file'],
                     'csv_file_path_prefix': self.options['csvpool_file_path_prefix'],
                     'csv_file_path_suffix_parts': [],
                     'csv_keep_file': self.options['csvpool_keep_files'],
+                    'csv_max_part_size': self.options.get_int('csvpool_part_size') * 1024 * 1024,
                     'dst_schema': self.options['dst_schema'],
                     'dst_distribute': self.options['dst_distribute'],
                     'dst_table': self.options['dst_table'],
@@ -228,6 +222,123 @@ class Config(object):
     def __getitem__(self, item):
         return self.config[item]
 
+    @staticmethod
+    def read_binlog_position(options):
+        """
+        Read binlog position to resume reading from
+        :param options: options of the source
+        :return: (log_file, log_pos), (None, None) in case position is not available
+        """
+        log_file = None
+        log_pos = None
+        if options['binlog_position_file'] and options.get_bool('src_resume') and os.path.exists(options['binlog_position_file']):
+            try:
+                with open(options['binlog_position_file'], 'r') as f:
+                    position = f.read()
+                    log_file, log_pos = position.split(':')
+                    log_pos = int(log_pos)
+                    print("binlog position from file {} is {}:{}".format(
+                        options['binlog_position_file'],
+                        log_file,
+                        log_pos
+                    ))
+            except Exception as e:
+                log_file = None
+                log_pos = None
+                logging.exception(e)
+                logging.info("can't read binlog position from file {}".format(
+                    options['binlog_position_file'],
+                ))
+
+        return log_file, log_pos
+
+    @staticmethod
+    def read_gtid_set(options):
+        """
+        Read executed GTID set to resume reading from
+        :param options: options of the source
+        :return: GTID set as str, None in case GTID set is not available
+        """
+        gtid_set = None
+        if options['binlog_gtid_file'] and options.get_bool('src_auto_position') and os.path.exists(options['binlog_gtid_file']):
+            try:
+                with open(options['binlog_gtid_file'], 'r') as f:
+                    gtid_set = f.read().strip()
+                    print("GTID set from file {} is {}".format(
+                        options['binlog_gtid_file'],
+                        gtid_set
+                    ))
+            except Exception as e:
+                gtid_set = None
+                logging.exception(e)
+                logging.info("can't read GTID set from file {}".format(
+                    options['binlog_gtid_file'],
+                ))
+
+        return gtid_set
+
+    def reader_mysql_config(self, options):
+        """
+        Build config of MySQL reader
+        :param options: options of the source
+        :return: dict
+        """
+        log_file, log_pos = Config.read_binlog_position(options)
+        gtid_set = Config.read_gtid_set(options)
+
+        return {
+            'connection_settings': {
+                'host': options['src_host'],
+                'port': options.get_int('src_port'),
+                'user': options['src_user'],
+                'password': options['src_password'],
+            },
+            'server_id': options.get_int('src_server_id'),
+            'schemas': options.get_list('src_schemas'),
+            'tables': options.get_list('src_tables'),
+            'tables_prefixes': options.get_list('src_tables_prefixes'),
+            'blocking': options.get_bool('src_wait'),
+            'heartbeat': options.get_int('src_heartbeat'),
+            'resume_stream': options.get_bool('src_resume'),
+            'nice_pause': 0 if options.get_int('nice_pause') is None else options.get_int('nice_pause'),
+            'log_file': options['src_binlog_file'] if options['src_binlog_file'] else log_file,
+            'log_pos': options.get_int('src_binlog_position') if options.get_int('src_binlog_position') else log_pos,
+            'auto_position': options.get_bool('src_auto_position'),
+            'gtid_set': options['src_gtid_set'] if options['src_gtid_set'] else gtid_set,
+            'binlog_position_file': options['binlog_position_file'],
+            'binlog_gtid_file': options['binlog_gtid_file'],
+            'decode_workers': options.get_int('src_decode_workers'),
+            # ALTER TABLE can't be applied without being tracked
+            'track_ddl': options.get_bool('src_track_ddl') or options.get_bool('dst_alter_table'),
+            'column_skip': options['column_skip'],
+        }
+
+    def reader_sources_config(self):
+        """
+        Build configs of MySQL readers of multiple sources.
+        Each source is a sub-section of 'sources' section of config file, it overrides src_* options. Ex.:
+            [sources]
+            [[shard1]]
+            src_host=10.0.0.1
+            [[shard2]]
+            src_host=10.0.0.2
+        Each source keeps its binlog position (GTID set) in its own file
+        :return: dict of source name -> config of MySQL reader, empty dict in case no sources specified
+        """
+        sources = self.options['sources']
+        if not sources:
+            return {}
+
+        config = {}
+        for name in sources:
+            overrides = dict(sources[name])
+            for file_option in ('binlog_position_file', 'binlog_gtid_file'):
+                if file_option not in overrides and self.options[file_option]:
+                    overrides[file_option] = '{}.{}'.format(self.options[file_option], name)
+            config[name] = self.reader_mysql_config(SourceOptions(self.options, overrides))
+
+        return config
+
     def log_file(self):
         return self.config['app']['log_file']
 
@@ -237,6 +348,18 @@ class Config(object):
     def pid_file(self):
         return self.config['app']['pid_file']
 
+    def trace_sample_rate(self):
+        return self.config['app']['trace_sample_rate']
+
+    def trace_report_interval(self):
+        return self.config['app']['trace_report_interval']
+
+    def profile_duration(self):
+        return self.config['app']['profile_duration']
+
+    def profile_dir(self):
+        return self.config['app']['profile_dir']
+
     def mempool_max_rows_num(self):
         return self.config['app']['mempool_max_rows_num']
 
@@ -255,6 +378,9 @@ class Config(object):
     def is_dst_create_table(self):
         return self.config['table_builder']['clickhouse']['dst_create_table']
 
+    def is_dst_alter_table(self):
+        return self.config['table_builder']['clickhouse']['dst_alter_table']
+
     def is_create_table_json_template(self):
         return self.config['app']['create_table_json_template']
 
@@ -262,6 +388,7 @@ class Config(object):
         return self.config['app']['install']
 
     def table_sql_builder(self):
+        from clickhouse_mysql.tablesqlbuilder import TableSQLBuilder
         return TableSQLBuilder(
             host=self.config['table_builder']['mysql']['host'],
             port=self.config['table_builder']['mysql']['port'],
@@ -276,6 +403,10 @@ class Config(object):
             tables=self.config['table_builder']['mysql']['tables'],
             tables_prefixes=self.config['table_builder']['mysql']['tables_prefixes'],
             column_skip=self.config['converter']['clickhouse']['column_skip'],
+            precise_types=self.config['converter']['clickhouse']['precise_types'],
+            advise_types=self.config['table_builder']['clickhouse']['advise_types'],
+            advise_sample_rows=self.config['table_builder']['clickhouse']['advise_sample_rows'],
+            advise_layout=self.config['table_builder']['clickhouse']['advise_layout'],
         )
 
     def is_migrate_table(self):
@@ -285,9 +416,11 @@ class Config(object):
         return self.config['app']['pump_data']
 
     def chclient(self):
+        from clickhouse_mysql.dbclient.chclient import CHClient
         return CHClient(self.config['writer']['clickhouse']['connection_settings'])
 
     def table_migrator(self):
+        from clickhouse_mysql.tablemigrator import TableMigrator
         table_migrator = TableMigrator(
             host=self.config['table_migrator']['mysql']['host'],
             port=self.config['table_migrator']['mysql']['port'],
@@ -303,6 +436,10 @@ class Config(object):
             tables_prefixes=self.config['table_migrator']['mysql']['tables_prefixes'],
             tables_where_clauses=self.config['table_migrator']['mysql']['tables_where_clauses'],
             column_skip=self.config['converter']['clickhouse']['column_skip'],
+            precise_types=self.config['converter']['clickhouse']['precise_types'],
+            advise_types=self.config['table_builder']['clickhouse']['advise_types'],
+            advise_sample_rows=self.config['table_builder']['clickhouse']['advise_sample_rows'],
+            advise_layout=self.config['table_builder']['clickhouse']['advise_layout'],
         )
         table_migrator.chwriter = self.writer_builder_chwriter().get()
         table_migrator.chclient = self.chclient()
@@ -310,33 +447,60 @@ class Config(object):
 
         return table_migrator
 
+    def mysql_reader(self, config):
+        """
+        Build MySQL reader
+        :param config: config of MySQL reader, as built by reader_mysql_config()
+        :return: MySQLReader
+        """
+        from clickhouse_mysql.reader.mysqlreader import MySQLReader
+        return MySQLReader(
+            connection_settings={
+                'host': config['connection_settings']['host'],
+                'port': config['connection_settings']['port'],
+                'user': config['connection_settings']['user'],
+                'passwd': config['connection_settings']['password'],
+            },
+            server_id=config['server_id'],
+            log_file=config['log_file'],
+            log_pos=config['log_pos'],
+            schemas=config['schemas'],
+            tables=config['tables'],
+            tables_prefixes=config['tables_prefixes'],
+            blocking=config['blocking'],
+            resume_stream=config['resume_stream'],
+            nice_pause=config['nice_pause'],
+            heartbeat=config['heartbeat'],
+            binlog_position_file=config['binlog_position_file'],
+            auto_position=config['auto_position'],
+            gtid_set=config['gtid_set'],
+            binlog_gtid_file=config['binlog_gtid_file'],
+            decode_workers=config['decode_workers'],
+            column_skip=config['column_skip'],
+            track_ddl=config['track_ddl'],
+        )
+
     def reader(self):
         if self.config['reader']['file']['csv_file_path']:
+            from clickhouse_mysql.reader.csvreader import CSVReader
             return CSVReader(
                 csv_file_path=self.config['reader']['file']['csv_file_path'],
+                batch_size=self.config['reader']['file']['batch_size'],
+                workers_num=self.config['reader']['file']['workers_num'],
             )
+        elif self.config['reader']['sources']:
+            # one reader per source, all of them feed the same writer
+            from clickhouse_mysql.reader.multireader import MultiReader
+            return MultiReader(readers={
+                name: self.mysql_reader(self.config['reader']['sources'][name])
+                for name in self.config['reader']['sources']
+            })
         else:
-            return MySQLReader(
-                connection_settings={
-                    'host': self.config['reader']['mysql']['connection_settings']['host'],
-                    'port': self.config['reader']['mysql']['connection_settings']['port'],
-                    'user': self.config['reader']['mysql']['connection_settings']['user'],
-                    'passwd': self.config['reader']['mysql']['connection_settings']['password'],
-                },
-                server_id=self.config['reader']['mysql']['server_id'],
-                log_file=self.config['reader']['mysql']['log_file'],
-                log_pos=self.config['reader']['mysql']['log_pos'],
-                schemas=self.config['reader']['mysql']['schemas'],
-                tables=self.config['reader']['mysql']['tables'],
-                tables_prefixes=self.config['reader']['mysql']['tables_prefixes'],
-                blocking=self.config['reader']['mysql']['blocking'],
-                resume_stream=self.config['reader']['mysql']['resume_stream'],
-                nice_pause=self.config['reader']['mysql']['nice_pause'],
-                binlog_position_file=self.config['app']['binlog_position_file'],
-            )
+            return self.mysql_reader(self.config['reader']['mysql'])
 
     def converter_builder(self, which):
         if which == CONVERTER_CSV:
+            from clickhouse_mysql.converter.csvwriteconverter import CSVWriteConverter
             return ObjectBuilder(
                 instance=CSVWriteConverter(
                     defaults=self.config['converter']['csv']['column_default_value'],
@@ -346,22 +510,47 @@ class Config(object):
         elif which == CONVERTER_CH:
             if not self.config['converter']['clickhouse']['converter_file'] or not self.config['converter']['clickhouse']['converter_class']:
                 # default converter
-                return ObjectBuilder(instance=CHWriteConverter(column_skip=self.config['converter']['clickhouse']['column_skip']))
+                from clickhouse_mysql.converter.chwriteconverter import CHWriteConverter
+                return ObjectBuilder(instance=CHWriteConverter(
+                    column_skip=self.config['converter']['clickhouse']['column_skip'],
+                    precise_types=self.config['converter']['clickhouse']['precise_types'],
+                ))
             else:
                 # explicitly specified converter
                 _class = Util.class_from_file(
                     self.config['converter']['clickhouse']['converter_file'],
                     self.config['converter']['clickhouse']['converter_class']
                 )
-                return ObjectBuilder(instance=_class(column_skip=self.config['converter']['clickhouse']['column_skip']))
+                params = {
+                    'column_skip': self.config['converter']['clickhouse']['column_skip'],
+                }
+                # converters written before precise types appeared accept column_skip only
+                parameters = inspect.signature(_class).parameters
+                if 'precise_types' in parameters \
+                        or any(parameter.kind == inspect.Parameter.VAR_KEYWORD for parameter in parameters.values()):
+                    params['precise_types'] = self.config['converter']['clickhouse']['precise_types']
+                return ObjectBuilder(instance=_class(**params))
 
     def writer_builder_csvpool(self):
+        from clickhouse_mysql.writer.processwriter import ProcessWriter
+        from clickhouse_mysql.writer.csvwriter import CSVWriter
+        from clickhouse_mysql.writer.tbcsvwriter import TBCSVWriter
+
+        ring_buffer = None
+        if self.config['app']['csvpool_ring_buffer_size']:
+            # one buffer shared by all writers
+            from clickhouse_mysql.ringbuffer import RingBuffer
+            ring_buffer = RingBuffer(capacity=self.config['app']['csvpool_ring_buffer_size'] * 1024 * 1024)
+
         return ObjectBuilder(class_name=ProcessWriter, constructor_params={
+            'ring_buffer': ring_buffer,
+            'ring_buffer_consumers_num': self.config['app']['csvpool_writers'],
             'next_writer_builder': ObjectBuilder(class_name=CSVWriter, constructor_params={
                 'csv_file_path': self.config['writer']['file']['csv_file_path'],
                 'csv_file_path_prefix': self.config['writer']['file']['csv_file_path_prefix'],
                 'csv_file_path_suffix_parts': self.config['writer']['file']['csv_file_path_suffix_parts'],
                 'csv_keep_file': self.config['writer']['file']['csv_keep_file'],
+                'csv_max_part_size': self.config['writer']['file']['csv_max_part_size'],
                 'dst_schema': self.config['writer']['file']['dst_schema'],
                 'dst_table': self.config['writer']['file']['dst_table'],
                 'dst_table_prefix': self.config['writer']['file']['dst_table_prefix'],
@@ -370,6 +559,7 @@ class Config(object):
                     constructor_params={
                         'tb_host': self.config['tinybird']['host'],
                         'tb_token': self.config['tinybird']['token'],
+                        'upload_workers': self.config['tinybird']['upload_workers'],
                         'dst_table': self.config['writer']['clickhouse']['dst_table']
                     }
                 ),
@@ -378,11 +568,13 @@ class Config(object):
         })
 
     def writer_builder_csv_file(self):
+        from clickhouse_mysql.writer.csvwriter import CSVWriter
         return ObjectBuilder(class_name=CSVWriter, constructor_params={
             'csv_file_path': self.config['writer']['file']['csv_file_path'],
             'csv_file_path_prefix': self.config['writer']['file']['csv_file_path_prefix'],
             'csv_file_path_suffix_parts': self.config['writer']['file']['csv_file_path_suffix_parts'],
             'csv_keep_file': self.config['writer']['file']['csv_keep_file'],
+            'csv_max_part_size': self.config['writer']['file']['csv_max_part_size'],
             'dst_schema': self.config['writer']['file']['dst_schema'],
             'dst_table': self.config['writer']['file']['dst_table'],
             'dst_table_prefix': self.config['writer']['file']['dst_table_prefix'],
@@ -390,13 +582,37 @@ class Config(object):
             'converter_builder': self.converter_builder(CONVERTER_CSV),
         })
 
+    def ch_cluster(self):
+        if not self.config['writer']['clickhouse']['insert_into_shards']:
+            return None
+
+        if not self.config['writer']['clickhouse']['dst_cluster']:
+            raise Exception("Inserting into shards requires cluster to be specified")
+
+        from clickhouse_mysql.dbclient.chcluster import CHCluster
+        return CHCluster(
+            connection_settings={
+                'host': self.config['writer']['clickhouse']['connection_settings']['host'],
+                'port': self.config['writer']['clickhouse']['connection_settings']['port'],
+                'user': self.config['writer']['clickhouse']['connection_settings']['user'],
+                'password': self.config['writer']['clickhouse']['connection_settings']['password'],
+                'compression': self.config['writer']['clickhouse']['connection_settings']['compression'],
+                'compress_block_size': self.config['writer']['clickhouse']['connection_settings']['compress_block_size'],
+            },
+            cluster=self.config['writer']['clickhouse']['dst_cluster'],
+            sharding_key=self.config['writer']['clickhouse']['sharding_key'],
+        )
+
     def writer_builder_chwriter(self):
+        from clickhouse_mysql.writer.chwriter import CHWriter
         return ObjectBuilder(class_name=CHWriter, constructor_params={
             'connection_settings': {
                 'host': self.config['writer']['clickhouse']['connection_settings']['host'],
                 'port': self.config['writer']['clickhouse']['connection_settings']['port'],
                 'user': self.config['writer']['clickhouse']['connection_settings']['user'],
                 'password': self.config['writer']['clickhouse']['connection_settings']['password'],
+                'compression': self.config['writer']['clickhouse']['connection_settings']['compression'],
+                'compress_block_size': self.config['writer']['clickhouse']['connection_settings']['compress_block_size'],
             },
             'dst_schema': self.config['writer']['clickhouse']['dst_schema'],
             'dst_table': self.config['writer']['clickhouse']['dst_table'],
@@ -404,6 +620,13 @@ class Config(object):
             'dst_distribute': self.config['writer']['clickhouse']['dst_distribute'],
             'next_writer_builder': None,
             'converter_builder': self.converter_builder(CONVERTER_CH),
+            'insert_retries': self.config['writer']['clickhouse']['insert_retries'],
+            'insert_retry_backoff': self.config['writer']['clickhouse']['insert_retry_backoff'],
+            'insert_deduplicate': self.config['writer']['clickhouse']['insert_deduplicate'],
+            'dead_letter_file': self.config['writer']['clickhouse']['dead_letter_file'],
+            'cluster': self.ch_cluster(),
+            # NULL SET is inserted as an empty array
+            'null_as_default': self.config['converter']['clickhouse']['precise_types'],
         })
 
     def writer_builder(self):
@@ -414,15 +637,93 @@ class Config(object):
         else:
             return self.writer_builder_chwriter()
 
-    def pool_writer(self):
+    def batch_sizer(self, csvpool=False):
+        """
+        Build batch sizer of pool writer
+        :param csvpool: bool pool is flushed into csvpool - writer processes upload in background, flush latency
+            and failures of upload are not seen by pool, thus batch size is not adapted
+        :return: AIMDBatchSizer or None - fixed batch size
+        """
+        if not self.config['app']['mempool_adaptive']:
+            return None
+
+        if csvpool:
+            logging.warning("--mempool-adaptive is not applied to csvpool, --mempool-max-events-num is used")
+            return None
+
+        from clickhouse_mysql.pool.batchsizer import AIMDBatchSizer
+        return AIMDBatchSizer(
+            min_size=self.config['app']['mempool_min_events_num'],
+            max_size=self.config['app']['mempool_max_events_num'],
+            target_latency=self.config['app']['mempool_target_flush_latency'],
+        )
+
+    def pool_writer(self, writer_builder=None, destination=None):
+        """
+        Build pool writer
+        :param writer_builder: ObjectBuilder of writer to flush pool into, None - the one configured
+        :param destination: name of fan-out destination, pools of destinations keep their files in own subdirs
+        :return: PoolWriter
+        """
+        from clickhouse_mysql.writer.poolwriter import PoolWriter
+
+        # pool flushed into csvpool hands events over to background writer processes
+        if destination is not None:
+            csvpool = destination == 'csvpool'
+        else:
+            csvpool = writer_builder is None and self.config['app']['csvpool']
+
+        spill_dir = self.config['app']['mempool_spill_dir']
+        wal_dir = self.config['app']['mempool_wal_dir']
+        if destination is not None:
+            spill_dir = os.path.join(spill_dir, destination) if spill_dir else None
+            wal_dir = os.path.join(wal_dir, destination) if wal_dir else None
+
+        if wal_dir and csvpool:
+            # events would be removed from the log before CSV file is uploaded
+            raise Exception("--mempool-wal-dir is not supported with --csvpool: events are acknowledged before "
+                            "they are uploaded and would be lost on failed upload")
+
         return PoolWriter(
-            writer_builder=self.writer_builder(),
+            writer_builder=writer_builder if writer_builder is not None else self.writer_builder(),
             max_pool_size=self.config['app']['mempool_max_events_num'],
             max_flush_interval=self.config['app']['mempool_max_flush_interval'],
+            spill_threshold=self.config['app']['mempool_spill_threshold'],
+            spill_dir=spill_dir,
+            wal_dir=wal_dir,
+            wal_segment_size=self.config['app']['mempool_wal_segment_size'],
+            wal_fsync=self.config['app']['mempool_wal_fsync'],
+            batch_sizer=self.batch_sizer(csvpool=csvpool),
         )
 
+    def fanout_writer(self):
+        from clickhouse_mysql.writer.fanoutwriter import FanOutWriter
+
+        writer_builders = {
+            'clickhouse': self.writer_builder_chwriter,
+            'csvpool': self.writer_builder_csvpool,
+            'file': self.writer_builder_csv_file,
+        }
+
+        writers = {}
+        for destination in self.config['app']['fanout']:
+            if destination not in writer_builders:
+                raise Exception("Unknown fan-out destination {}. Known destinations: {}".format(
+                    destination, ', '.join(writer_builders)))
+
+            writer_builder = writer_builders[destination]()
+            if self.config['app']['mempool'] or destination == 'csvpool':
+                # csvpool assumes mempool to be enabled
+                writers[destination] = self.pool_writer(writer_builder=writer_builder, destination=destination)
+            else:
+                writers[destination] = writer_builder.get()
+
+        return FanOutWriter(writers=writers, buffer_size=self.config['app']['fanout_buffer_size'])
+
     def writer(self):
-        if self.config['app']['mempool']:
+        if self.config['app']['fanout']:
+            return self.fanout_writer()
+        elif self.config['app']['mempool']:
             return self.pool_writer()
         else:
             return self.writer_builder().get()
@@ -27,17 +27,66 @@ class CHWriteConverter(Converter):
         set,
     ]
 
-    def __init__(self, column_skip):
+    # keep values of types ClickHouse has precise counterpart for, instead of converting them to str
+    # Decimal -> Decimal(P, S), timedelta -> seconds, set -> Array(LowCardinality(String))
+    precise_types = False
+
+    # {value type: function to convert value with, None - keep value as is}
+    converters = None
+
+    def __init__(self, column_skip, precise_types=False):
         logging.debug("CHWriteConverter __init__()")
         super().__init__(column_skip=column_skip)
+        self.precise_types = precise_types
+        self.converters = {}
+
+    @staticmethod
+    def timedelta_seconds(value):
+        """
+        Convert TIME value into seconds
+        :param value: timedelta
+        :return: int, Decimal in case value has fractional seconds
+        """
+        seconds = value.days * 86400 + value.seconds
+        if value.microseconds:
+            return decimal.Decimal(seconds) + decimal.Decimal(value.microseconds) / 1000000
+        return seconds
+
+    @staticmethod
+    def set_values(value):
+        """
+        Convert SET value into list of values
+        :param value: set
+        :return: sorted list
+        """
+        return sorted(value)
+
+    def converter(self, value_type):
+        """
+        Find function to convert values of the type with, result is cached per type
+        :param value_type: type of value
+        :return: function, None in case values of this type are kept as is
+        """
+        if self.precise_types:
+            if issubclass(value_type, decimal.Decimal):
+                return None
+            if issubclass(value_type, datetime.timedelta):
+                return CHWriteConverter.timedelta_seconds
+            if issubclass(value_type, (set, frozenset)):
+                return CHWriteConverter.set_values
 
-    def column(self, column, value):
         for _type in self.types_to_convert:
-            if isinstance(value, _type):
-                # print("Converting column", column, "of type", type(event.row[column]), event.row[column])
-                return str(value)
-        # print("Using asis column", column, "of type", type(event.row[column]))
-        return value
+            if issubclass(value_type, _type):
+                return str
+        return None
+
+    def column(self, column, value):
+        value_type = type(value)
+        try:
+            convert = self.converters[value_type]
+        except KeyError:
+            convert = self.converters[value_type] = self.converter(value_type)
+        return value if convert is None else convert(value)
 
     def row(self, row):
         """
@@ -65,7 +114,8 @@ class CHWriteConverter(Converter):
                 columns_to_delete.append(column)
 
         # delete columns according to the list of columns to delete
+        # skipped columns may be already absent - say, not decoded by the reader
         for column in columns_to_delete:
-            row.pop(column)
+            row.pop(column, None)
 
         return row
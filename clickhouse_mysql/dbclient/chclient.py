@@ -13,7 +13,8 @@ class CHClient(Client):
     def __init__(self, connection_settings):
         logging.info("CHClient() connection_settings={}".format(connection_settings))
         self.verify_connection_settings(connection_settings)
-        super().__init__(**connection_settings)
+        # not specified settings are left to driver defaults
+        super().__init__(**{name: value for name, value in connection_settings.items() if value is not None})
 
     def verify_connection_settings(self, connection_settings):
         if not connection_settings:
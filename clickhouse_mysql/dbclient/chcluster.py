@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import zlib
+
+from clickhouse_driver import errors
+
+from clickhouse_mysql.dbclient.chclient import CHClient
+
+
+class CHCluster(object):
+    """
+    ClickHouse cluster topology and connections to its shards.
+
+    Topology is read from system.clusters of the server specified in connection settings.
+    Rows are spread over shards according to shards weights - by hash of sharding key columns
+    or round-robin in case no sharding key specified, and are inserted directly into shards.
+    Each shard is written via its first available replica, connections are kept open and re-used.
+    """
+
+    connection_settings = None
+    cluster = None
+
+    # list of columns to calculate sharding key from, None - spread rows round-robin
+    sharding_key = None
+
+    # [
+    #   {'num': 1, 'weight': 1, 'replicas': [('host1', 9000), ('host2', 9000)]},
+    # ]
+    shards = None
+
+    # shard index for each weight unit of each shard
+    slots = None
+
+    # open connections
+    # {
+    #   ('host1', 9000): CHClient,
+    # }
+    clients = None
+
+    def __init__(self, connection_settings, cluster, sharding_key=None):
+        """
+        :param connection_settings: settings of connection to any server of the cluster
+        :param cluster: cluster name as specified in system.clusters. Ex.: cluster1
+        :param sharding_key: list of columns. Ex.: ['id']
+        """
+        self.connection_settings = connection_settings
+        self.cluster = cluster
+        self.sharding_key = sharding_key if sharding_key else None
+        self.clients = {}
+
+    def load(self):
+        """Read cluster topology"""
+        rows = self.client(self.connection_settings['host'], self.connection_settings['port']).execute(
+            'SELECT shard_num, shard_weight, host_name, port FROM system.clusters '
+            'WHERE cluster = %(cluster)s ORDER BY shard_num, replica_num',
+            {'cluster': self.cluster}
+        )
+        if not rows:
+            raise Exception("Cluster {} not found in system.clusters".format(self.cluster))
+
+        self.shards = []
+        for shard_num, shard_weight, host_name, port in rows:
+            if not self.shards or self.shards[-1]['num'] != shard_num:
+                self.shards.append({'num': shard_num, 'weight': shard_weight, 'replicas': []})
+            self.shards[-1]['replicas'].append((host_name, port))
+
+        self.slots = []
+        for index, shard in enumerate(self.shards):
+            self.slots.extend([index] * max(shard['weight'], 1))
+
+        logging.info("CHCluster() cluster=%s shards=%s", self.cluster, self.shards)
+
+    def client(self, host, port):
+        """
+        Get connection to the server, connection is opened once and re-used afterwards
+        :param host: host name
+        :param port: native protocol port
+        :return: CHClient
+        """
+        key = (host, port)
+        if key not in self.clients:
+            connection_settings = dict(self.connection_settings)
+            connection_settings['host'] = host
+            connection_settings['port'] = port
+            self.clients[key] = CHClient(connection_settings)
+        return self.clients[key]
+
+    def split(self, rows, seed=0):
+        """
+        Spread rows over shards
+        :param rows: list of dict
+        :param seed: int, where round-robin starts from - batch-specific value makes split of the batch reproducible
+        :return: {shard index: [row index, ...]}
+        """
+        if self.shards is None:
+            self.load()
+
+        slots = self.slots
+        parts = {}
+        for i, row in enumerate(rows):
+            if self.sharding_key is None:
+                slot = (seed + i) % len(slots)
+            else:
+                key = '\t'.join(str(row.get(column)) for column in self.sharding_key)
+                slot = zlib.crc32(key.encode('utf-8')) % len(slots)
+            parts.setdefault(slots[slot], []).append(i)
+        return parts
+
+    def execute(self, shard, sql, rows, settings=None):
+        """
+        Execute INSERT on the shard. Replicas are tried one by one until one of them accepts rows
+        :param shard: shard index as returned by split()
+        :param sql: INSERT statement
+        :param rows: list of dict
+        :param settings: query settings
+        """
+        last_ex = None
+        for host, port in self.shards[shard]['replicas']:
+            try:
+                return self.client(host, port).execute(sql, rows, settings=settings)
+            except (errors.NetworkError, errors.SocketTimeoutError, EOFError, ConnectionError) as ex:
+                logging.warning("Replica %s:%s of shard %s is not available, try next one. ex=%s",
+                                host, port, self.shards[shard]['num'], ex)
+                last_ex = ex
+        raise last_ex
+
+    def close(self):
+        for client in self.clients.values():
+            client.disconnect()
+        self.clients = {}
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+
+
+class DDLParser(object):
+    """
+    Parse MySQL's ALTER TABLE statements as they come in binlog QueryEvent.
+
+    Columns changes are parsed into specs:
+        {'action': 'add', 'column': 'c', 'type': 'int(11)', 'nullable': True, 'after': 'b', 'first': False}
+        {'action': 'drop', 'column': 'c'}
+        {'action': 'modify', 'column': 'c', 'type': 'bigint(20)', 'nullable': False}
+        {'action': 'change', 'column': 'c', 'new_column': 'd', 'type': 'bigint(20)', 'nullable': True}
+        {'action': 'rename_column', 'column': 'c', 'new_column': 'd'}
+        {'action': 'rename', 'new_table': 't2'}
+    The rest of specs (indexes, partitions, table options) do not change columns and are reported as
+        {'action': 'other', 'sql': 'ADD INDEX ...'}
+    """
+
+    NAME = r'(?:`(?:[^`]|``)+`|[\w$]+)'
+
+    ALTER_TABLE = re.compile(
+        r'^ALTER\s+(?:ONLINE\s+|OFFLINE\s+|IGNORE\s+)*TABLE\s+({0})(?:\s*\.\s*({0}))?(?:\s+(.*))?$'.format(NAME),
+        re.IGNORECASE | re.DOTALL
+    )
+
+    # keywords of ADD/DROP which are not about columns
+    NOT_COLUMN = ('INDEX', 'KEY', 'PRIMARY', 'UNIQUE', 'FULLTEXT', 'SPATIAL', 'FOREIGN', 'CONSTRAINT', 'CHECK', 'PARTITION')
+
+    # keywords which end column type in column definition
+    TYPE_END = (
+        'NULL', 'NOT', 'DEFAULT', 'AUTO_INCREMENT', 'COMMENT', 'AFTER', 'FIRST', 'PRIMARY', 'UNIQUE', 'KEY',
+        'COLLATE', 'CHARACTER', 'CHARSET', 'GENERATED', 'AS', 'ON', 'REFERENCES', 'CHECK', 'VISIBLE', 'INVISIBLE',
+        'STORAGE', 'COLUMN_FORMAT', 'SRID', 'CONSTRAINT', 'VIRTUAL', 'STORED',
+    )
+
+    @staticmethod
+    def parse_alter_table(query, schema=None):
+        """
+        Parse ALTER TABLE statement
+        :param query: SQL statement
+        :param schema: default schema of the statement
+        :return: {'schema': 'db', 'table': 't', 'specs': [spec, ...]} or None in case query is not ALTER TABLE
+        """
+        sql = DDLParser.strip_comments(query).strip().rstrip(';').strip()
+        match = DDLParser.ALTER_TABLE.match(sql)
+        if match is None:
+            return None
+
+        if match.group(2) is not None:
+            schema, table = DDLParser.unquote(match.group(1)), DDLParser.unquote(match.group(2))
+        else:
+            table = DDLParser.unquote(match.group(1))
+
+        return {
+            'schema': schema,
+            'table': table,
+            'specs': [spec for part in DDLParser.split(match.group(3) or '', ',') for spec in DDLParser.parse_spec(part)],
+        }
+
+    @staticmethod
+    def strip_comments(sql):
+        # versioned comments /*!50100 ... */ are executed by MySQL - keep their content
+        sql = re.sub(r'/\*!\d*(.*?)\*/', r'\1', sql, flags=re.DOTALL)
+        return re.sub(r'/\*.*?\*/', ' ', sql, flags=re.DOTALL)
+
+    @staticmethod
+    def unquote(name):
+        if name.startswith('`') and name.endswith('`'):
+            return name[1:-1].replace('``', '`')
+        return name
+
+    @staticmethod
+    def split(sql, separator=None):
+        """
+        Split SQL into parts by separator outside of parentheses and quotes
+        :param sql: string
+        :param separator: char to split by, None - split into tokens by whitespace
+        :return: list of stripped non-empty parts
+        """
+        parts = []
+        part = ''
+        depth = 0
+        quote = None
+        for char in sql:
+            if quote is not None:
+                if char == quote:
+                    quote = None
+            elif char in '\'"`':
+                quote = char
+            elif char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+            elif depth == 0 and (char == separator or (separator is None and char.isspace())):
+                parts.append(part.strip())
+                part = ''
+                continue
+            part += char
+        parts.append(part.strip())
+        return [part for part in parts if part]
+
+    @staticmethod
+    def parse_spec(spec):
+        """
+        Parse one alter specification
+        :param spec: Ex.: ADD COLUMN `c` int(11) AFTER `b`
+        :return: list of specs - ADD COLUMN (c1 type1, c2 type2) adds several columns
+        """
+        tokens = DDLParser.split(spec)
+        keywords = [token.upper() for token in tokens]
+
+        if keywords[0] == 'ADD' and len(tokens) > 1 and keywords[1] not in DDLParser.NOT_COLUMN:
+            start = DDLParser.skip_if_exists(keywords, 2 if keywords[1] == 'COLUMN' else 1)
+            if tokens[start].startswith('('):
+                # ADD COLUMN (c1 type1, c2 type2)
+                return [dict(DDLParser.parse_column(column), action='add') for column in DDLParser.split(tokens[start][1:-1], ',')]
+            return [dict(DDLParser.parse_column(' '.join(tokens[start:])), action='add')]
+
+        if keywords[0] == 'DROP' and len(tokens) > 1 and keywords[1] not in DDLParser.NOT_COLUMN:
+            start = DDLParser.skip_if_exists(keywords, 2 if keywords[1] == 'COLUMN' else 1)
+            return [{'action': 'drop', 'column': DDLParser.unquote(tokens[start])}]
+
+        if keywords[0] == 'MODIFY' and len(tokens) > 1:
+            start = DDLParser.skip_if_exists(keywords, 2 if keywords[1] == 'COLUMN' else 1)
+            return [dict(DDLParser.parse_column(' '.join(tokens[start:])), action='modify')]
+
+        if keywords[0] == 'CHANGE' and len(tokens) > 2:
+            start = DDLParser.skip_if_exists(keywords, 2 if keywords[1] == 'COLUMN' else 1)
+            column = DDLParser.parse_column(' '.join(tokens[start + 1:]))
+            return [{
+                'action': 'change',
+                'column': DDLParser.unquote(tokens[start]),
+                'new_column': column['column'],
+                'type': column['type'],
+                'nullable': column['nullable'],
+                'after': column['after'],
+                'first': column['first'],
+            }]
+
+        if keywords[0] == 'RENAME' and len(tokens) > 3 and keywords[1] == 'COLUMN':
+            return [{'action': 'rename_column', 'column': DDLParser.unquote(tokens[2]), 'new_column': DDLParser.unquote(tokens[4])}]
+
+        if keywords[0] == 'RENAME' and len(tokens) > 1 and keywords[1] not in ('INDEX', 'KEY'):
+            start = 2 if keywords[1] in ('TO', 'AS') else 1
+            return [{'action': 'rename', 'new_table': DDLParser.unquote(tokens[start].split('.')[-1])}]
+
+        return [{'action': 'other', 'sql': spec}]
+
+    @staticmethod
+    def skip_if_exists(keywords, start):
+        """
+        Skip IF EXISTS / IF NOT EXISTS in front of column name, as MariaDB allows
+        :param keywords: list of upper-cased tokens of alter specification
+        :param start: position of IF, if any
+        :return: position of column name
+        """
+        if keywords[start:start + 2] == ['IF', 'EXISTS']:
+            return start + 2
+        if keywords[start:start + 3] == ['IF', 'NOT', 'EXISTS']:
+            return start + 3
+        return start
+
+    @staticmethod
+    def parse_column(definition):
+        """
+        Parse column definition
+        :param definition: Ex.: `c` int(10) unsigned NOT NULL DEFAULT '0' AFTER `b`
+        :return: {'column': 'c', 'type': 'int(10) unsigned', 'nullable': False, 'after': 'b', 'first': False}
+        """
+        tokens = DDLParser.split(definition)
+        keywords = [token.upper() for token in tokens]
+
+        end = 1
+        while end < len(tokens) and keywords[end] not in DDLParser.TYPE_END:
+            end += 1
+
+        nullable = True
+        after = None
+        for i in range(end, len(tokens)):
+            if keywords[i] == 'NOT' and i + 1 < len(tokens) and keywords[i + 1] == 'NULL':
+                nullable = False
+            elif keywords[i] == 'PRIMARY':
+                nullable = False
+            elif keywords[i] == 'AFTER' and i + 1 < len(tokens):
+                after = DDLParser.unquote(tokens[i + 1])
+
+        return {
+            'column': DDLParser.unquote(tokens[0]),
+            'type': ' '.join(tokens[1:end]),
+            'nullable': nullable,
+            'after': after,
+            'first': 'FIRST' in keywords[end:],
+        }
@@ -1,14 +1,21 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-from datetime import datetime
+
 
 class Event(object):
+    """
+    Rows payload with meta-information, passed from readers through pool to writers.
+
+    Events are created for each binlog event (or even each row). Attributes default to None on class level,
+    thus event keeps in its own dict attributes which are set only - CPython 3.11+ stores such dict inline,
+    in one allocation with the object. Rows are iterated with a generator, no iterator state is kept in the event.
+    """
 
     # main payload - one or multiple rows
-    
+
     # Timestamp to know when the event arrive.
     ts = None
-    
+
     # native mysql replication event
     # one of from pymysqlreplication.row_event import
     # contains rows internally
@@ -31,6 +38,15 @@ class Event(object):
     # table name
     table = None
 
+    # binlog file event is read from, position within the file is in pymysqlreplication_event.packet.log_pos
+    log_file = None
+
+    # name of the source event is read from, None - the only source
+    source = None
+
+    # (segment sequence number, frame index) of the event in write-ahead log, None - event is not in the log
+    wal_position = None
+
     # primary key
     primary_key = None
 
@@ -40,46 +56,50 @@ class Event(object):
     # ['id', 'col1', 'col2']
     fieldnames = None
 
-    # payload rows iterator
-    _iter = None
+    # DDL statement which changed table schema
+    query = None
+
+    # parsed ALTER TABLE statement, as returned by DDLParser.parse_alter_table()
+    alter = None
+
+    def copy(self):
+        """
+        Shallow copy of the event
+        :return: Event
+        """
+        event = Event()
+        event.__dict__.update(self.__dict__)
+        return event
 
     def __iter__(self):
-        # create payload rows iterator
+        # payload rows iterator, rows are materialized one by one as they are fetched
 
         if self.pymysqlreplication_event is not None:
             # we have native replication event - would iterate over its rows
-            self._iter = iter(self.pymysqlreplication_event.rows)
+            # in native replication event actual data are in row['values'] dict item
+            return (item['after_values'] if 'after_values' in item else item['values'] for item in self.pymysqlreplication_event.rows)
 
         elif self.row is not None:
-            # we have one row - would iterate over list of one row
-            self._iter = iter([self.row])
+            # we have one row - would iterate over tuple of one row
+            return iter((self.row,))
 
         else:
             # assume multiple rows - would iterate over them
-            self._iter = iter(self.rows)
-
-        return self
-
-    def __next__(self):
-        # fetch next item from iterator
-
-        item = next(self._iter)
-
-        if self.pymysqlreplication_event is not None:
-            # in native replication event actual data are in row['values'] dict item
-            if 'after_values' in item:
-                return item['after_values']
-            else:
-                return item['values']
-            
-        else:
-            # local-kept data
-            return item
+            return iter(self.rows)
 
     def convert(self, converter):
         self.row = converter.row(self.row)
         self.rows = converter.rows(self.rows)
 
+        if self.pymysqlreplication_event is not None:
+            # native replication event rows are converted in place
+            for item in self.pymysqlreplication_event.rows:
+                for values in ('values', 'before_values', 'after_values'):
+                    if values in item:
+                        item[values] = converter.row(item[values])
+
+        return self
+
     def first_row(self):
         return next(iter(self or []), None)
 
@@ -9,7 +9,6 @@ import traceback
 import pprint
 import json
 import os
-import pkg_resources
 import shutil
 
 if sys.version_info < (3, 4):
@@ -20,6 +19,9 @@ from clickhouse_mysql.clioptions import CLIOptions
 from clickhouse_mysql.pumper import Pumper
 from clickhouse_mysql.daemon import Daemon
 from clickhouse_mysql.config import Config
+from clickhouse_mysql.util import Util
+from clickhouse_mysql.tracer import Tracer
+from clickhouse_mysql.profiler import Profiler
 
 
 class Main(Daemon):
@@ -57,8 +59,7 @@ class Main(Daemon):
     @staticmethod
     def install():
         # install service file
-        src_service_filepath = os.path.abspath(
-            pkg_resources.resource_filename('clickhouse_mysql', '../clickhouse_mysql.init.d/clickhouse-mysql'))
+        src_service_filepath = Util.package_file('../clickhouse_mysql.init.d/clickhouse-mysql')
         dst_service_dir = '/etc/init.d/'
         dst_service_filepath = dst_service_dir + 'clickhouse-mysql'
         try:
@@ -72,8 +73,7 @@ class Main(Daemon):
             sys.exit(1)
 
         # install config example file
-        src_service_filepath = os.path.abspath(
-            pkg_resources.resource_filename('clickhouse_mysql', '../clickhouse_mysql.etc/clickhouse-mysql.conf'))
+        src_service_filepath = Util.package_file('../clickhouse_mysql.etc/clickhouse-mysql.conf')
         dst_service_dir = '/etc/clickhouse-mysql/'
         dst_service_filepath = dst_service_dir + 'clickhouse-mysql-example.conf'
         try:
@@ -142,14 +142,33 @@ class Main(Daemon):
 
             # pump data to Clickhouse
             if self.config.is_pump_data():
+                reader = self.config.reader()
                 pumper = Pumper(
-                    reader=self.config.reader(),
+                    reader=reader,
                     writer=self.config.writer(),
                 )
 
+                if self.config.is_dst_alter_table():
+                    # subscribed after pumper - rows read before ALTER TABLE are written before table is altered
+                    reader.subscribe({'SchemaChangeEvent': self.config.table_migrator().schema_change_event})
+
                 signal.signal(signal.SIGINT, pumper.exit_gracefully)
                 signal.signal(signal.SIGTERM, pumper.exit_gracefully)
 
+                # stage timings tracing, can be switched on/off at runtime
+                Tracer.setup(
+                    sample_rate=self.config.trace_sample_rate(),
+                    report_interval=self.config.trace_report_interval(),
+                )
+                signal.signal(signal.SIGUSR2, Tracer.toggle)
+
+                # sampling profiler, started on demand
+                Profiler.setup(
+                    duration=self.config.profile_duration(),
+                    dir=self.config.profile_dir(),
+                )
+                signal.signal(signal.SIGUSR1, Profiler.toggle)
+
                 pumper.run()
 
         except Exception as ex:
@@ -2,6 +2,14 @@
 # -*- coding: utf-8 -*-
 
 
+class HandlerError(Exception):
+    """
+    Raised by event handler which is unable to handle the event.
+    Reader stops instead of skipping the event, so the event is read again after restart
+    """
+    pass
+
+
 class Observable(object):
     """
     Implements Observable pattern
@@ -13,6 +21,11 @@ class Observable(object):
         'Event2': [],
     }
 
+    def __init__(self, callbacks={}):
+        # class-level event_handlers lists events only - each observable has its own subscribers
+        self.event_handlers = {event_name: [] for event_name in self.event_handlers}
+        self.subscribe(callbacks)
+
     def subscribe(self, event_handlers):
         # event_handlers has the same structure as self.event_handlers
 
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import math
+
+
+class AIMDBatchSizer(object):
+    """
+    Per-belt bucket size controller, additive increase / multiplicative decrease.
+
+    Each flush of a bucket reports its latency and whether it succeeded.
+    Failed flush or flush slower than target latency cuts belt's bucket size by decrease factor,
+    full bucket flushed within target latency grows it by increase step.
+    Buckets flushed by time, not being full, say nothing about whether bucket can be bigger - size is kept.
+    Thus each belt converges to the biggest bucket its destination writes within target latency.
+    """
+
+    min_size = None
+    max_size = None
+    target_latency = None
+    decrease_factor = 0.5
+    increase_step = None
+
+    # current bucket size of each belt
+    # {
+    #   'db.table1': 10000,
+    #   'db.table2': 1250,
+    # }
+    sizes = None
+
+    def __init__(self, min_size=100, max_size=10000, target_latency=1.0, decrease_factor=0.5, increase_steps=10):
+        """
+        :param min_size: min bucket size
+        :param max_size: max bucket size, belts start with it
+        :param target_latency: seconds, max flush latency
+        :param decrease_factor: bucket size multiplier on failed or slow flush
+        :param increase_steps: number of fast flushes to grow bucket from min to max size
+        """
+        self.min_size = max(1, min(min_size, max_size))
+        self.max_size = max_size
+        self.target_latency = target_latency
+        self.decrease_factor = decrease_factor
+        self.increase_step = max(1, math.ceil((self.max_size - self.min_size) / increase_steps))
+        self.sizes = {}
+
+    def size(self, key):
+        """
+        Current bucket size of the belt
+        :param key: belt index
+        :return: int
+        """
+        return self.sizes.get(key, self.max_size)
+
+    def update(self, key, items_num, latency, ok=True):
+        """
+        Adjust bucket size of the belt after its bucket is flushed
+        :param key: belt index
+        :param items_num: number of items in flushed bucket
+        :param latency: seconds flush took
+        :param ok: whether flush succeeded
+        """
+        size = self.size(key)
+
+        if not ok or latency > self.target_latency:
+            new_size = max(self.min_size, int(size * self.decrease_factor))
+        elif items_num >= size:
+            new_size = min(self.max_size, size + self.increase_step)
+        else:
+            new_size = size
+
+        if new_size != size:
+            logging.info('batch size index:%s %d -> %d latency:%f ok:%s', str(key), size, new_size, latency, ok)
+        self.sizes[key] = new_size
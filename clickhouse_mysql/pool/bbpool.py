@@ -3,9 +3,15 @@
 
 import time
 import logging
+import os
+import re
+import tempfile
 
 from clickhouse_mysql.pool.pool import Pool
+from clickhouse_mysql.pool.segment import Segment
 from clickhouse_mysql.objectbuilder import ObjectBuilder
+from clickhouse_mysql.tracer import Tracer
+from clickhouse_mysql.observable import HandlerError
 from pymysqlreplication.row_event import WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent
 
 
@@ -14,6 +20,9 @@ class BBIndexGenerator(object):
 
     def generate(self, item):
         # build key of the belt on which to place item
+        if item.source is not None:
+            # the same table may come from several sources, each source has its own belt
+            return str(item.source) + ':' + str(item.schema) + '.' + str(item.table)
         return str(item.schema) + '.' + str(item.table)
 
 
@@ -35,6 +44,20 @@ class BBPool(Pool):
     buckets_num_total = 0
     items_num_total = 0
 
+    # number of items kept in memory (not spilled) by all belts
+    items_num_in_memory = 0
+
+    # spill buckets waiting for flush to disk when pool keeps more items in memory, None - do not spill
+    spill_threshold = None
+    spill_dir = None
+    segments_num_total = 0
+
+    # write-ahead log, flushed items are acknowledged in it. None - no log
+    wal = None
+
+    # adjusts bucket size of each belt by flush latency, None - buckets are of max_bucket_size
+    batch_sizer = None
+
     prev_time = None
     prev_buckets_count = 0
     prev_items_count = 0
@@ -46,7 +69,26 @@ class BBPool(Pool):
             max_bucket_size=10000,
             max_belt_size=1,
             max_interval_between_rotations=60,
+            spill_threshold=None,
+            spill_dir=None,
+            wal=None,
+            batch_sizer=None,
     ):
+        """
+        :param spill_threshold: max number of items to be kept in memory. When exceeded, buckets waiting for flush
+            are spilled to disk. Buckets failed to flush are kept in pool and are flushed again (in order) on next
+            rotation. None - do not spill, do not keep failed buckets
+        :param spill_dir: dir for spilled buckets. None - temp dir
+        :param wal: WAL to acknowledge flushed items in
+        :param batch_sizer: AIMDBatchSizer to adjust bucket size of each belt by. None - buckets are of max_bucket_size
+        """
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir
+        self.wal = wal
+        self.batch_sizer = batch_sizer
+        # each pool has its own belts
+        self.belts = {}
+        self.belts_rotated_at = {}
         super().__init__(
             writer_builder=writer_builder,
             key_builder=ObjectBuilder(class_name=BBIndexGenerator),
@@ -63,6 +105,8 @@ class BBPool(Pool):
 
     def insert(self, item):
         """Insert item into pool"""
+        started = Tracer.start()
+
         # which belt we'll insert item?
         belt_index = self.key_generator.generate(item)
 
@@ -72,26 +116,39 @@ class BBPool(Pool):
 
         # append item to the 0-indexed bucket of the specified belt
         self.belts[belt_index][0].append(item)
+        self.items_num_in_memory += 1
 
         # try to rotate belt - may it it already should be rotated
         self.rotate_belt(belt_index)
 
-    def flush(self, key=None):
-        """Flush all buckets from the belt and delete the belt itself"""
+        if (self.spill_threshold is not None) and (self.items_num_in_memory > self.spill_threshold):
+            self.spill()
+
+        Tracer.stop('pool.insert', started)
+
+    def flush(self, key=None, force=False):
+        """
+        Flush all buckets from the belt and delete the belt itself
+        :param key: belt index, None - all belts
+        :param force: flush belts right now, even those which do not need rotation yet
+        """
 
         belt_index = key
         empty_belts_indexes = []
 
         if belt_index is None:
             for b_index in self.belts:
-                if self.rotate_belt(b_index, flush=False):
+                if self.rotate_belt(b_index, flush=force):
                     empty_belts_indexes.append(b_index)
-        else:
-            if self.rotate_belt(belt_index, flush=False):
+        elif belt_index in self.belts:
+            if self.rotate_belt(belt_index, flush=force):
                 empty_belts_indexes.append(belt_index)
 
         # delete belt
         for b_index in empty_belts_indexes:
+            if len(self.belts[b_index]) > 1 or len(self.belts[b_index][0]) > 0:
+                # belt still has buckets to be flushed
+                continue
             self.belts.pop(b_index)
             self.belts_rotated_at.pop(b_index)
 
@@ -104,7 +161,7 @@ class BBPool(Pool):
             # explicit flush requested
             rotate_reason = "FLUSH"
 
-        elif len(self.belts[belt_index][0]) >= self.max_bucket_size:
+        elif len(self.belts[belt_index][0]) >= self.bucket_size(belt_index):
             # 0-index bucket is full
             rotate_reason = "SIZE"
 
@@ -118,8 +175,10 @@ class BBPool(Pool):
 
         # belt(s) needs rotation
 
-        # insert empty bucket into the beginning of the belt
-        self.belts[belt_index].insert(0, [])
+        # insert empty bucket into the beginning of the belt, unless it is there already -
+        # rotations while destination is not available would pile empty buckets up otherwise
+        if len(self.belts[belt_index][0]) > 0:
+            self.belts[belt_index].insert(0, [])
         self.belts_rotated_at[belt_index] = now
 
         # in case we flush belt we'll keep one just inserted empty bucket
@@ -130,7 +189,22 @@ class BBPool(Pool):
             # time to rotate belt and flush the most-right-bucket
 
             buckets_on_belt_num = len(self.belts[belt_index])
-            most_right_bucket_size = len(self.belts[belt_index][buckets_on_belt_num-1])
+            most_right_bucket = self.belts[belt_index][buckets_on_belt_num-1]
+            most_right_bucket_size = len(most_right_bucket)
+
+            # time to flush data for specified key
+            #self.writer_builder.param('csv_file_path_suffix_parts', [str(int(now)), str(self.buckets_num_total)])
+            started = Tracer.start_batch()
+            flushed = self.flush_bucket(most_right_bucket, belt_index)
+            Tracer.stop('pool.flush', started)
+
+            if not flushed:
+                # destination is not available - keep the bucket and the rest of the belt, try again on next rotation
+                break
+
+            self.belts[belt_index].pop()
+            if not isinstance(most_right_bucket, Segment):
+                self.items_num_in_memory -= most_right_bucket_size
 
             self.buckets_num_total += 1
             self.items_num_total += most_right_bucket_size
@@ -146,15 +220,6 @@ class BBPool(Pool):
                  len(self.belts),
             )
 
-            # time to flush data for specified key
-            #self.writer_builder.param('csv_file_path_suffix_parts', [str(int(now)), str(self.buckets_num_total)])
-            writer = self.writer_builder.new()
-            writer.insert(self.belts[belt_index].pop())
-            writer.close()
-            writer.push()
-            writer.destroy()
-            del writer
-
         if self.prev_time is not None:
             # have previous time - meaning this is at least second rotate
             # can calculate belt speed
@@ -177,3 +242,73 @@ class BBPool(Pool):
 
         # belt rotated
         return True
+
+    def bucket_size(self, belt_index):
+        """Max number of items in the bucket of the belt"""
+        return self.max_bucket_size if self.batch_sizer is None else self.batch_sizer.size(belt_index)
+
+    def flush_bucket(self, bucket, belt_index=None):
+        """
+        Write bucket with a new writer
+        :param bucket: list of items or Segment
+        :param belt_index: belt the bucket is from
+        :return: bool is bucket written
+        """
+        items = bucket.read() if isinstance(bucket, Segment) else bucket
+
+        started = time.time()
+        try:
+            writer = self.writer_builder.new()
+            writer.insert(items)
+            writer.close()
+            writer.push()
+            writer.destroy()
+            del writer
+        except HandlerError:
+            # writer can not go on at all - retry on next rotation would not help
+            raise
+        except Exception as ex:
+            if self.batch_sizer is not None:
+                self.batch_sizer.update(belt_index, len(items), time.time() - started, ok=False)
+            if self.spill_threshold is None:
+                # failed buckets are not kept
+                raise
+            logging.error("Unable to flush bucket of %d items, keep it in pool", len(items))
+            logging.exception(ex)
+            return False
+
+        if self.batch_sizer is not None:
+            self.batch_sizer.update(belt_index, len(items), time.time() - started)
+
+        if self.wal is not None:
+            self.wal.ack(items)
+
+        if isinstance(bucket, Segment):
+            bucket.remove()
+
+        return True
+
+    def spill(self):
+        """Move buckets waiting for flush from memory to disk"""
+
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix='clickhouse-mysql-spill-')
+        os.makedirs(self.spill_dir, exist_ok=True)
+
+        for belt_index in self.belts:
+            belt = self.belts[belt_index]
+            # 0-index bucket is being filled, the rest are waiting for flush
+            for i in range(1, len(belt)):
+                if isinstance(belt[i], Segment) or len(belt[i]) == 0:
+                    continue
+
+                self.segments_num_total += 1
+                segment = Segment(os.path.join(
+                    self.spill_dir,
+                    '{}.{:012d}.seg'.format(re.sub(r'[^\w.-]', '_', str(belt_index)), self.segments_num_total)
+                ))
+                segment.append(belt[i])
+                self.items_num_in_memory -= len(belt[i])
+                belt[i] = segment
+
+                logging.info('spill index:%s bktsize:%d path:%s', str(belt_index), len(segment), segment.path)
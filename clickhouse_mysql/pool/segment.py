@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import pickle
+import struct
+import zlib
+
+from types import SimpleNamespace
+
+
+class Segment(object):
+    """
+    Events stored in a file on disk.
+
+    File is a sequence of frames, each frame is one event:
+        4-byte little-endian length of compressed data
+        zlib-compressed pickled event
+    Events are read back in the same order they were appended.
+    """
+
+    FRAME_HEADER = struct.Struct('<I')
+
+    # zlib compression level, fast compression is good enough for rows data
+    COMPRESSION_LEVEL = 1
+
+    path = None
+
+    # number of events in segment
+    size = 0
+
+    def __init__(self, path):
+        """
+        :param path: path to segment file. Ex.: /tmp/spill/db.table.000000000001.seg
+        """
+        self.path = path
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, items):
+        """
+        Append events to segment file
+        :param items: list of Event
+        """
+        with open(self.path, 'ab') as f:
+            for item in items:
+                f.write(Segment.frame(item))
+            f.flush()
+        self.size += len(items)
+
+    @staticmethod
+    def frame(item):
+        """
+        Build frame of the event
+        :param item: Event
+        :return: bytes
+        """
+        data = zlib.compress(
+            pickle.dumps(Segment.detach(item), protocol=pickle.HIGHEST_PROTOCOL),
+            Segment.COMPRESSION_LEVEL
+        )
+        return Segment.FRAME_HEADER.pack(len(data)) + data
+
+    def read(self):
+        """
+        Read all events from segment file
+        :return: list of Event
+        """
+        items = []
+        with open(self.path, 'rb') as f:
+            while True:
+                header = f.read(Segment.FRAME_HEADER.size)
+                if len(header) < Segment.FRAME_HEADER.size:
+                    # end of file (or incomplete frame of interrupted write)
+                    break
+                length, = Segment.FRAME_HEADER.unpack(header)
+                data = f.read(length)
+                if len(data) < length:
+                    break
+                items.append(pickle.loads(zlib.decompress(data)))
+        return items
+
+    def remove(self):
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+        self.size = 0
+
+    @staticmethod
+    def detach(event):
+        """
+        Build picklable copy of the event.
+        pymysqlreplication event is replaced with a copy of the same class which has decoded rows and
+        attributes used by writers only - no packet, no connection, no table map
+        :param event: Event
+        :return: Event
+        """
+        mysql_event = event.pymysqlreplication_event
+        if mysql_event is None:
+            return event
+
+        detached_mysql_event = mysql_event.__class__.__new__(mysql_event.__class__)
+        detached_mysql_event.__dict__.update({
+            # RowsEvent.rows returns these rows without decoding
+            '_RowsEvent__rows': mysql_event.rows,
+            'schema': mysql_event.schema,
+            'table': mysql_event.table,
+            'timestamp': mysql_event.timestamp,
+            'packet': SimpleNamespace(log_pos=mysql_event.packet.log_pos),
+        })
+
+        detached = event.copy()
+        detached.pymysqlreplication_event = detached_mysql_event
+        return detached
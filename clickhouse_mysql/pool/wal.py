@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import struct
+import threading
+
+from clickhouse_mysql.pool.segment import Segment
+
+
+class WAL(object):
+    """
+    Write-ahead log of events passed to the pool.
+
+    Events are appended to the log before they are placed into the pool, thus before reader moves
+    its binlog position forward. Log is a dir of append-only segments, segment is rotated each max_segment_size events.
+    Events are acknowledged after they are flushed by writers - indexes of acknowledged events are appended
+    to segment's ack file. Segment is removed as soon as all its events are acknowledged.
+    Events left in the log and not acknowledged are replayed on start.
+
+    Appended events are flushed to OS right away and survive process crash. Completed segments are fsync-ed,
+    events of the current segment survive OS crash or power loss only with fsync enabled - each batch
+    of appended events is fsync-ed then.
+
+    Events may be appended and acknowledged by different threads.
+    """
+
+    SEGMENT_SUFFIX = '.wal'
+    ACK_SUFFIX = '.ack'
+
+    # ack file is a sequence of 4-byte little-endian indexes of acknowledged events
+    ACK_INDEX = struct.Struct('<I')
+
+    # dir of segment files
+    path = None
+
+    # max number of events in one segment
+    max_segment_size = None
+
+    # fsync each batch of appended events
+    fsync = False
+
+    # current segment - the one events are appended to
+    segment_seq = 0
+    segment_file = None
+    segment_size = 0
+
+    # number of not acknowledged events per segment
+    # {
+    #   1: 0,
+    #   2: 1234,
+    # }
+    pending = None
+
+    # guards segments and pending
+    lock = None
+
+    def __init__(self, path, max_segment_size=10000, fsync=False):
+        """
+        :param path: dir of segment files. Ex.: /var/lib/clickhouse-mysql/wal
+        :param max_segment_size: max number of events in one segment
+        :param fsync: fsync each batch of appended events, see sync()
+        """
+        self.path = path
+        self.max_segment_size = max_segment_size
+        self.fsync = fsync
+        self.pending = {}
+        self.lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+    def segment_path(self, seq):
+        return os.path.join(self.path, '{:012d}{}'.format(seq, WAL.SEGMENT_SUFFIX))
+
+    def ack_path(self, seq):
+        return os.path.join(self.path, '{:012d}{}'.format(seq, WAL.ACK_SUFFIX))
+
+    def acked(self, seq):
+        """
+        Read indexes of acknowledged events of the segment
+        :param seq: sequence number of segment
+        :return: set of indexes
+        """
+        if not os.path.isfile(self.ack_path(seq)):
+            return set()
+
+        with open(self.ack_path(seq), 'rb') as f:
+            data = f.read()
+        # incomplete index of interrupted write is ignored
+        size = len(data) - len(data) % WAL.ACK_INDEX.size
+        return set(index for index, in WAL.ACK_INDEX.iter_unpack(data[:size]))
+
+    def replay(self):
+        """
+        Read events left in the log by previous run and not acknowledged, in the order they were appended.
+        Events stay in the log until acknowledged
+        :return: list of Event
+        """
+        events = []
+        for name in sorted(os.listdir(self.path)):
+            if not name.endswith(WAL.SEGMENT_SUFFIX):
+                continue
+
+            seq = int(name[:-len(WAL.SEGMENT_SUFFIX)])
+            self.segment_seq = max(self.segment_seq, seq)
+
+            acked = self.acked(seq)
+            items = Segment(self.segment_path(seq)).read()
+
+            self.pending[seq] = 0
+            for index, item in enumerate(items):
+                if index in acked:
+                    continue
+                item.wal_position = (seq, index)
+                self.pending[seq] += 1
+                events.append(item)
+
+            self.truncate(seq)
+
+        logging.info("WAL %s has %d events to replay", self.path, len(events))
+        return events
+
+    def rotate(self):
+        """Close current segment and start new one"""
+        if self.segment_file is not None:
+            # completed segment is on disk, even without fsync of each batch
+            self.segment_file.flush()
+            os.fsync(self.segment_file.fileno())
+            self.segment_file.close()
+            self.segment_file = None
+            self.truncate(self.segment_seq)
+
+        self.segment_seq += 1
+        self.segment_file = open(self.segment_path(self.segment_seq), 'ab')
+        self.segment_size = 0
+        self.pending[self.segment_seq] = 0
+
+    def append(self, event):
+        """
+        Append event to the log
+        :param event: Event
+        """
+        frame = Segment.frame(event)
+        with self.lock:
+            if (self.segment_file is None) or (self.segment_size >= self.max_segment_size):
+                self.rotate()
+
+            self.segment_file.write(frame)
+            # written data survives process crash
+            self.segment_file.flush()
+
+            event.wal_position = (self.segment_seq, self.segment_size)
+            self.segment_size += 1
+            self.pending[self.segment_seq] += 1
+
+    def sync(self):
+        """Complete batch of appended events - fsync it in case fsync is enabled"""
+        with self.lock:
+            if self.fsync and self.segment_file is not None:
+                os.fsync(self.segment_file.fileno())
+
+    def ack(self, events):
+        """
+        Acknowledge events are flushed by writer and are not needed in the log anymore
+        :param events: list of Event
+        """
+
+        # segment sequence number -> indexes of acknowledged events
+        indexes = {}
+        for event in events:
+            if event.wal_position is None:
+                continue
+            seq, index = event.wal_position
+            event.wal_position = None
+            indexes.setdefault(seq, []).append(index)
+
+        with self.lock:
+            for seq in indexes:
+                with open(self.ack_path(seq), 'ab') as f:
+                    f.write(b''.join(WAL.ACK_INDEX.pack(index) for index in indexes[seq]))
+                self.pending[seq] -= len(indexes[seq])
+                self.truncate(seq)
+
+    def truncate(self, seq):
+        """
+        Remove segment in case all its events are acknowledged
+        :param seq: sequence number of segment
+        """
+        if self.pending.get(seq) != 0:
+            return
+
+        if (seq == self.segment_seq) and (self.segment_file is not None):
+            # events are still appended to this segment
+            return
+
+        os.remove(self.segment_path(seq))
+        if os.path.isfile(self.ack_path(seq)):
+            os.remove(self.ack_path(seq))
+        del self.pending[seq]
+
+    def close(self):
+        with self.lock:
+            if self.segment_file is not None:
+                self.segment_file.close()
+                self.segment_file = None
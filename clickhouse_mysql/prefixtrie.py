@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+class PrefixTrie(object):
+    """
+    Prefix tree over a set of string prefixes.
+    Answers 'does string start with any of known prefixes' in O(len(string))
+    instead of O(number of prefixes) str.startswith() calls
+    """
+
+    # key which marks a node where one of the prefixes ends
+    # can not clash with chars, because each char key has len() == 1
+    TERMINAL = ''
+
+    root = None
+
+    def __init__(self, prefixes=None):
+        """
+        :param prefixes: iterable of string prefixes. Ex.: ['log_', 'performance_log_']
+        """
+        self.root = {}
+        if prefixes is not None:
+            for prefix in prefixes:
+                self.add(prefix)
+
+    def add(self, prefix):
+        """
+        Add prefix into the tree
+        :param prefix: string prefix
+        """
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[self.TERMINAL] = True
+
+    def match(self, string):
+        """
+        Check whether string starts with any of the prefixes added into the tree
+        :param string: string to check. Ex.: 'log_2017_12_27'
+        :return: bool
+        """
+        node = self.root
+        if self.TERMINAL in node:
+            # empty prefix matches everything
+            return True
+
+        for char in string:
+            node = node.get(char)
+            if node is None:
+                # no prefix continues with this char
+                return False
+            if self.TERMINAL in node:
+                # one of the prefixes ends here
+                return True
+
+        return False
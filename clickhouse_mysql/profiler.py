@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from clickhouse_mysql.tracer import Tracer
+
+
+class Profiler(object):
+    """
+    On-demand sampling profiler of the running process.
+
+    When started, profiler thread samples stacks of all threads of the process each SAMPLE_INTERVAL seconds
+    for duration seconds, while Tracer collects per-stage timings of reader, converters, pool and writers.
+    Afterwards two files are written into profile dir:
+        <prefix>.folded - collapsed stacks, one line per stack: thread;outer function;...;inner function samples_num
+            ready for flamegraph.pl or speedscope
+        <prefix>.txt - functions with most samples (own and inclusive) and per-stage timings
+    Samples are wall-clock - threads waiting for data are sampled as well, so waits are visible too.
+    Nothing is changed in the way data is read and written, thus replication goes on while profiling.
+
+    Usage:
+        signal.signal(signal.SIGUSR1, Profiler.toggle)
+    """
+
+    SAMPLE_INTERVAL = 0.01
+
+    # number of functions listed in the report
+    TOP_FUNCTIONS_NUM = 50
+
+    # profile for N seconds
+    duration = 30
+
+    # dir to write profiles into
+    dir = None
+
+    thread = None
+    stop_requested = None
+
+    @staticmethod
+    def setup(duration=30, dir=None):
+        """
+        Configure profiler
+        :param duration: profile for N seconds
+        :param dir: dir to write profiles into, None - temp dir
+        """
+        Profiler.duration = duration
+        Profiler.dir = dir if dir else tempfile.gettempdir()
+
+    @staticmethod
+    def toggle(signum=None, frame=None):
+        """Start profiling, or stop it earlier in case it is running. Has signal handler signature"""
+        if Profiler.thread is not None and Profiler.thread.is_alive():
+            Profiler.stop_requested.set()
+            return
+
+        Profiler.stop_requested = threading.Event()
+        Profiler.thread = threading.Thread(target=Profiler.run, name='profiler', daemon=True)
+        Profiler.thread.start()
+
+    @staticmethod
+    def run():
+        # profiler thread body
+        logging.info("Profiling started for %d sec", Profiler.duration)
+
+        # stage timings are collected while profiling, in case tracing is not enabled already
+        tracing = Tracer.enabled
+        if not tracing:
+            Tracer.enable()
+
+        # {
+        #   ('thread name', 'outer function', ..., 'inner function'): samples num,
+        # }
+        stacks = {}
+        samples_num = 0
+        own_ident = threading.get_ident()
+        started = time.time()
+        deadline = started + Profiler.duration
+
+        while time.time() < deadline and not Profiler.stop_requested.wait(Profiler.SAMPLE_INTERVAL):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append('{} ({}:{})'.format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                stack = tuple(reversed(stack))
+                stacks[stack] = stacks.get(stack, 0) + 1
+            samples_num += 1
+
+        prefix = os.path.join(Profiler.dir, 'clickhouse-mysql-profile-{}-{}'.format(os.getpid(), time.strftime('%Y%m%d-%H%M%S')))
+        try:
+            Profiler.write(prefix, stacks, samples_num, time.time() - started)
+            logging.info("Profiling completed, %d samples written to %s.folded and %s.txt", samples_num, prefix, prefix)
+        except Exception as ex:
+            logging.error("Unable to write profile %s", prefix)
+            logging.exception(ex)
+
+        if not tracing:
+            Tracer.disable()
+
+    @staticmethod
+    def write(prefix, stacks, samples_num, duration):
+        """
+        Write profile files
+        :param prefix: path prefix of files
+        :param stacks: dict of stack -> samples num
+        :param samples_num: number of samples taken
+        :param duration: seconds profiled
+        """
+        with open(prefix + '.folded', 'w') as f:
+            for stack in sorted(stacks):
+                f.write('{} {}\n'.format(';'.join(stack), stacks[stack]))
+
+        # function -> samples num, where function is the innermost one (own) or anywhere in the stack (inclusive)
+        own = {}
+        inclusive = {}
+        for stack, num in stacks.items():
+            # first item is thread name
+            own[stack[-1]] = own.get(stack[-1], 0) + num
+            for function in set(stack[1:]):
+                inclusive[function] = inclusive.get(function, 0) + num
+
+        # Tracer may still be updated by other threads
+        stages = Tracer.snapshot()
+
+        with open(prefix + '.txt', 'w') as f:
+            f.write('samples: {} duration: {:.3f} sec interval: {} sec\n'.format(samples_num, duration, Profiler.SAMPLE_INTERVAL))
+
+            f.write('\nfunctions by own samples:\n')
+            for function in sorted(own, key=own.get, reverse=True)[:Profiler.TOP_FUNCTIONS_NUM]:
+                f.write('{:>10} {}\n'.format(own[function], function))
+
+            f.write('\nfunctions by inclusive samples:\n')
+            for function in sorted(inclusive, key=inclusive.get, reverse=True)[:Profiler.TOP_FUNCTIONS_NUM]:
+                f.write('{:>10} {}\n'.format(inclusive[function], function))
+
+            # periodic TRACE report starts new interval
+            f.write('\nstages since last TRACE report (since profiling started in case tracing was off):\n')
+            for stage in sorted(stages):
+                calls, total, longest = stages[stage]
+                f.write('stage:{} calls:{} total:{:f} sec avg:{:f} sec max:{:f} sec\n'.format(
+                    stage,
+                    calls,
+                    total,
+                    total / calls,
+                    longest,
+                ))
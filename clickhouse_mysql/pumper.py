@@ -27,6 +27,8 @@ class Pumper(object):
                 'DeleteRowsEvent': self.delete_rows_event,
                 # 'WriteRowsEvent.EachRow': self.write_rows_event_each_row,
                 'ReaderIdleEvent': self.reader_idle_event,
+                'ReaderEndEvent': self.reader_end_event,
+                'SchemaChangeEvent': self.schema_change_event,
             })
 
     def run(self):
@@ -52,6 +54,21 @@ class Pumper(object):
         """
         self.writer.flush()
 
+    def reader_end_event(self):
+        """
+        ReaderEndEvent handler
+        Idle flush writes expired pools only, at the end everything has to be written
+        """
+        self.writer.flush_all()
+
+    def schema_change_event(self, event=None):
+        """
+        SchemaChangeEvent handler
+        Rows of the table read before schema change have to be written before table is altered
+        :param event:
+        """
+        self.writer.flush_table(event)
+
     def delete_rows_event(self, event=None):
         """
         DeleteRowsEvent handler
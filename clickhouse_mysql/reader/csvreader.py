@@ -2,61 +2,228 @@
 # -*- coding: utf-8 -*-
 
 import csv
+import glob
+import logging
+import multiprocessing as mp
 import os
 
+from datetime import datetime
+
 from clickhouse_mysql.reader.reader import Reader
 from clickhouse_mysql.event.event import Event
 from clickhouse_mysql.converter.csvreadconverter import CSVReadConverter
 
 
+# number of bytes to detect CSV dialect and header by
+SNIFF_SIZE = 64 * 1024
+
+
+def parse_csv_file(path, batch_size, converter=None):
+    """
+    Parse CSV file into batches of rows
+    :param path: path to CSV file
+    :param batch_size: max number of rows in a batch
+    :param converter: converter to apply to each row
+    :return: generator of (fieldnames, list of dict)
+    """
+    with open(path, newline='') as csvfile:
+        sample = csvfile.read(SNIFF_SIZE)
+        csvfile.seek(0)
+        if not sample:
+            return
+
+        sniffer = csv.Sniffer()
+        dialect = sniffer.sniff(sample)
+        if not sniffer.has_header(sample):
+            logging.warning("CSV file %s seems to have no header, first row is used as header", path)
+
+        reader = csv.DictReader(csvfile, dialect=dialect)
+        rows = []
+        for row in reader:
+            rows.append(converter.row(row) if converter else row)
+            if len(rows) >= batch_size:
+                yield reader.fieldnames, rows
+                rows = []
+        if rows:
+            yield reader.fieldnames, rows
+
+
+def csv_reader_worker(paths, results, batch_size, converter=None):
+    """
+    Separate process body - parse files one-by-one
+    :param paths: mp.Queue of files to parse, None means stop
+    :param results: mp.Queue of (path, fieldnames, rows) or (path, None, exception), None means worker stopped
+    :param batch_size: max number of rows in a batch
+    :param converter: converter to apply to each row
+    """
+    while True:
+        path = paths.get()
+        if path is None:
+            break
+        try:
+            for fieldnames, rows in parse_csv_file(path, batch_size, converter):
+                results.put((path, fieldnames, rows))
+        except Exception as ex:
+            results.put((path, None, ex))
+    results.put(None)
+
+
 class CSVReader(Reader):
-    """Read data from CSV files"""
+    """
+    Read data from CSV files.
+
+    Files can be specified as a file, a dir (all *.csv files in it) or a glob, comma-separated list is accepted as well.
+    Each file is read into table named after the file. Rows are sent as multi-rows events of batch_size rows.
+    With several workers files are parsed in worker processes in parallel, each file by one worker,
+    thus rows of each file are sent in file order.
+    """
 
     csv_file_path = None
-    csvfile = None
-    sniffer = None
-    dialect = None
-    has_header = False
-    reader = None
+    files = None
+    batch_size = 10000
+    workers_num = 1
+
+    # max number of parsed and not yet sent batches
+    max_pending = None
+
+    exit_gracefully = False
 
     def __init__(
             self,
             csv_file_path,
             converter=None,
-            callbacks={}
+            callbacks={},
+            batch_size=10000,
+            workers_num=1,
     ):
+        """
+        :param csv_file_path: file, dir or glob, or comma-separated list of them. Ex.: /data/dump/*.csv
+        :param batch_size: max number of rows in one event
+        :param workers_num: number of worker processes to parse files in. 1 - parse in reader process
+        """
         super().__init__(converter=converter, callbacks=callbacks)
 
         self.csv_file_path = csv_file_path
-        self.csvfile = open(self.csv_file_path)
-        self.sniffer = csv.Sniffer()
-        self.dialect = self.sniffer.sniff(self.csvfile.read(1024))
-        self.csvfile.seek(0)
-        self.has_header = self.sniffer.has_header(self.csvfile.read(1024))
-        self.csvfile.seek(0)
-        self.reader = csv.DictReader(self.csvfile, dialect=self.dialect)
-        if self.has_header:
-            print('=======')
-            print(self.reader.fieldnames)
-            print('=======')
-        else:
-            # should raise error?
-            pass
+        self.batch_size = batch_size
+        self.workers_num = workers_num
+        self.max_pending = 2 * workers_num
+        self.files = CSVReader.list_files(csv_file_path)
+        logging.info("CSVReader() files=%d batch_size=%d workers_num=%d", len(self.files), batch_size, workers_num)
+
+    @staticmethod
+    def list_files(csv_file_path):
+        """
+        Expand files specification into list of files
+        :param csv_file_path: file, dir or glob, or comma-separated list of them
+        :return: sorted list of files
+        """
+        files = []
+        for path in [path.strip() for path in csv_file_path.split(',') if path.strip()]:
+            if os.path.isdir(path):
+                files.extend(glob.glob(os.path.join(path, '*.csv')))
+            elif os.path.isfile(path):
+                files.append(path)
+            else:
+                files.extend([f for f in glob.glob(path) if os.path.isfile(f)])
+
+        if not files:
+            raise Exception("No CSV files found in {}".format(csv_file_path))
+
+        return sorted(set(files))
+
+    def batches(self):
+        """
+        Parse files in reader process
+        :return: generator of (path, fieldnames, rows)
+        """
+        for path in self.files:
+            for fieldnames, rows in parse_csv_file(path, self.batch_size, self.converter):
+                yield path, fieldnames, rows
+                if self.exit_gracefully:
+                    return
+
+    def parallel_batches(self):
+        """
+        Parse files in worker processes
+        :return: generator of (path, fieldnames, rows)
+        """
+        paths = mp.Queue()
+        results = mp.Queue(maxsize=self.max_pending)
+        for path in self.files:
+            paths.put(path)
+
+        workers = []
+        for i in range(self.workers_num):
+            paths.put(None)
+            process = mp.Process(
+                target=csv_reader_worker,
+                args=(paths, results, self.batch_size, self.converter),
+                daemon=True,
+            )
+            process.start()
+            workers.append(process)
+
+        try:
+            running = len(workers)
+            while running > 0:
+                result = results.get()
+                if result is None:
+                    running -= 1
+                    continue
+
+                path, fieldnames, rows = result
+                if isinstance(rows, Exception):
+                    raise Exception("Unable to parse CSV file {}: {}".format(path, rows))
+
+                yield path, fieldnames, rows
+                if self.exit_gracefully:
+                    return
+        finally:
+            for process in workers:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
 
     def read(self):
         # fetch events
+        batches = self.batches() if self.workers_num <= 1 else self.parallel_batches()
+        rows_num = 0
         try:
-            event = Event()
-            event.table = os.path.splitext(self.csv_file_path)[0]
-            self.notify('WriteRowsEvent', event=event)
-            for row in self.reader:
-                event.row = row
-                self.notify('WriteRowsEvent.EachRow', event=self.converter.convert(event) if self.converter else event)
+            for path, fieldnames, rows in batches:
+                event = Event()
+                event.ts = datetime.utcnow()
+                event.table = os.path.splitext(os.path.basename(path))[0]
+                event.filename = path
+                event.fieldnames = fieldnames
+                event.rows = rows
+
+                if self.subscribers('WriteRowsEvent'):
+                    self.notify('WriteRowsEvent', event=event)
+
+                if self.subscribers('WriteRowsEvent.EachRow'):
+                    for row in rows:
+                        row_event = Event()
+                        row_event.ts = event.ts
+                        row_event.table = event.table
+                        row_event.filename = path
+                        row_event.fieldnames = fieldnames
+                        row_event.row = row
+                        self.notify('WriteRowsEvent.EachRow', event=row_event)
+
+                rows_num += len(rows)
         except KeyboardInterrupt:
             pass
 
-        self.csvfile.close()
+        logging.info("CSVReader() read %d rows from %d files", rows_num, len(self.files))
+
+        # all files are read - writers have to write everything they keep before the process exits
+        self.notify('ReaderEndEvent')
+
+    def close(self):
+        self.exit_gracefully = True
+        logging.info("CSV reader should stop on next batch")
+
 
 if __name__ == '__main__':
-    reader = CSVReader(filename='data.csv')
+    reader = CSVReader(csv_file_path='data.csv')
     reader.read()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+
+from functools import partial
+
+from clickhouse_mysql.reader.reader import Reader
+
+
+class MultiReader(Reader):
+    """
+    Read data from multiple sources in one process.
+    Each source reader runs in its own thread, events from all sources are tagged with source name and
+    are notified to observers one at a time, thus pool and writers are shared by all sources
+    """
+
+    # dict of source name -> Reader
+    readers = None
+    threads = None
+
+    # serializes notifications of all source readers
+    lock = None
+
+    def __init__(self, readers, callbacks={}):
+        """
+        :param readers: dict of source name -> Reader. Ex.: {'shard1': MySQLReader(...), 'shard2': MySQLReader(...)}
+        """
+        super().__init__(callbacks=callbacks)
+        self.readers = readers
+        self.threads = []
+        self.lock = threading.Lock()
+
+        for source in self.readers:
+            self.readers[source].subscribe({
+                event_name: partial(self.forward, event_name, source) for event_name in self.event_handlers
+            })
+
+    def forward(self, event_name, source, **attrs):
+        """
+        Notify observers about event of source reader
+        :param event_name: name of the event. Ex.: 'WriteRowsEvent'
+        :param source: name of the source
+        :param attrs: attributes of the notification
+        """
+        event = attrs.get('event')
+        if event is not None:
+            event.source = source
+
+        with self.lock:
+            self.notify(event_name, **attrs)
+
+    def read_source(self, source):
+        # thread body - read data from one source
+        logging.info("Start reading from source %s", source)
+        try:
+            self.readers[source].read()
+        except SystemExit:
+            # source reader gave up, the rest of sources keep on reading
+            logging.critical("Reading from source %s aborted", source)
+        except Exception as ex:
+            logging.critical("Reading from source %s failed", source)
+            logging.exception(ex)
+        logging.info("Stop reading from source %s", source)
+
+    def read(self):
+        # main function - read data from all sources
+
+        for source in self.readers:
+            thread = threading.Thread(target=self.read_source, args=(source,), name=source)
+            thread.start()
+            self.threads.append(thread)
+
+        for thread in self.threads:
+            # join with timeout, so main thread still handles signals
+            while thread.is_alive():
+                thread.join(1)
+
+    def close(self):
+        for source in self.readers:
+            self.readers[source].close()
@@ -3,14 +3,23 @@
 
 import time
 import logging
+import os
 import sys
 
 from pymysqlreplication import BinLogStreamReader
 from pymysqlreplication.row_event import WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent
+from pymysqlreplication.event import RotateEvent, HeartbeatLogEvent, GtidEvent, XidEvent, QueryEvent
+from pymysqlreplication.gtid import GtidSet, Gtid
 
+from clickhouse_mysql.observable import HandlerError
 from clickhouse_mysql.reader.reader import Reader
+from clickhouse_mysql.reader.rowsdecoder import ProcessRowsDecoder
+from clickhouse_mysql.reader.rowsprojection import RowsProjection
 from clickhouse_mysql.event.event import Event
+from clickhouse_mysql.ddlparser import DDLParser
 from clickhouse_mysql.tableprocessor import TableProcessor
+from clickhouse_mysql.prefixtrie import PrefixTrie
+from clickhouse_mysql.tracer import Tracer
 from clickhouse_mysql.util import Util
 
 from datetime import datetime
@@ -25,10 +34,13 @@ class MySQLReader(Reader):
     schemas = None
     tables = None
     tables_prefixes = None
+    tables_prefixes_trie = None
     blocking = None
     resume_stream = None
     binlog_stream = None
     nice_pause = 0
+    heartbeat = None
+    heartbeat_idle_at = 0
     exit_gracefully = False
 
     write_rows_event_num = 0
@@ -36,6 +48,36 @@ class MySQLReader(Reader):
 
     binlog_position_file = None
 
+    # binlog file of the event being processed
+    event_log_file = None
+
+    # position binlog stream by GTID set instead of binlog file/position
+    auto_position = False
+
+    # set of executed transactions, None - GTIDs are not tracked
+    gtid_executed = None
+
+    # GTID of the transaction being read, it is added to gtid_executed as soon as transaction is complete
+    gtid_next = None
+
+    binlog_gtid_file = None
+
+    # decode rows events in worker processes, None - decode in reader process
+    rows_decoder = None
+
+    # skip columns while decoding rows events, None - decode all columns
+    rows_projection = None
+
+    # track ALTER TABLE statements of listened tables
+    track_ddl = False
+
+    # cached decisions of is_table_listened()
+    # {
+    #   ('db1', 'log_2017_12_27'): True,
+    #   ('db1', 'users'): False,
+    # }
+    listened_tables = None
+
     def __init__(
             self,
             connection_settings,
@@ -48,7 +90,14 @@ class MySQLReader(Reader):
             blocking=None,
             resume_stream=None,
             nice_pause=None,
+            heartbeat=None,
             binlog_position_file=None,
+            auto_position=False,
+            gtid_set=None,
+            binlog_gtid_file=None,
+            decode_workers=0,
+            column_skip=None,
+            track_ddl=False,
             callbacks={},
     ):
         super().__init__(callbacks=callbacks)
@@ -62,10 +111,22 @@ class MySQLReader(Reader):
             schemas, Util.join_lists(tables, tables_prefixes))
         self.tables = None if tables is None else TableProcessor.extract_tables(tables)
         self.tables_prefixes = None if tables_prefixes is None else TableProcessor.extract_tables(tables_prefixes)
+        self.tables_prefixes_trie = None if not self.tables_prefixes else PrefixTrie(self.tables_prefixes)
+        self.listened_tables = {}
         self.blocking = blocking
         self.resume_stream = resume_stream
         self.nice_pause = nice_pause
+        # heartbeats make sense only when we are going to wait for new data
+        self.heartbeat = heartbeat if blocking and heartbeat else None
         self.binlog_position_file = binlog_position_file
+        self.auto_position = auto_position
+        self.binlog_gtid_file = binlog_gtid_file
+        if auto_position or binlog_gtid_file:
+            # GTIDs reported by MySQL are lowercase, keep the set in the same case to merge them properly
+            self.gtid_executed = GtidSet(gtid_set.lower() if gtid_set else None)
+        self.rows_decoder = ProcessRowsDecoder(workers_num=decode_workers) if decode_workers else None
+        self.rows_projection = RowsProjection(column_skip=column_skip) if column_skip else None
+        self.track_ddl = track_ddl
 
         logging.info("raw dbs list. len()=%d", 0 if schemas is None else len(schemas))
         if schemas is not None:
@@ -98,36 +159,55 @@ class MySQLReader(Reader):
         if not isinstance(self.server_id, int):
             raise Exception("Please specify server_id of src server as int. Ex.: --src-server-id=1")
 
+        if self.auto_position and not self.gtid_executed.gtids:
+            raise Exception("Please specify GTID set to start from either with --src-gtid-set or with --binlog-gtid-file. "
+                            "Ex.: --src-gtid-set=3e11fa47-71ca-11e1-9e33-c80aa9429562:1-5")
+        if self.gtid_executed is not None:
+            logging.info("GTID set to start from: %s", self.gtid_executed)
+
+        only_events = [
+            # Possible events
+            # BeginLoadQueryEvent,
+            DeleteRowsEvent,
+            # ExecuteLoadQueryEvent,
+            # FormatDescriptionEvent,
+            GtidEvent,
+            HeartbeatLogEvent,
+            # IntvarEvent
+            # NotImplementedEvent,
+            # QueryEvent,
+            RotateEvent,
+            # StopEvent,
+            # TableMapEvent,
+            UpdateRowsEvent,
+            WriteRowsEvent,
+            XidEvent,
+        ]
+        if self.track_ddl:
+            # ALTER TABLE statements come as QueryEvent
+            only_events.append(QueryEvent)
+
         self.binlog_stream = BinLogStreamReader(
             # MySQL server - data source
             connection_settings=self.connection_settings,
             server_id=self.server_id,
             # we are interested in reading CH-repeatable events only
-            only_events=[
-                # Possible events
-                # BeginLoadQueryEvent,
-                DeleteRowsEvent,
-                # ExecuteLoadQueryEvent,
-                # FormatDescriptionEvent,
-                # GtidEvent,
-                # HeartbeatLogEvent,
-                # IntvarEvent
-                # NotImplementedEvent,
-                # QueryEvent,
-                # RotateEvent,
-                # StopEvent,
-                # TableMapEvent,
-                UpdateRowsEvent,
-                WriteRowsEvent,
-                # XidEvent,
-            ],
+            only_events=only_events,
             only_schemas=self.schemas,
             # in case we have any prefixes - this means we need to listen to all tables within specified schemas
             only_tables=self.tables if not self.tables_prefixes else None,
             log_file=self.log_file,
             log_pos=self.log_pos,
-            freeze_schema=True,  # If true do not support ALTER TABLE. It's faster.
-            blocking=False,
+            # with auto position MySQL sends all transactions not yet in the GTID set, log file/pos are ignored.
+            # GTIDs are the same on all servers of replication topology, thus we can resume after failover as well
+            auto_position=str(self.gtid_executed) if self.auto_position else None,
+            # If true do not support ALTER TABLE. It's faster.
+            # With DDL tracking cached schema of altered table is dropped explicitly, see refresh_table_schema()
+            freeze_schema=True,
+            # with heartbeats stream is kept open and MySQL pushes new events as soon as they are written.
+            # without heartbeats stream is re-opened each --nice-pause seconds to check for new events
+            blocking=self.heartbeat is not None,
+            slave_heartbeat=self.heartbeat,
             resume_stream=self.resume_stream,
         )
 
@@ -164,15 +244,40 @@ class MySQLReader(Reader):
                 return True
 
         # check prefixes
-        if self.tables_prefixes:
-            for prefix in self.tables_prefixes:
-                if table.startswith(prefix):
-                    # table name starts with prefix list
-                    return True
+        if self.tables_prefixes_trie:
+            if self.tables_prefixes_trie.match(table):
+                # table name starts with prefix list
+                return True
 
         return False
 
-    first_rows_passed = []
+    def is_event_listened(self, mysql_event):
+        """
+        Check whether rows event is produced by listened table.
+        Decision is made once per (schema, table) and cached until binlog rotation
+        :param mysql_event: one of WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent
+        :return: bool is event's table listened
+        """
+
+        if not self.tables_prefixes:
+            # no prefixes specified - tables are filtered by binlog stream itself with only_tables
+            return True
+
+        key = (mysql_event.schema, mysql_event.table)
+        try:
+            return self.listened_tables[key]
+        except KeyError:
+            # new table - make the decision and cache it
+            listened = self.is_table_listened(mysql_event.table)
+            self.listened_tables[key] = listened
+            return listened
+
+    def reset_listened_tables(self):
+        """Drop cached is_table_listened() decisions"""
+        self.listened_tables = {}
+
+    # set of (schema, table) for which first row is already logged
+    first_rows_passed = None
     start_timestamp = 0
     start = 0
     rows_num = 0
@@ -182,7 +287,7 @@ class MySQLReader(Reader):
 
     def init_read_events(self):
         self.start_timestamp = int(time.time())
-        self.first_rows_passed = []
+        self.first_rows_passed = set()
 
     def init_fetch_loop(self):
         self.start = time.time()
@@ -238,10 +343,14 @@ class MySQLReader(Reader):
             self.rows_num_per_event_max = None
 
     def process_first_event(self, event):
-        if "{}.{}".format(event.schema, event.table) not in self.first_rows_passed:
-            Util.log_row(event.first_row(), "first row in replication {}.{} - binlog pos {}".format(event.schema, event.table, event.pymysqlreplication_event.packet.log_pos))
-            self.first_rows_passed.append("{}.{}".format(event.schema, event.table))
-        logging.info(self.first_rows_passed)
+        # called for each event - keep it cheap, log only first row of each table
+        key = (event.schema, event.table)
+        if key in self.first_rows_passed:
+            return
+
+        Util.log_row(event.first_row(), "first row in replication {}.{} - binlog pos {}".format(event.schema, event.table, event.pymysqlreplication_event.packet.log_pos))
+        self.first_rows_passed.add(key)
+        logging.info("first rows passed for %d tables", len(self.first_rows_passed))
 
     def process_write_rows_event(self, mysql_event):
         """
@@ -250,18 +359,20 @@ class MySQLReader(Reader):
         :return:
         """
 
-        logging.debug("Received insert event for table: " + mysql_event.table)
+        logging.debug("Received insert event for table: %s", mysql_event.table)
+
+        if not self.is_event_listened(mysql_event):
+            # this table is not listened
+            # processing is over - just skip event
+            return
 
-        if self.tables_prefixes:
-            # we have prefixes specified
-            # need to find whether current event is produced by table in 'looking-into-tables' list
-            if not self.is_table_listened(mysql_event.table):
-                # this table is not listened
-                # processing is over - just skip event
-                return
+        # rows are decoded on first access
+        started = Tracer.start()
+        rows_num = len(mysql_event.rows)
+        Tracer.stop('reader.decode', started)
 
         # statistics
-        self.stat_write_rows_event_calc_rows_num_min_max(rows_num_per_event=len(mysql_event.rows))
+        self.stat_write_rows_event_calc_rows_num_min_max(rows_num_per_event=rows_num)
 
         if self.subscribers('WriteRowsEvent'):
             # dispatch event to subscribers
@@ -274,6 +385,7 @@ class MySQLReader(Reader):
             event.ts = datetime.utcnow()
             event.schema = mysql_event.schema
             event.table = mysql_event.table
+            event.log_file = self.event_log_file
             event.pymysqlreplication_event = mysql_event
 
             self.process_first_event(event=event)
@@ -285,6 +397,9 @@ class MySQLReader(Reader):
             # statistics
             self.stat_write_rows_event_each_row()
 
+            # all rows of binlog event arrived at the same time
+            ts = datetime.utcnow()
+
             # dispatch Event per each row
             for row in mysql_event.rows:
                 # statistics
@@ -292,7 +407,7 @@ class MySQLReader(Reader):
 
                 # dispatch Event
                 event = Event()
-                event.ts = datetime.utcnow()
+                event.ts = ts
                 event.schema = mysql_event.schema
                 event.table = mysql_event.table
                 event.row = row['values']
@@ -304,22 +419,24 @@ class MySQLReader(Reader):
 
     def process_update_rows_event(self, mysql_event):
 
-        logging.debug("Received update event for table: " + mysql_event.table + " Schema: " + mysql_event.schema)
+        logging.debug("Received update event for table: %s Schema: %s", mysql_event.table, mysql_event.schema)
 
         # for row in mysql_event.rows:
         #    for key in row['before_values']:
         #        logging.debug("\t *%s:%s=>%s" % (key, row["before_values"][key], row["after_values"][key]))
 
-        if self.tables_prefixes:
-            # we have prefixes specified
-            # need to find whether current event is produced by table in 'looking-into-tables' list
-            if not self.is_table_listened(mysql_event.table):
-                # this table is not listened
-                # processing is over - just skip event
-                return
+        if not self.is_event_listened(mysql_event):
+            # this table is not listened
+            # processing is over - just skip event
+            return
+
+        # rows are decoded on first access
+        started = Tracer.start()
+        rows_num = len(mysql_event.rows)
+        Tracer.stop('reader.decode', started)
 
         # statistics
-        self.stat_write_rows_event_calc_rows_num_min_max(rows_num_per_event=len(mysql_event.rows))
+        self.stat_write_rows_event_calc_rows_num_min_max(rows_num_per_event=rows_num)
 
         if self.subscribers('UpdateRowsEvent'):
             # dispatch event to subscribers
@@ -332,6 +449,7 @@ class MySQLReader(Reader):
             event.ts = datetime.utcnow()
             event.schema = mysql_event.schema
             event.table = mysql_event.table
+            event.log_file = self.event_log_file
             event.pymysqlreplication_event = mysql_event
 
             self.process_first_event(event=event)
@@ -342,7 +460,7 @@ class MySQLReader(Reader):
         # logging.info("Skip update rows")
 
     def process_delete_rows_event(self, mysql_event):
-        logging.debug("Received delete event for table: " + mysql_event.table)
+        logging.debug("Received delete event for table: %s", mysql_event.table)
 
         """
         for row in mysql_event.rows:
@@ -350,13 +468,10 @@ class MySQLReader(Reader):
                 logging.debug("\t *", key, ":", row["values"][key])
         """
 
-        if self.tables_prefixes:
-            # we have prefixes specified
-            # need to find whether current event is produced by table in 'looking-into-tables' list
-            if not self.is_table_listened(mysql_event.table):
-                # this table is not listened
-                # processing is over - just skip event
-                return
+        if not self.is_event_listened(mysql_event):
+            # this table is not listened
+            # processing is over - just skip event
+            return
 
         # statistics
         # self.stat_write_rows_event_calc_rows_num_min_max(rows_num_per_event=len(mysql_event.rows))
@@ -372,6 +487,7 @@ class MySQLReader(Reader):
             event.ts = datetime.utcnow()
             event.schema = mysql_event.schema
             event.table = mysql_event.table
+            event.log_file = self.event_log_file
             event.pymysqlreplication_event = mysql_event
 
             self.process_first_event(event=event)
@@ -381,11 +497,219 @@ class MySQLReader(Reader):
 
         # logging.info("Skip delete rows")
 
+    def process_rotate_event(self, mysql_event):
+        """
+        Process specific MySQL event - RotateEvent
+        Table ids are re-assigned with new binlog file, so cached per-table decisions are dropped as well
+        :param mysql_event: RotateEvent instance
+        :return:
+        """
+        logging.debug("Received rotate event to %s:%d", mysql_event.next_binlog, mysql_event.position)
+        self.reset_listened_tables()
+        if self.rows_projection is not None:
+            self.rows_projection.reset()
+
+    def parse_query_event(self, mysql_event):
+        """
+        Parse ALTER TABLE statement of listened table
+        :param mysql_event: QueryEvent instance
+        :return: dict as returned by DDLParser.parse_alter_table() or None in case event is not ALTER of listened table
+        """
+        schema = mysql_event.schema.decode('utf-8') if isinstance(mysql_event.schema, bytes) else mysql_event.schema
+        alter = DDLParser.parse_alter_table(mysql_event.query, schema=schema)
+        if alter is None:
+            return None
+
+        if self.schemas and alter['schema'] not in self.schemas:
+            return None
+        if (self.tables or self.tables_prefixes) and not self.is_table_listened(alter['table']):
+            return None
+
+        return alter
+
+    def refresh_table_schema(self, mysql_event):
+        """
+        Drop cached schema of the table altered by QueryEvent, thus it is read again with next TableMapEvent.
+        Has to be called as soon as event is read from the stream - before rows events following it are decoded
+        :param mysql_event: QueryEvent instance
+        :return:
+        """
+        alter = self.parse_query_event(mysql_event)
+        if alter is None:
+            return
+
+        table_map = self.binlog_stream.table_map
+        for table_id in [table_id for table_id in table_map
+                         if table_map[table_id].schema == alter['schema'] and table_map[table_id].table == alter['table']]:
+            del table_map[table_id]
+
+        # renamed table may become (not) listened, columns to skip may move
+        self.reset_listened_tables()
+        if self.rows_projection is not None:
+            self.rows_projection.reset()
+
+    def process_query_event(self, mysql_event):
+        """
+        Process specific MySQL event - QueryEvent
+        ALTER TABLE of listened table is notified, so rows of the table read so far are written before table is altered
+        :param mysql_event: QueryEvent instance
+        :return:
+        """
+        alter = self.parse_query_event(mysql_event)
+        if alter is None:
+            return
+
+        logging.info("Schema of table %s.%s changed: %s", alter['schema'], alter['table'], mysql_event.query)
+
+        event = Event()
+        event.ts = datetime.utcnow()
+        event.schema = alter['schema']
+        event.table = alter['table']
+        event.log_file = self.event_log_file
+        event.query = mysql_event.query
+        event.alter = alter
+        self.notify('SchemaChangeEvent', event=event)
+
+    def process_heartbeat_event(self, mysql_event):
+        """
+        Process specific MySQL event - HeartbeatLogEvent
+        MySQL sends heartbeat when there are no new events in binlog for heartbeat period - reader is idle.
+        :param mysql_event: HeartbeatLogEvent instance
+        :return:
+        """
+        self.notify_idle()
+
+    def notify_idle(self):
+        """
+        Notify ReaderIdleEvent in heartbeat mode, at most once per heartbeat period.
+        Called on each event, not on heartbeats only - MySQL sends no heartbeats while binlog has any events,
+        those of not listened tables included, and pools of quiet tables still have to be flushed by time.
+        Server's heartbeat interval jitters, so the limit is a bit less than the period - otherwise every other
+        heartbeat would be skipped
+        """
+        if self.heartbeat is None:
+            return
+
+        now = time.time()
+        if now >= self.heartbeat_idle_at + 0.9 * self.heartbeat:
+            self.heartbeat_idle_at = now
+            self.notify('ReaderIdleEvent')
+
+    def process_gtid_event(self, mysql_event):
+        """
+        Process specific MySQL event - GtidEvent
+        GtidEvent starts new transaction, so the previous one is complete, even in case it was not terminated
+        with XidEvent (DDL statements, non-transactional tables)
+        :param mysql_event: GtidEvent instance
+        :return:
+        """
+        if self.gtid_executed is None:
+            return
+
+        self.commit_gtid()
+        self.gtid_next = mysql_event.gtid
+
+    def process_xid_event(self, mysql_event):
+        """
+        Process specific MySQL event - XidEvent
+        XidEvent commits transaction
+        :param mysql_event: XidEvent instance
+        :return:
+        """
+        if self.gtid_executed is None:
+            return
+
+        self.commit_gtid()
+
+    def commit_gtid(self):
+        """Add GTID of the complete transaction into executed GTID set and save the set"""
+        if self.gtid_next is None:
+            return
+
+        try:
+            self.gtid_executed.merge_gtid(Gtid(self.gtid_next))
+        except Exception as ex:
+            # transaction is already in the set - ex.: stream re-positioned by file/pos
+            logging.debug("GTID %s is not added into executed set. ex=%s", self.gtid_next, ex)
+        self.gtid_next = None
+
+        self.process_gtid_position()
+
+    def process_gtid_position(self):
+        if self.binlog_gtid_file:
+            # write complete file and replace previous one, so the set is never seen half-written
+            tmp_file = self.binlog_gtid_file + '.tmp'
+            with open(tmp_file, "w") as f:
+                f.write(str(self.gtid_executed))
+            os.replace(tmp_file, self.binlog_gtid_file)
+        logging.debug("Executed GTID set: %s", self.gtid_executed)
+
+    def process_event(self, mysql_event):
+        """
+        Process MySQL event based on its type
+        :param mysql_event: binlog event
+        :return:
+        """
+        Tracer.begin_event()
+        started = Tracer.start()
+
+        if isinstance(mysql_event, WriteRowsEvent):
+            self.process_write_rows_event(mysql_event)
+        elif isinstance(mysql_event, DeleteRowsEvent):
+            self.process_delete_rows_event(mysql_event)
+        elif isinstance(mysql_event, UpdateRowsEvent):
+            self.process_update_rows_event(mysql_event)
+        elif isinstance(mysql_event, RotateEvent):
+            self.process_rotate_event(mysql_event)
+        elif isinstance(mysql_event, HeartbeatLogEvent):
+            self.process_heartbeat_event(mysql_event)
+        elif isinstance(mysql_event, GtidEvent):
+            self.process_gtid_event(mysql_event)
+        elif isinstance(mysql_event, XidEvent):
+            self.process_xid_event(mysql_event)
+        elif isinstance(mysql_event, QueryEvent):
+            self.process_query_event(mysql_event)
+        else:
+            # skip other unhandled events
+            pass
+
+        Tracer.stop('reader.event', started)
+
+    def submit_event(self, mysql_event):
+        """
+        Submit MySQL event to rows decoder. Rows of listened tables are decoded by worker processes,
+        all events are processed afterwards in binlog order
+        :param mysql_event: binlog event
+        :return:
+        """
+        decode = isinstance(mysql_event, (WriteRowsEvent, DeleteRowsEvent, UpdateRowsEvent)) \
+            and self.is_event_listened(mysql_event)
+        self.rows_decoder.submit(
+            mysql_event,
+            context=(self.binlog_stream.log_file, self.binlog_stream.log_pos),
+            decode=decode,
+        )
+        self.process_decoded_events()
+
+    def process_decoded_events(self, block=False):
+        """
+        Process events, which rows decoder has already decoded
+        :param block: wait for all submitted events to be decoded and processed
+        :return:
+        """
+        if self.rows_decoder is None:
+            return
+
+        for mysql_event, (file, pos) in self.rows_decoder.ready(block=block):
+            self.event_log_file = file
+            self.process_event(mysql_event)
+            self.process_binlog_position(file, pos)
+
     def process_binlog_position(self, file, pos):
         if self.binlog_position_file:
             with open(self.binlog_position_file, "w") as f:
                 f.write("{}:{}".format(file, pos))
-        logging.debug("Next event binlog pos: {}.{}".format(file, pos))
+        logging.debug("Next event binlog pos: %s.%s", file, pos)
 
     def read(self):
         # main function - read data from source
@@ -402,8 +726,12 @@ class MySQLReader(Reader):
                 # statistics
                 self.stat_init_fetch_loop()
 
+                if self.auto_position:
+                    # in case stream is re-opened, continue right after the last executed transaction
+                    self.binlog_stream.auto_position = str(self.gtid_executed)
+
                 try:
-                    logging.debug('Pre-start binlog position: ' + self.binlog_stream.log_file + ":" + str(self.binlog_stream.log_pos) if self.binlog_stream.log_pos is not None else "undef")
+                    logging.debug('Pre-start binlog position: %s:%s', self.binlog_stream.log_file, self.binlog_stream.log_pos)
 
                     # fetch available events from MySQL
                     for mysql_event in self.binlog_stream:
@@ -411,32 +739,52 @@ class MySQLReader(Reader):
                         if self.exit_gracefully:
                             break
 
-                        logging.debug(
-                            'Got Event ' + self.binlog_stream.log_file + ":" + str(self.binlog_stream.log_pos))
+                        logging.debug('Got Event %s:%s', self.binlog_stream.log_file, self.binlog_stream.log_pos)
+
+                        if self.rows_projection is not None \
+                                and isinstance(mysql_event, (WriteRowsEvent, DeleteRowsEvent, UpdateRowsEvent)):
+                            # skipped columns are not decoded at all, setup event before its rows are accessed
+                            self.rows_projection.apply(mysql_event)
+
+                        if isinstance(mysql_event, QueryEvent):
+                            # rows events after ALTER TABLE have to be decoded with new schema
+                            self.refresh_table_schema(mysql_event)
+
+                        if not isinstance(mysql_event, HeartbeatLogEvent):
+                            # busy server sends no heartbeats
+                            self.notify_idle()
+
+                        if self.rows_decoder is not None and isinstance(mysql_event, HeartbeatLogEvent):
+                            # stream does not end in heartbeat mode - all events submitted so far
+                            # have to be processed before reader is notified to be idle
+                            self.process_decoded_events(block=True)
+                            self.process_event(mysql_event)
+                            continue
+
+                        if self.rows_decoder is not None:
+                            # rows are decoded in worker processes, event is processed when decoded
+                            self.submit_event(mysql_event)
+                            continue
 
                         # process event based on its type
-                        if isinstance(mysql_event, WriteRowsEvent):
-                            self.process_write_rows_event(mysql_event)
-                        elif isinstance(mysql_event, DeleteRowsEvent):
-                            self.process_delete_rows_event(mysql_event)
-                        elif isinstance(mysql_event, UpdateRowsEvent):
-                            self.process_update_rows_event(mysql_event)
-                        else:
-                            # skip other unhandled events
-                            pass
+                        self.event_log_file = self.binlog_stream.log_file
+                        self.process_event(mysql_event)
 
                         # after event processed, we need to handle current binlog position
                         self.process_binlog_position(self.binlog_stream.log_file, self.binlog_stream.log_pos)
 
+                    # all fetched events have to be processed before going idle
+                    self.process_decoded_events(block=True)
+
                 except Exception as ex:
-                    if self.blocking:
+                    if self.blocking and not isinstance(ex, HandlerError):
                         # we'd like to continue waiting for data
                         # report and continue cycle
                         logging.warning("Got an exception, skip it in blocking mode")
                         logging.exception(ex)
                     else:
                         # do not continue, report error and exit
-                        logging.critical("Got an exception, abort it in non-blocking mode")
+                        logging.critical("Got an exception, abort it")
                         logging.exception(ex)
                         sys.exit(1)
 
@@ -450,6 +798,7 @@ class MySQLReader(Reader):
                     break  # while True
 
                 # blocking - wait for more data
+                # with heartbeats we get here only in case stream is broken - make a pause before reconnect
                 if self.nice_pause > 0:
                     time.sleep(self.nice_pause)
 
@@ -465,6 +814,12 @@ class MySQLReader(Reader):
             logging.warning("Unable to close binlog stream correctly")
             logging.exception(ex)
 
+        if self.rows_decoder is not None:
+            self.rows_decoder.stop()
+
+        if Tracer.enabled:
+            Tracer.report()
+
         end_timestamp = int(time.time())
 
         logging.info('start %d', self.start_timestamp)
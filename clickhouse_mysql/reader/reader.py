@@ -19,17 +19,24 @@ class Reader(Observable):
         # called when Reader has no data to read
         'ReaderIdleEvent': [],
 
+        # called when Reader has read all the data and is about to return
+        'ReaderEndEvent': [],
+
         # called on each DeleteRowsEvent
         'DeleteRowsEvent': [],
 
         # called on each UpdateRowsEvent
         'UpdateRowsEvent': [],
 
+        # called when schema of source table is changed
+        'SchemaChangeEvent': [],
+
     }
 
     def __init__(self, converter=None, callbacks={}):
         self.converter = converter
-        self.subscribe(callbacks)
+        # each reader has its own subscribers - several readers may run in one process
+        super().__init__(callbacks=callbacks)
 
     def read(self):
         pass
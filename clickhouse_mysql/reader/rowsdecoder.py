@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import multiprocessing as mp
+import pickle
+import queue
+
+from collections import deque
+
+from pymysqlreplication.packet import BinLogPacketWrapper
+
+from clickhouse_mysql.reader.rowsprojection import RowsProjection
+
+
+def decode_rows(job):
+    """
+    Decode row images of one rows event
+    :param job: (event class, event attributes, packet wrapper attributes) as prepared by ProcessRowsDecoder.job()
+    :return: list of decoded rows, the same as pymysqlreplication's RowsEvent.rows
+    """
+    event_class, event_state, packet_state = job
+
+    # rebuild packet wrapper and rows event without calling their constructors
+    # constructors parse headers, which are already parsed by the reader process
+    packet = BinLogPacketWrapper.__new__(BinLogPacketWrapper)
+    packet.__dict__.update(packet_state)
+
+    event = event_class.__new__(event_class)
+    event.__dict__.update(event_state)
+    event.packet = packet
+
+    # columns projection is shipped as a set of indexes, re-apply it here
+    skip_columns = event.__dict__.pop('_skip_columns', None)
+    if skip_columns:
+        RowsProjection.project(event, skip_columns)
+
+    return event.rows
+
+
+class DecodeError(object):
+    """Picklable report of the exception raised by worker - exception itself may refer to unpicklable objects"""
+
+    def __init__(self, ex):
+        self.type = type(ex).__name__
+        self.message = str(ex)
+
+    def __str__(self):
+        return '{}: {}'.format(self.type, self.message)
+
+
+def rows_decoder_worker(jobs, results):
+    """
+    Separate process body - decode jobs one-by-one in the order they come
+    :param jobs: mp.Queue of jobs, None means stop
+    :param results: mp.Queue of pickled decoded rows (or DecodeError), in the same order as jobs
+    """
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        # rows are pickled here, not in queue's feeder thread - it drops what it can not pickle,
+        # and reader would wait for the result forever
+        try:
+            result = pickle.dumps(decode_rows(job), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as ex:
+            result = DecodeError(ex)
+        results.put(result)
+
+
+class ProcessRowsDecoder(object):
+    """
+    Decode row images of binlog rows events in a pool of worker processes.
+
+    Reader process reads raw binlog packets and parses events headers only, row images are decoded by workers.
+    Events are partitioned between workers by table id, each worker decodes its events in FIFO order.
+    Decoded events are handed back in exactly the same order they were submitted,
+    thus binlog order (and binlog position tracking) is preserved.
+    """
+
+    workers_num = None
+    max_pending = None
+
+    # seconds, how often worker is checked to be alive while reader waits for its result
+    LIVENESS_CHECK_INTERVAL = 5
+
+    processes = None
+    jobs_queues = None
+    results_queues = None
+
+    # events submitted and not yet handed back, in submission order
+    # deque([(worker index or None, mysql_event, context), ...])
+    pending = None
+
+    def __init__(self, workers_num=2, max_pending=1000):
+        """
+        :param workers_num: number of worker processes
+        :param max_pending: max number of submitted and not yet handed back events.
+            Bounds memory used by in-flight events
+        """
+        self.workers_num = workers_num
+        self.max_pending = max_pending
+        self.processes = []
+        self.jobs_queues = []
+        self.results_queues = []
+        self.pending = deque()
+
+    def started(self):
+        return len(self.processes) > 0
+
+    def start(self):
+        if self.started():
+            return
+
+        logging.info("ProcessRowsDecoder() start %d workers", self.workers_num)
+        for i in range(self.workers_num):
+            jobs = mp.Queue()
+            results = mp.Queue()
+            process = mp.Process(target=rows_decoder_worker, args=(jobs, results), daemon=True)
+            process.start()
+            self.jobs_queues.append(jobs)
+            self.results_queues.append(results)
+            self.processes.append(process)
+
+    def stop(self):
+        for jobs in self.jobs_queues:
+            jobs.put(None)
+        for process in self.processes:
+            process.join()
+
+        self.processes = []
+        self.jobs_queues = []
+        self.results_queues = []
+
+    def job(self, mysql_event):
+        """
+        Prepare picklable decode job out of rows event
+        :param mysql_event: one of WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent with rows not yet decoded
+        :return: tuple
+        """
+
+        # control connection and table map of the whole stream can not/should not be shipped to the worker
+        # decoding needs only the table of this event
+        event_state = dict(mysql_event.__dict__)
+        event_state.pop('packet')
+        event_state['_ctl_connection'] = None
+        event_state['table_map'] = {mysql_event.table_id: mysql_event.table_map[mysql_event.table_id]}
+
+        # columns projection overrides are closures bound to this very event, they are re-applied by the worker
+        event_state.pop('_RowsEvent__read_values_name', None)
+        event_state.pop('_read_column_data', None)
+
+        # packet wrapper refers back to the event - drop this reference
+        packet_state = dict(mysql_event.packet.__dict__)
+        packet_state.pop('event', None)
+
+        return mysql_event.__class__, event_state, packet_state
+
+    def submit(self, mysql_event, context=None, decode=True):
+        """
+        Submit event for decoding
+        :param mysql_event: binlog event
+        :param context: any data to be handed back along with the event. Ex.: binlog position of the event
+        :param decode: whether event's rows need decoding. Events which do not need decoding are handed back
+            in order with the rest of events
+        """
+        worker_index = None
+        if decode:
+            self.start()
+            worker_index = mysql_event.table_id % self.workers_num
+            self.jobs_queues[worker_index].put(self.job(mysql_event))
+
+        self.pending.append((worker_index, mysql_event, context))
+
+    def ready(self, block=False):
+        """
+        Hand back decoded events in submission order
+        :param block: wait for all pending events to be decoded
+        :return: generator of (mysql_event, context)
+        """
+        while self.pending:
+            worker_index, mysql_event, context = self.pending[0]
+
+            if worker_index is not None:
+                # wait for the result when we are asked to, or when too many events are in-flight
+                wait = block or len(self.pending) > self.max_pending
+                result = self.result(worker_index, wait)
+                if result is None:
+                    # head event is not decoded yet
+                    return
+
+                if isinstance(result, DecodeError):
+                    # decode locally - reader process has not touched event's packet, it is still readable
+                    logging.warning("Unable to decode rows in worker process, decode locally. ex=%s", result)
+                    result = mysql_event.rows
+                else:
+                    result = pickle.loads(result)
+
+                # pymysqlreplication keeps decoded rows in name-mangled private attribute of RowsEvent,
+                # having it set, RowsEvent.rows returns the rows without decoding the packet again
+                mysql_event._RowsEvent__rows = result
+
+            self.pending.popleft()
+            yield mysql_event, context
+
+    def result(self, worker_index, wait):
+        """
+        Fetch next result of the worker
+        :param worker_index: index of the worker
+        :param wait: wait for the result
+        :return: pickled rows, DecodeError or None in case result is not ready and not waited for
+        """
+        while True:
+            try:
+                return self.results_queues[worker_index].get(block=wait, timeout=self.LIVENESS_CHECK_INTERVAL if wait else None)
+            except queue.Empty:
+                if not wait:
+                    return None
+
+            # results may be put just before worker exited
+            if not self.processes[worker_index].is_alive() and self.results_queues[worker_index].empty():
+                raise Exception("Rows decoder worker {} exited with code {}, events it was decoding are lost".format(
+                    worker_index, self.processes[worker_index].exitcode))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+
+from pymysqlreplication.bitmap import BitGet
+from pymysqlreplication.constants import FIELD_TYPE
+
+
+class RowsProjection(object):
+    """
+    Skip columns while decoding rows of binlog rows events.
+
+    Skipped columns are not included into decoded rows at all.
+    Values of variable-length columns (strings, TEXT/BLOB, JSON, GEOMETRY) are not even read from the packet,
+    reader just steps over them. Fixed-size values are cheap and are decoded as usual and dropped afterwards.
+    """
+
+    # column type -> function(column) returning size (in bytes) of the length prefix of the value
+    LENGTH_SIZE = {
+        FIELD_TYPE.VARCHAR: lambda column: 2 if column.max_length > 255 else 1,
+        FIELD_TYPE.STRING: lambda column: 2 if column.max_length > 255 else 1,
+        FIELD_TYPE.BLOB: lambda column: column.length_size,
+        FIELD_TYPE.GEOMETRY: lambda column: column.length_size,
+        FIELD_TYPE.JSON: lambda column: column.length_size,
+    }
+
+    # set of column names to skip
+    column_skip = None
+
+    # cached per-table projection - indexes of columns to skip
+    # {
+    #   ('db1', 'table1'): frozenset({2, 5}),
+    #   ('db1', 'table2'): frozenset(),
+    # }
+    tables = None
+
+    def __init__(self, column_skip=None):
+        """
+        :param column_skip: list of column names to skip. Ex.: ['column1', 'column2']
+        """
+        self.column_skip = set() if column_skip is None else set(column_skip)
+        self.tables = {}
+
+    def reset(self):
+        """Drop cached per-table projections"""
+        self.tables = {}
+
+    def indexes(self, mysql_event):
+        """
+        Indexes of columns of event's table to be skipped
+        :param mysql_event: one of WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent
+        :return: frozenset of column indexes
+        """
+        key = (mysql_event.schema, mysql_event.table)
+        try:
+            return self.tables[key]
+        except KeyError:
+            indexes = frozenset(
+                i for i, column in enumerate(mysql_event.columns) if column.name in self.column_skip
+            )
+            logging.debug("projection for %s.%s skip columns %s", mysql_event.schema, mysql_event.table, indexes)
+            self.tables[key] = indexes
+            return indexes
+
+    def apply(self, mysql_event):
+        """
+        Setup rows event to skip columns when its rows are decoded. Has to be called before rows are accessed
+        :param mysql_event: one of WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent
+        """
+        if not self.column_skip:
+            return
+
+        indexes = self.indexes(mysql_event)
+        if indexes:
+            RowsProjection.project(mysql_event, indexes)
+
+    @staticmethod
+    def project(mysql_event, indexes):
+        """
+        Setup rows event to skip specified columns when its rows are decoded.
+
+        pymysqlreplication decodes rows lazily, on first access to RowsEvent.rows, with
+        RowsEvent._read_column_data() which calls RowsEvent.__read_values_name() for each column.
+        Both are looked up on the instance first, so they are overridden for this very event only.
+
+        :param mysql_event: one of WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent
+        :param indexes: set of indexes of columns to skip
+        """
+        if '_skip_columns' in mysql_event.__dict__:
+            # already projected
+            return
+
+        # original bound methods
+        read_values_name = mysql_event._RowsEvent__read_values_name
+        read_column_data = mysql_event._read_column_data
+
+        names = [mysql_event.columns[i].name for i in indexes]
+
+        def skip_values_name(column, null_bitmap, null_bitmap_index, is_partial, cols_bitmap, unsigned, i):
+            if (i in indexes) \
+                    and (column.type in RowsProjection.LENGTH_SIZE) \
+                    and not is_partial \
+                    and (BitGet(cols_bitmap, i) != 0) \
+                    and not mysql_event._is_null(null_bitmap, null_bitmap_index):
+                # step over the value without reading it
+                packet = mysql_event.packet
+                length = packet.read_uint_by_size(RowsProjection.LENGTH_SIZE[column.type](column))
+                packet.advance(length)
+                return None
+
+            return read_values_name(column, null_bitmap, null_bitmap_index, is_partial, cols_bitmap, unsigned, i)
+
+        def skip_column_data(cols_bitmap, row_image_type=None):
+            values = read_column_data(cols_bitmap, row_image_type)
+            for name in names:
+                values.pop(name, None)
+            return values
+
+        # picklable description of the projection, used by ProcessRowsDecoder to re-apply it in worker process
+        mysql_event._skip_columns = indexes
+        mysql_event._RowsEvent__read_values_name = skip_values_name
+        mysql_event._read_column_data = skip_column_data
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import atexit
+import logging
+import mmap
+import multiprocessing as mp
+import os
+import struct
+
+from clickhouse_mysql.observable import HandlerError
+
+
+class RingBuffer(object):
+    """
+    Ring buffer of variable-size frames in shared memory.
+
+    Buffer is an anonymous shared mmap, thus it is shared with processes forked after it is created.
+    Producers copy frame into the buffer once, consumers copy it out - no pipes, no extra pickling.
+    Producer waits while there is no room for the frame, consumer waits while buffer is empty.
+    Waiting process checks the other side is alive each POLL_INTERVAL - producer stops with HandlerError
+    in case any consumer is dead (killed by OOM killer, for example, maybe holding the lock),
+    consumer stops in case producer is dead.
+
+    Memory layout:
+        header: head (write offset), tail (read offset), used (bytes) - 3 x 8-byte little-endian
+        data: capacity bytes of frames
+    Frame:
+        4-byte little-endian length + payload
+        length WRAP means the rest of data area is not used, next frame is at the beginning of data area
+        length STOP means consumer has to stop
+    """
+
+    HEADER = struct.Struct('<QQQ')
+    FRAME_HEADER = struct.Struct('<I')
+
+    WRAP = 0xFFFFFFFF
+    STOP = 0xFFFFFFFE
+
+    # seconds to wait for lock or for frame written/taken before the other side is checked to be alive
+    POLL_INTERVAL = 0.1
+
+    capacity = None
+    buffer = None
+
+    # guards header, data area and waiting counters
+    lock = None
+    # released once for each waiting producer when frame is taken, and for each waiting consumer when frame is written.
+    # Not a Condition/Event - their notify waits for sleeping processes, dead ones included
+    room = None
+    frames = None
+    # number of processes waiting for room/frames and not notified yet
+    waiting_room = None
+    waiting_frames = None
+
+    # consumer processes
+    consumers = None
+    # pid of process which started consumers
+    producer_pid = None
+
+    def __init__(self, capacity=64 * 1024 * 1024):
+        """
+        :param capacity: size of data area in bytes
+        """
+        self.capacity = capacity
+        self.buffer = mmap.mmap(-1, RingBuffer.HEADER.size + capacity)
+        self.buffer[0:RingBuffer.HEADER.size] = RingBuffer.HEADER.pack(0, 0, 0)
+        self.lock = mp.Lock()
+        self.room = mp.Semaphore(0)
+        self.frames = mp.Semaphore(0)
+        self.waiting_room = mp.Value('i', 0, lock=False)
+        self.waiting_frames = mp.Value('i', 0, lock=False)
+        self.consumers = []
+
+    def fits(self, data):
+        """
+        Check whether data can ever be placed into the buffer
+        :param data: bytes
+        :return: bool
+        """
+        return RingBuffer.FRAME_HEADER.size + len(data) <= self.capacity
+
+    def state(self):
+        return RingBuffer.HEADER.unpack(self.buffer[0:RingBuffer.HEADER.size])
+
+    def set_state(self, head, tail, used):
+        self.buffer[0:RingBuffer.HEADER.size] = RingBuffer.HEADER.pack(head, tail, used)
+
+    def check_alive(self):
+        """
+        Check the other side of the buffer is alive
+        :raises HandlerError: in case producer sees dead consumer or consumer sees dead producer
+        """
+        if os.getpid() == self.producer_pid:
+            dead = [process.pid for process in self.consumers if not process.is_alive()]
+            if dead:
+                raise HandlerError("Ring buffer consumer process(es) {} died, batches they were writing are lost".format(
+                    ', '.join(str(pid) for pid in dead)))
+        elif self.producer_pid is not None and os.getppid() != self.producer_pid:
+            raise HandlerError("Ring buffer producer process {} died".format(self.producer_pid))
+
+    def acquire(self):
+        """
+        Acquire the lock, process holding it may be dead
+        :raises HandlerError: the lock is not held then
+        """
+        while not self.lock.acquire(timeout=RingBuffer.POLL_INTERVAL):
+            self.check_alive()
+
+    def release(self):
+        self.lock.release()
+
+    def wait(self, semaphore, waiting):
+        """
+        Release the lock, wait for notification, acquire the lock again. Called under lock.
+        Wake up may be spurious, notification may be missed after timeout - caller re-checks the state anyway
+        :param semaphore: room or frames
+        :param waiting: waiting_room or waiting_frames
+        :raises HandlerError: the lock is not held then
+        """
+        waiting.value += 1
+        self.release()
+        notified = semaphore.acquire(timeout=RingBuffer.POLL_INTERVAL)
+        if not notified:
+            self.check_alive()
+        self.acquire()
+        if not notified and waiting.value > 0:
+            waiting.value -= 1
+
+    def notify(self, semaphore, waiting):
+        """
+        Wake up processes waiting for semaphore. Called under lock
+        :param semaphore: room or frames
+        :param waiting: waiting_room or waiting_frames
+        """
+        for _ in range(waiting.value):
+            semaphore.release()
+        waiting.value = 0
+
+    def write_frame(self, length, data=None):
+        """
+        Place frame into the buffer, wait for room if needed
+        :param length: frame length or one of WRAP, STOP
+        :param data: frame payload
+        """
+        size = RingBuffer.FRAME_HEADER.size + (len(data) if data else 0)
+
+        self.acquire()
+        locked = True
+        try:
+            while True:
+                head, tail, used = self.state()
+                # frame is never split - in case it does not fit till the end of data area, it is placed at the beginning
+                waste = self.capacity - head if head + size > self.capacity else 0
+                if used + waste + size <= self.capacity:
+                    break
+                locked = False
+                self.wait(self.room, self.waiting_room)
+                locked = True
+
+            if waste:
+                if waste >= RingBuffer.FRAME_HEADER.size:
+                    offset = RingBuffer.HEADER.size + head
+                    self.buffer[offset:offset + RingBuffer.FRAME_HEADER.size] = RingBuffer.FRAME_HEADER.pack(RingBuffer.WRAP)
+                head = 0
+                used += waste
+
+            offset = RingBuffer.HEADER.size + head
+            self.buffer[offset:offset + RingBuffer.FRAME_HEADER.size] = RingBuffer.FRAME_HEADER.pack(length)
+            if data:
+                offset += RingBuffer.FRAME_HEADER.size
+                self.buffer[offset:offset + len(data)] = data
+
+            self.set_state((head + size) % self.capacity, tail, used + size)
+            self.notify(self.frames, self.waiting_frames)
+        finally:
+            if locked:
+                self.release()
+
+    def put(self, data):
+        """
+        Place frame into the buffer, wait for room if needed
+        :param data: bytes, len() has to be checked with fits()
+        """
+        if not self.fits(data):
+            raise Exception("Frame of {} bytes does not fit into ring buffer of {} bytes".format(len(data), self.capacity))
+        self.write_frame(len(data), data)
+
+    def get(self):
+        """
+        Take frame out of the buffer, wait for frame if buffer is empty
+        :return: bytes, None in case consumer has to stop
+        """
+        self.acquire()
+        locked = True
+        try:
+            while True:
+                head, tail, used = self.state()
+                if used > 0:
+                    if self.capacity - tail < RingBuffer.FRAME_HEADER.size:
+                        # not enough room for frame header at the end of data area - producer wrapped
+                        used -= self.capacity - tail
+                        tail = 0
+                        self.set_state(head, tail, used)
+                        continue
+
+                    offset = RingBuffer.HEADER.size + tail
+                    length, = RingBuffer.FRAME_HEADER.unpack(self.buffer[offset:offset + RingBuffer.FRAME_HEADER.size])
+                    if length == RingBuffer.WRAP:
+                        used -= self.capacity - tail
+                        tail = 0
+                        self.set_state(head, tail, used)
+                        continue
+                    break
+                locked = False
+                self.wait(self.frames, self.waiting_frames)
+                locked = True
+
+            data = None
+            size = RingBuffer.FRAME_HEADER.size
+            if length != RingBuffer.STOP:
+                offset += RingBuffer.FRAME_HEADER.size
+                data = self.buffer[offset:offset + length]
+                size += length
+
+            self.set_state(head, (tail + size) % self.capacity, used - size)
+            self.notify(self.room, self.waiting_room)
+        finally:
+            if locked:
+                self.release()
+
+        return data
+
+    def start_consumers(self, target, num=1):
+        """
+        Start consumer processes
+        :param target: consumer process body, has to return after get() returned None
+        :param num: number of processes
+        """
+        if self.consumers:
+            return
+
+        logging.info("RingBuffer() start %d consumers", num)
+        self.producer_pid = os.getpid()
+        for i in range(num):
+            process = mp.Process(target=target)
+            process.start()
+            self.consumers.append(process)
+
+        # consumers have to complete frames in buffer before main process exits
+        atexit.register(self.stop_consumers)
+
+    def stop_consumers(self):
+        """Ask consumers to stop after all frames already in the buffer, wait for them"""
+        try:
+            self.check_alive()
+            for process in self.consumers:
+                self.write_frame(RingBuffer.STOP)
+        except HandlerError as ex:
+            # frames left in the buffer would never be taken, lock may be held by dead consumer
+            logging.critical("RingBuffer() unable to stop consumers: %s, terminate them", ex)
+            for process in self.consumers:
+                if process.is_alive():
+                    process.terminate()
+        for process in self.consumers:
+            process.join()
+        self.consumers = []
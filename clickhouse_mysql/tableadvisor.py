@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import datetime
+import logging
+import math
+
+
+class TableAdvisor(object):
+    """
+    Advise ClickHouse column types, codecs and table layout.
+
+    For each column of the sample distinct values count, values length and monotonicity are measured:
+        String columns with few distinct values are made LowCardinality
+        String columns with long values are compressed with ZSTD
+        monotonic integer columns are compressed with Delta, ZSTD
+        monotonic integer columns with constant step and monotonic dates are compressed with DoubleDelta, ZSTD
+
+    Table layout is advised based on MySQL's index statistics and table rows estimate:
+        sort key is the primary key - ReplacingMergeTree replaces rows having the same sort key, thus
+        any updatable column in the sort key would leave previous versions of updated rows forever
+        leading columns of secondary indexes with low cardinality get data skipping indexes instead
+        partition granularity is the finest one which keeps partitions big and their number moderate
+    """
+
+    # min number of non-NULL values in sample to advise on a column
+    MIN_SAMPLE_VALUES = 100
+
+    # String column is LowCardinality in case it has not more distinct values
+    # and not more distinct values per sampled value
+    LOW_CARDINALITY_MAX_DISTINCT = 10000
+    LOW_CARDINALITY_MAX_RATIO = 0.1
+
+    # String column is compressed with ZSTD in case average value length is not less
+    LONG_VALUE_MIN_LENGTH = 64
+
+    # share of non-decreasing (or non-increasing) steps for column to be monotonic
+    MONOTONIC_MIN_RATIO = 0.95
+
+    # share of steps equal to the previous step for column to have constant step
+    CONSTANT_STEP_MIN_RATIO = 0.9
+
+    # column gets data skipping index in case it has not more distinct values per table row
+    SKIP_INDEX_MAX_CARDINALITY_RATIO = 0.01
+    # max number of data skipping indexes per table
+    SKIP_INDEX_MAX_COLUMNS = 3
+    # max number of distinct values kept per indexed block, block with more values is never skipped
+    SKIP_INDEX_SET_SIZE = 100
+    # number of granules per indexed block
+    SKIP_INDEX_GRANULARITY = 4
+
+    # min number of rows in a partition
+    PARTITION_MIN_ROWS = 1000000
+    # max number of partitions in a table
+    PARTITION_MAX_NUM = 1000
+
+    # partition function and number of days in a partition, from finest to coarsest
+    PARTITION_FUNCTIONS = (
+        ('toYYYYMMDD', 1),
+        ('toMonday', 7),
+        ('toYYYYMM', 30.4),
+        ('toYear', 365.25),
+    )
+
+    INTEGER_TYPES = ('Int8', 'Int16', 'Int32', 'Int64', 'UInt8', 'UInt16', 'UInt32', 'UInt64')
+    DATE_TYPES = ('Date', 'DateTime')
+
+    @staticmethod
+    def advise(columns_description, rows):
+        """
+        Apply advice to columns description - update ClickHouse types and set codecs
+        :param columns_description: list of columns descriptions as built by TableSQLBuilder
+        :param rows: list of dict - sample rows
+        :return: columns_description
+        """
+        for column_description in columns_description:
+            field = column_description['field']
+            values = [row[field] for row in rows if row.get(field) is not None]
+            if len(values) < TableAdvisor.MIN_SAMPLE_VALUES:
+                logging.debug("advisor skip column %s, %d values sampled only", field, len(values))
+                continue
+
+            ch_type = column_description['clickhouse_type']
+            if ch_type == 'String':
+                TableAdvisor.advise_string(column_description, values)
+            elif ch_type in TableAdvisor.INTEGER_TYPES:
+                TableAdvisor.advise_integer(column_description, values)
+            elif ch_type in TableAdvisor.DATE_TYPES or ch_type.startswith('DateTime64'):
+                TableAdvisor.advise_date(column_description, values)
+
+        return columns_description
+
+    @staticmethod
+    def advise_string(column_description, values):
+        if not all(isinstance(value, (str, bytes)) for value in values):
+            # DECIMAL, TIME and alike mapped to String
+            return
+
+        distinct = len(set(values))
+        if distinct <= TableAdvisor.LOW_CARDINALITY_MAX_DISTINCT and distinct <= TableAdvisor.LOW_CARDINALITY_MAX_RATIO * len(values):
+            column_description['clickhouse_type'] = 'LowCardinality(String)'
+            column_description['clickhouse_type_nullable'] = 'LowCardinality(Nullable(String))' if column_description['nullable'] else 'LowCardinality(String)'
+            logging.info("advisor column %s: %d distinct of %d values - LowCardinality", column_description['field'], distinct, len(values))
+            return
+
+        length = sum(len(value) for value in values) / len(values)
+        if length >= TableAdvisor.LONG_VALUE_MIN_LENGTH:
+            column_description['codec'] = 'ZSTD'
+            logging.info("advisor column %s: average length %.1f - CODEC(ZSTD)", column_description['field'], length)
+
+    @staticmethod
+    def advise_integer(column_description, values):
+        steps = TableAdvisor.steps(values)
+        if not TableAdvisor.is_monotonic(steps):
+            return
+
+        if TableAdvisor.is_constant_step(steps):
+            column_description['codec'] = 'DoubleDelta, ZSTD'
+        else:
+            column_description['codec'] = 'Delta, ZSTD'
+        logging.info("advisor column %s: monotonic - CODEC(%s)", column_description['field'], column_description['codec'])
+
+    @staticmethod
+    def advise_date(column_description, values):
+        values = [TableAdvisor.date_value(value) for value in values]
+        if None in values:
+            return
+
+        if TableAdvisor.is_monotonic(TableAdvisor.steps(values)):
+            # timestamps grow with small step variation, second-order differences are close to 0
+            column_description['codec'] = 'DoubleDelta, ZSTD'
+            logging.info("advisor column %s: monotonic - CODEC(%s)", column_description['field'], column_description['codec'])
+
+    @staticmethod
+    def date_value(value):
+        """
+        Numeric representation of date/time value
+        :param value: datetime, date or int
+        :return: number or None in case value is not date/time
+        """
+        if isinstance(value, datetime.datetime):
+            return value.timestamp()
+        elif isinstance(value, datetime.date):
+            return value.toordinal()
+        elif isinstance(value, (int, float)):
+            return value
+        return None
+
+    @staticmethod
+    def steps(values):
+        return [values[i] - values[i - 1] for i in range(1, len(values))]
+
+    @staticmethod
+    def is_monotonic(steps):
+        if not steps:
+            return False
+        growing = sum(1 for step in steps if step >= 0)
+        falling = sum(1 for step in steps if step <= 0)
+        return max(growing, falling) >= TableAdvisor.MONOTONIC_MIN_RATIO * len(steps)
+
+    @staticmethod
+    def is_constant_step(steps):
+        if len(steps) < 2:
+            return False
+        same = sum(1 for i in range(1, len(steps)) if steps[i] == steps[i - 1])
+        return same >= TableAdvisor.CONSTANT_STEP_MIN_RATIO * (len(steps) - 1)
+
+    @staticmethod
+    def advise_layout(columns_description, primary_key_fields, primary_date_field, rows_num, statistics, date_range=None):
+        """
+        Advise sort key, data skipping indexes and partitioning of the table
+        :param columns_description: list of columns descriptions
+        :param primary_key_fields: list of primary key columns or None
+        :param primary_date_field: column to partition by or None
+        :param rows_num: int table rows estimate
+        :param statistics: list of (index name, column position in index, column name, cardinality)
+        :param date_range: (min, max) values of primary date field, None in case unknown
+        :return: {
+            'order_by': [column, ...],
+            'skip_indexes': [column, ...],
+            'partition_function': 'toYYYYMM' or None - do not partition,
+        }
+        """
+        order_by = TableAdvisor.advise_sort_key(primary_key_fields, primary_date_field)
+        return {
+            'order_by': order_by,
+            'skip_indexes': TableAdvisor.advise_skip_indexes(columns_description, order_by, rows_num, statistics),
+            'partition_function': TableAdvisor.advise_partition_function(primary_date_field, rows_num, date_range),
+        }
+
+    @staticmethod
+    def advise_sort_key(primary_key_fields, primary_date_field):
+        # sort key of ReplacingMergeTree identifies the row, thus it is the primary key exactly
+        if primary_key_fields is not None:
+            return list(primary_key_fields)
+        elif primary_date_field is not None:
+            return [primary_date_field]
+        else:
+            return []
+
+    @staticmethod
+    def advise_skip_indexes(columns_description, sort_key, rows_num, statistics):
+        if rows_num <= 0:
+            return []
+
+        # skipped columns are not created in ClickHouse
+        fields = [column_description['field'] for column_description in columns_description]
+
+        candidates = {}
+        for (index, seq, column, cardinality) in statistics:
+            if index == 'PRIMARY' or seq != 1 or cardinality is None:
+                continue
+            if column in sort_key or column not in fields:
+                continue
+            if cardinality <= TableAdvisor.SKIP_INDEX_MAX_CARDINALITY_RATIO * rows_num:
+                candidates[column] = min(cardinality, candidates.get(column, cardinality))
+
+        # lowest cardinality columns skip the most blocks
+        return sorted(candidates, key=lambda column: candidates[column])[:TableAdvisor.SKIP_INDEX_MAX_COLUMNS]
+
+    @staticmethod
+    def skip_index_sql(column):
+        """
+        Data skipping index specification for CREATE TABLE statement
+        :param column: string column name
+        :return: string Ex.: INDEX `idx_status` `status` TYPE set(100) GRANULARITY 4
+        """
+        return 'INDEX `idx_{0}` `{0}` TYPE set({1}) GRANULARITY {2}'.format(
+            column,
+            TableAdvisor.SKIP_INDEX_SET_SIZE,
+            TableAdvisor.SKIP_INDEX_GRANULARITY,
+        )
+
+    @staticmethod
+    def advise_partition_function(primary_date_field, rows_num, date_range=None):
+        if primary_date_field is None:
+            return None
+
+        if rows_num < TableAdvisor.PARTITION_MIN_ROWS:
+            # small table - one partition is enough
+            return None
+
+        if date_range is None or date_range[0] is None or date_range[1] is None:
+            return 'toYYYYMM'
+
+        days = TableAdvisor.date_value(date_range[1]) - TableAdvisor.date_value(date_range[0])
+        if isinstance(date_range[0], datetime.datetime):
+            days /= 86400
+        days = max(days, 0) + 1
+
+        for function, period in TableAdvisor.PARTITION_FUNCTIONS:
+            partitions = math.ceil(days / period)
+            if rows_num / partitions >= TableAdvisor.PARTITION_MIN_ROWS and partitions <= TableAdvisor.PARTITION_MAX_NUM:
+                return function
+
+        return TableAdvisor.PARTITION_FUNCTIONS[-1][0]
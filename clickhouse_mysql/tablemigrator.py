@@ -8,6 +8,7 @@ from MySQLdb.cursors import SSDictCursor,Cursor
 from clickhouse_mysql.tableprocessor import TableProcessor
 from clickhouse_mysql.tablesqlbuilder import TableSQLBuilder
 from clickhouse_mysql.event.event import Event
+from clickhouse_mysql.observable import HandlerError
 
 
 class TableMigrator(TableSQLBuilder):
@@ -47,6 +48,10 @@ class TableMigrator(TableSQLBuilder):
             tables_prefixes=None,
             tables_where_clauses=None,
             column_skip=[],
+            precise_types=False,
+            advise_types=False,
+            advise_sample_rows=10000,
+            advise_layout=False,
     ):
         super().__init__(
             host=host,
@@ -61,7 +66,11 @@ class TableMigrator(TableSQLBuilder):
             cluster=cluster,
             tables=tables,
             tables_prefixes=tables_prefixes,
-            column_skip=column_skip
+            column_skip=column_skip,
+            precise_types=precise_types,
+            advise_types=advise_types,
+            advise_sample_rows=advise_sample_rows,
+            advise_layout=advise_layout,
         )
         self.client.cursorclass = SSDictCursor
 
@@ -150,6 +159,30 @@ class TableMigrator(TableSQLBuilder):
                 print("Running with chclient {};".format(templates[db][table]['create_table']))
                 self.chclient.execute(templates[db][table]['create_table'])
 
+    def schema_change_event(self, event=None):
+        """
+        SchemaChangeEvent handler - apply source table's ALTER TABLE to ClickHouse table
+        Failed ALTER stops the reader - rows of new schema would not fit the table anyway
+        :param event: Event with parsed ALTER TABLE statement
+        """
+        sqls = self.alter_table_sql(
+            cluster=self.cluster,
+            dst_schema=self.dst_schema,
+            dst_table=self.dst_table,
+            dst_table_prefix=self.dst_table_prefix,
+            alter=event.alter,
+        )
+        for sql in sqls:
+            logging.info("Alter table: %s", sql)
+            try:
+                self.chclient.execute(sql)
+            except Exception as ex:
+                logging.critical("Unable to alter table %s.%s: %s", event.schema, event.table, ex)
+                raise HandlerError(
+                    "Unable to apply '{}' to ClickHouse, alter the table manually (ex.: sort key columns can not be "
+                    "modified or renamed) and restart from the ALTER TABLE binlog position: {}".format(sql, ex)
+                )
+
     def migrate_all_tables_data(self):
         """
         High-level migration function. Loops over tables and migrate each of them
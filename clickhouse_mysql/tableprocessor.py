@@ -13,6 +13,10 @@ class TableProcessor(object):
     dbs = None
     tables = None
     tables_prefixes = None
+    precise_types = False
+    advise_types = False
+    advise_sample_rows = 10000
+    advise_layout = False
 
     ACTION_FAIL = 1
     ACTION_IGNORE_TABLE = 2
@@ -33,6 +37,10 @@ class TableProcessor(object):
             tables=None,
             tables_prefixes=None,
             column_skip=[],
+            precise_types=False,
+            advise_types=False,
+            advise_sample_rows=10000,
+            advise_layout=False,
     ):
         """
         :param host: string MySQL host
@@ -42,6 +50,11 @@ class TableProcessor(object):
         :param dbs: list of string MySQL databases. May be omitted, in this case tables has to contain full table names, Ex.: db.table1
         :param tables: list of string list of table names. Table names may be short or full form
         :param tables_prefixes: list of string list of table prefixes. May be short or full form
+        :param precise_types: bool map DECIMAL, fractional DATETIME, TIME, ENUM and SET to ClickHouse types
+            keeping their precision and values instead of String
+        :param advise_types: bool sample tables and advise LowCardinality types and codecs for ClickHouse columns
+        :param advise_sample_rows: int max number of rows to sample from each table
+        :param advise_layout: bool advise ClickHouse tables sort key and partitioning based on MySQL index statistics
         """
         self.dbs = [] if dbs is None else dbs
         self.tables = [] if tables is None else tables
@@ -58,6 +71,10 @@ class TableProcessor(object):
         self.cluster = cluster
         self.distribute = distribute
         self.column_skip = column_skip
+        self.precise_types = precise_types
+        self.advise_types = advise_types
+        self.advise_sample_rows = advise_sample_rows
+        self.advise_layout = advise_layout
 
     def dbs_tables_lists(self):
         """
@@ -2,8 +2,10 @@
 # -*- coding: utf-8 -*-
 
 from clickhouse_mysql.tableprocessor import TableProcessor
-from MySQLdb.cursors import Cursor
+from clickhouse_mysql.tableadvisor import TableAdvisor
+from MySQLdb.cursors import Cursor, SSDictCursor
 import logging
+import re
 
 
 class TableSQLBuilder(TableProcessor):
@@ -55,6 +57,9 @@ class TableSQLBuilder(TableProcessor):
         :return: dict{"template":SQL, "fields": {}} or string SQL
         """
         columns_description = self.create_table_columns_description(db=db, table=table)
+        if self.advise_types:
+            TableAdvisor.advise(columns_description, self.sample_rows(db=db, table=table, columns_description=columns_description))
+        layout = self.table_layout(db=db, table=table, columns_description=columns_description) if self.advise_layout else None
         return {
             "create_table_template": self.create_table_sql_template(cluster=cluster,
                                                                     dst_schema=dst_schema,
@@ -69,7 +74,8 @@ class TableSQLBuilder(TableProcessor):
                                                   dst_table_prefix=dst_table_prefix,
                                                   db=db,
                                                   table=table,
-                                                  columns_description=columns_description),
+                                                  columns_description=columns_description,
+                                                  layout=layout),
             "create_database": self.create_database_sql(dst_schema=dst_schema, db=db),
             "fields": columns_description,
         }
@@ -91,7 +97,7 @@ class TableSQLBuilder(TableProcessor):
 
         ch_columns = []
         for column_description in columns_description:
-            ch_columns.append('`{}` {}'.format(column_description['field'], column_description['clickhouse_type_nullable']))
+            ch_columns.append(self.create_column_sql(column_description['field'], column_description['clickhouse_type_nullable'], column_description))
 
         sql = """CREATE TABLE IF NOT EXISTS {} {} (
     {}
@@ -104,7 +110,7 @@ ENGINE = MergeTree(<PRIMARY_DATE_FIELD>, (<COMMA_SEPARATED_INDEX_FIELDS_LIST>),
         )
         return sql
 
-    def create_table_sql(self, cluster=None, dst_schema=None, dst_table=None, dst_table_prefix=None, db=None, table=None, columns_description=None):
+    def create_table_sql(self, cluster=None, dst_schema=None, dst_table=None, dst_table_prefix=None, db=None, table=None, columns_description=None, layout=None):
         """
         Produce table template for ClickHouse
         CREATE TABLE(
@@ -116,6 +122,7 @@ ENGINE = MergeTree(<PRIMARY_DATE_FIELD>, (<COMMA_SEPARATED_INDEX_FIELDS_LIST>),
 
         :param db: string - name of the DB in MySQL
         :param table: string - name of the table in MySQL which will be used as a base for CH's CREATE TABLE template
+        :param layout: dict - advised sort key, data skipping indexes and partition function, as returned by table_layout()
         :return: string - ready-to-use ClickHouse CREATE TABLE statement
         """
 
@@ -134,11 +141,21 @@ ENGINE = MergeTree(<PRIMARY_DATE_FIELD>, (<COMMA_SEPARATED_INDEX_FIELDS_LIST>),
             primary_key_fields = []
             primary_key_fields.append(primary_date_field)
 
+        partition_function = 'toYYYYMM'
+        if layout is not None:
+            primary_key_fields = layout['order_by']
+            partition_function = layout['partition_function']
+
         for column_description in columns_description:
             field = column_description['field']
             # primary date and primary key fields can't be nullable
             ch_type = column_description['clickhouse_type'] if (field == primary_date_field) or (field in primary_key_fields) else column_description['clickhouse_type_nullable']
-            ch_columns.append('`{}` {}'.format(field, ch_type))
+            ch_columns.append(self.create_column_sql(field, ch_type, column_description))
+
+        if layout is not None and not self.distribute:
+            # Distributed table has no indexes of its own
+            for column in layout['skip_indexes']:
+                ch_columns.append(TableAdvisor.skip_index_sql(column))
 
         sql = """CREATE TABLE IF NOT EXISTS {} {} (
     {}
@@ -153,10 +170,83 @@ ENGINE = MergeTree(<PRIMARY_DATE_FIELD>, (<COMMA_SEPARATED_INDEX_FIELDS_LIST>),
                                      self.create_migrated_table_name(prefix=dst_table_prefix, table=dst_table) if dst_table is not None else self.create_migrated_table_name(prefix=dst_table_prefix, table=table),
                                      primary_date_field,
                                      ",".join(primary_key_fields),
-                                     self.distribute)
+                                     self.distribute,
+                                     partition_function)
         )
         return sql
 
+    def create_column_sql(self, field, ch_type, column_description):
+        """
+        Produce column specification for CREATE TABLE statement
+        :param field: string - column name
+        :param ch_type: string - ClickHouse type of the column
+        :param column_description: dict - column description, may have codec advised
+        :return: string Ex.: `id` UInt64 CODEC(Delta, ZSTD)
+        """
+        if column_description.get('codec'):
+            return '`{}` {} CODEC({})'.format(field, ch_type, column_description['codec'])
+        return '`{}` {}'.format(field, ch_type)
+
+    def alter_table_sql(self, cluster=None, dst_schema=None, dst_table=None, dst_table_prefix=None, alter=None):
+        """
+        Produce ClickHouse ALTER TABLE statements equivalent to MySQL's ALTER TABLE
+        Columns are added, dropped, modified and renamed, the rest of changes (indexes, table options) are ignored
+
+        :param alter: dict - parsed MySQL's ALTER TABLE statement, as returned by DDLParser.parse_alter_table()
+        :return: list of string - ready-to-use ClickHouse ALTER TABLE statements, to be run in order, empty in case nothing to alter
+        """
+        clauses = []
+        for spec in alter['specs']:
+            action = spec['action']
+            if action in ('add', 'drop', 'modify', 'change', 'rename_column') and spec['column'] in self.column_skip:
+                logging.debug("alter table sql builder skip column %s", spec['column'])
+                continue
+
+            if action == 'add':
+                clause = 'ADD COLUMN IF NOT EXISTS `{}` {}'.format(
+                    spec['column'],
+                    self.map_type_nullable(mysql_type=spec['type'], nullable=spec['nullable'])
+                )
+                if spec['first']:
+                    clause += ' FIRST'
+                elif spec['after'] is not None:
+                    clause += ' AFTER `{}`'.format(spec['after'])
+                clauses.append(clause)
+            elif action == 'drop':
+                clauses.append('DROP COLUMN IF EXISTS `{}`'.format(spec['column']))
+            elif action == 'modify':
+                clauses.append('MODIFY COLUMN `{}` {}'.format(
+                    spec['column'],
+                    self.map_type_nullable(mysql_type=spec['type'], nullable=spec['nullable'])
+                ))
+            elif action == 'change':
+                if spec['new_column'] != spec['column']:
+                    clauses.append('RENAME COLUMN IF EXISTS `{}` TO `{}`'.format(spec['column'], spec['new_column']))
+                clauses.append('MODIFY COLUMN `{}` {}'.format(
+                    spec['new_column'],
+                    self.map_type_nullable(mysql_type=spec['type'], nullable=spec['nullable'])
+                ))
+            elif action == 'rename_column':
+                clauses.append('RENAME COLUMN IF EXISTS `{}` TO `{}`'.format(spec['column'], spec['new_column']))
+            else:
+                logging.warning("ALTER TABLE %s.%s %s is not applied to ClickHouse", alter['schema'], alter['table'], spec)
+
+        if not clauses:
+            return []
+
+        # local table first, distributed one has the same columns
+        tables = [(
+            self.create_full_table_name(dst_schema=dst_schema, dst_table=dst_table, dst_table_prefix=dst_table_prefix, db=alter['schema'], table=alter['table']),
+            "ON CLUSTER {} ".format(cluster) if cluster is not None else "",
+        )]
+        if self.distribute:
+            distributed_table = self.create_full_table_name(dst_schema=dst_schema, dst_table=dst_table, dst_table_prefix=dst_table_prefix, db=alter['schema'], table=alter['table'], distribute=True)
+            if distributed_table != tables[0][0]:
+                tables.append((distributed_table, ""))
+
+        # ClickHouse does not rename and modify the same column in one statement - one statement per change
+        return ["ALTER TABLE {} {}{}".format(table, on_cluster, clause) for (table, on_cluster) in tables for clause in clauses]
+
     def create_database_sql(self, dst_schema=None, db=None):
         """
         Produce create database statement for ClickHouse
@@ -211,6 +301,84 @@ ENGINE = MergeTree(<PRIMARY_DATE_FIELD>, (<COMMA_SEPARATED_INDEX_FIELDS_LIST>),
 
         return columns_description
 
+    def sample_rows(self, db=None, table=None, columns_description=None):
+        """
+        Fetch first rows of the table in primary key order - the order rows are written in mostly
+        :param db: string MySQL db name
+        :param table: string MySQL table name
+        :param columns_description: list of columns descriptions
+        :return: list of dict, up to advise_sample_rows rows
+        """
+        sql = "SELECT {} FROM {}".format(
+            ",".join(['`{}`'.format(column_description['field']) for column_description in columns_description]),
+            self.create_full_table_name(db=db, table=table),
+        )
+        primary_key_fields = self.fetch_primary_key_fields(columns_description)
+        if primary_key_fields is not None:
+            sql += " ORDER BY {}".format(",".join(['`{}`'.format(field) for field in primary_key_fields]))
+        sql += " LIMIT {}".format(self.advise_sample_rows)
+
+        logging.info("sample table. sql=%s", sql)
+        self.client.cursorclass = SSDictCursor
+        self.client.connect(db=db)
+        self.client.cursor.execute(sql)
+        rows = []
+        while True:
+            batch = self.client.cursor.fetchmany(10000)
+            if not batch:
+                break
+            rows.extend(batch)
+
+        return rows
+
+    def table_layout(self, db=None, table=None, columns_description=None):
+        """
+        Advise sort key, data skipping indexes and partitioning of ClickHouse table based on MySQL's index statistics and rows estimate
+        :param db: string MySQL db name
+        :param table: string MySQL table name
+        :param columns_description: list of columns descriptions
+        :return: dict as returned by TableAdvisor.advise_layout()
+        """
+        self.client.cursorclass = Cursor
+        self.client.connect(db=db)
+
+        self.client.cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s",
+            (db, table)
+        )
+        row = self.client.cursor.fetchone()
+        rows_num = int(row[0]) if row and row[0] is not None else 0
+
+        # [(index name, column position in index, column name, cardinality)]
+        self.client.cursor.execute(
+            "SELECT INDEX_NAME, SEQ_IN_INDEX, COLUMN_NAME, CARDINALITY FROM information_schema.STATISTICS "
+            "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s ORDER BY INDEX_NAME, SEQ_IN_INDEX",
+            (db, table)
+        )
+        statistics = list(self.client.cursor.fetchall())
+
+        # date range is cheap to fetch for indexed column only
+        primary_date_field = self.fetch_primary_date_field(columns_description)
+        date_range = None
+        if primary_date_field is not None and any(seq == 1 and column == primary_date_field for (_, seq, column, _) in statistics):
+            self.client.cursor.execute("SELECT MIN(`{0}`), MAX(`{0}`) FROM {1}".format(
+                primary_date_field,
+                self.create_full_table_name(db=db, table=table),
+            ))
+            date_range = self.client.cursor.fetchone()
+
+        layout = TableAdvisor.advise_layout(
+            columns_description=columns_description,
+            primary_key_fields=self.fetch_primary_key_fields(columns_description),
+            primary_date_field=primary_date_field,
+            rows_num=rows_num,
+            statistics=statistics,
+            date_range=date_range,
+        )
+        logging.info("advisor table %s.%s rows=%d: ORDER BY (%s) INDEX (%s) PARTITION BY %s",
+                     db, table, rows_num, ",".join(layout['order_by']), ",".join(layout['skip_indexes']), layout['partition_function'])
+        return layout
+
     def fetch_primary_date_field(self, columns_description):
         """
         Fetch first Date column name
@@ -222,6 +390,8 @@ ENGINE = MergeTree(<PRIMARY_DATE_FIELD>, (<COMMA_SEPARATED_INDEX_FIELDS_LIST>),
                 return column_description['field']
             if column_description['clickhouse_type'] == 'DateTime':
                 return column_description['field']
+            if column_description['clickhouse_type'].startswith('DateTime64'):
+                return column_description['field']
 
         return None
 
@@ -269,6 +439,9 @@ ENGINE = MergeTree(<PRIMARY_DATE_FIELD>, (<COMMA_SEPARATED_INDEX_FIELDS_LIST>),
             UInt32
         """
 
+        # ENUM and SET values are case-sensitive
+        mysql_type_original = mysql_type
+
         # deal with UPPER CASE strings for simplicity
         mysql_type = mysql_type.upper()
 
@@ -290,7 +463,15 @@ ENGINE = MergeTree(<PRIMARY_DATE_FIELD>, (<COMMA_SEPARATED_INDEX_FIELDS_LIST>),
         elif mysql_type.startswith('SERIAL'):
             ch_type = 'UInt64'
         elif mysql_type.startswith('DECIMAL') or mysql_type.startswith('DEC') or mysql_type.startswith('FIXED') or mysql_type.startswith('NUMERIC'):
-            ch_type = 'String'
+            if self.precise_types:
+                # DECIMAL is DECIMAL(10,0), DECIMAL(M) is DECIMAL(M,0)
+                params = TableSQLBuilder.type_params(mysql_type)
+                ch_type = 'Decimal({}, {})'.format(
+                    params[0] if len(params) > 0 else 10,
+                    params[1] if len(params) > 1 else 0,
+                )
+            else:
+                ch_type = 'String'
         elif mysql_type.startswith('FLOAT'):
             ch_type = 'Float32'
         elif mysql_type.startswith('DOUBLE') or mysql_type.startswith('REAL'):
@@ -298,13 +479,19 @@ ENGINE = MergeTree(<PRIMARY_DATE_FIELD>, (<COMMA_SEPARATED_INDEX_FIELDS_LIST>),
 
         # Date and Time Types
         elif mysql_type.startswith('DATETIME'):
-            ch_type = 'DateTime'
+            ch_type = self.map_datetime_type(mysql_type)
         elif mysql_type.startswith('DATE'):
             ch_type = 'Date'
         elif mysql_type.startswith('TIMESTAMP'):
-            ch_type = 'DateTime'
+            ch_type = self.map_datetime_type(mysql_type)
         elif mysql_type.startswith('TIME'):
-            ch_type = 'String'
+            if self.precise_types:
+                # seconds, with fractional part in case TIME has fractional seconds precision
+                params = TableSQLBuilder.type_params(mysql_type)
+                fsp = int(params[0]) if params else 0
+                ch_type = 'Decimal(18, {})'.format(fsp) if fsp > 0 else 'Int32'
+            else:
+                ch_type = 'String'
         elif mysql_type.startswith('YEAR'):
             ch_type = 'UInt16'
 
@@ -336,9 +523,9 @@ ENGINE = MergeTree(<PRIMARY_DATE_FIELD>, (<COMMA_SEPARATED_INDEX_FIELDS_LIST>),
 
         # Set Types
         elif mysql_type.startswith('ENUM'):
-            ch_type = 'Enum16'
+            ch_type = self.map_enum_type(mysql_type_original) if self.precise_types else 'Enum16'
         elif mysql_type.startswith('SET'):
-            ch_type = 'Array(Int8)'
+            ch_type = 'Array(LowCardinality(String))' if self.precise_types else 'Array(Int8)'
 
         # Custom Types
         elif mysql_type.startswith('JSON'):
@@ -349,6 +536,52 @@ ENGINE = MergeTree(<PRIMARY_DATE_FIELD>, (<COMMA_SEPARATED_INDEX_FIELDS_LIST>),
 
         return ch_type
 
+    @staticmethod
+    def type_params(mysql_type):
+        """
+        Fetch numeric type parameters
+        :param mysql_type: string MySQL type. Ex.: 'DECIMAL(10,2) UNSIGNED'
+        :return: list of string. Ex.: ['10', '2']
+        """
+        match = re.search(r'\(([^)]*)\)', mysql_type)
+        if match is None:
+            return []
+        return [param.strip() for param in match.group(1).split(',') if param.strip()]
+
+    @staticmethod
+    def enum_values(mysql_type):
+        """
+        Fetch ENUM or SET values
+        :param mysql_type: string MySQL type. Ex.: "enum('small','it''s big')"
+        :return: list of string. Ex.: ['small', "it's big"]
+        """
+        return [value.replace("''", "'") for value in re.findall(r"'((?:[^']|'')*)'", mysql_type)]
+
+    def map_datetime_type(self, mysql_type):
+        """
+        Map DATETIME or TIMESTAMP, fractional seconds are kept with precise types
+        :param mysql_type: string MySQL type in UPPER CASE. Ex.: 'DATETIME(3)'
+        :return: string ClickHouse type. Ex.: 'DateTime64(3)'
+        """
+        params = TableSQLBuilder.type_params(mysql_type)
+        fsp = int(params[0]) if params else 0
+        if self.precise_types and fsp > 0:
+            return 'DateTime64({})'.format(fsp)
+        return 'DateTime'
+
+    def map_enum_type(self, mysql_type):
+        """
+        Map ENUM with its values. MySQL numbers values starting with 1, empty string is an invalid value with index 0
+        :param mysql_type: string MySQL type. Ex.: "enum('small','big')"
+        :return: string ClickHouse type. Ex.: "Enum8('' = 0, 'small' = 1, 'big' = 2)"
+        """
+        values = TableSQLBuilder.enum_values(mysql_type)
+        items = ["'' = 0"] + [
+            "'{}' = {}".format(value.replace('\\', '\\\\').replace("'", "\\'"), index)
+            for index, value in enumerate(values, start=1)
+        ]
+        return '{}({})'.format('Enum8' if len(values) <= 127 else 'Enum16', ', '.join(items))
+
     def map_type_nullable(self, mysql_type, nullable=False):
         """
         Map MySQL type (as a string from DESC table statement) to ClickHouse type (as string)
@@ -361,7 +594,8 @@ ENGINE = MergeTree(<PRIMARY_DATE_FIELD>, (<COMMA_SEPARATED_INDEX_FIELDS_LIST>),
         ch_type = self.map_type(mysql_type)
 
         # Deal with NULLs
-        if nullable:
+        # Array can not be Nullable - NULL is inserted as an empty array
+        if nullable and not ch_type.startswith('Array'):
             ch_type = 'Nullable(' + ch_type + ')'
 
         return ch_type
@@ -372,7 +606,8 @@ ENGINE = MergeTree(<PRIMARY_DATE_FIELD>, (<COMMA_SEPARATED_INDEX_FIELDS_LIST>),
                             dst_table=None,
                             primary_date_field=None,
                             primary_key_fields=None,
-                            distribute=None):
+                            distribute=None,
+                            partition_function='toYYYYMM'):
         """
         :param cluster:
         :param dst_schema:
@@ -380,6 +615,7 @@ ENGINE = MergeTree(<PRIMARY_DATE_FIELD>, (<COMMA_SEPARATED_INDEX_FIELDS_LIST>),
         :param primary_date_field:
         :param primary_key_fields:
         :param distribute:
+        :param partition_function: function to partition by primary date field, None - do not partition. Ex.: toYYYYMM
         :return:
         """
         if distribute:
@@ -390,8 +626,8 @@ ENGINE = MergeTree(<PRIMARY_DATE_FIELD>, (<COMMA_SEPARATED_INDEX_FIELDS_LIST>),
             )
         else:
             engine = "ENGINE = ReplacingMergeTree() "
-            if primary_date_field is not None:
-                engine += "PARTITION BY toYYYYMM({}) ".format(primary_date_field)
+            if primary_date_field is not None and partition_function is not None:
+                engine += "PARTITION BY {}({}) ".format(partition_function, primary_date_field)
             if primary_key_fields is not None:
                 engine += "ORDER BY ({})".format(primary_key_fields)
             return engine
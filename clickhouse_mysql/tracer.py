@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import threading
+import time
+
+
+class Tracer(object):
+    """
+    Stage timing for reader, pool and writers.
+
+    Each sample_rate-th event read from the source is traced - time spent in per-event stages (decode, pool insert,
+    etc) is measured for sampled events only. Batch-level stages (convert, insert into ClickHouse, upload CSV, etc)
+    are measured each time while tracing is enabled.
+    Aggregated timings are logged each report_interval seconds, each report covers the last interval only.
+    Trace points may be called from several threads (multiple sources, fan-out destinations) - each thread
+    tracks whether its current event is sampled, timings are aggregated under lock.
+
+    When tracing is disabled trace points cost one attribute check. Tracing can be switched on and off at runtime -
+    signal handler only requests the switch, it is made by the next event, as the handler may interrupt
+    a trace point holding the lock.
+
+    Usage:
+        started = Tracer.start()
+        ... do stage work ...
+        Tracer.stop('stage.name', started)
+    """
+
+    # sample rate to be used when tracing is switched on at runtime and no sample rate configured
+    DEFAULT_SAMPLE_RATE = 1000
+
+    enabled = False
+
+    # trace each N-th event
+    sample_rate = 0
+
+    # is current event of the thread sampled - local.sampled
+    local = threading.local()
+
+    # number of events seen since tracing enabled
+    events_num = 0
+
+    # log aggregated timings each N seconds
+    report_interval = 60
+    reported_at = 0
+
+    # aggregated timings since last report
+    # {
+    #   'stage.name': [calls number, total sec, max sec],
+    # }
+    stats = {}
+
+    # guards stats and events_num
+    lock = threading.Lock()
+
+    # switch on/off requested by toggle(), made by begin_event()
+    toggle_requested = False
+    toggle_lock = threading.Lock()
+
+    @staticmethod
+    def setup(sample_rate=0, report_interval=60):
+        """
+        Configure tracing
+        :param sample_rate: trace each N-th event. 0 - tracing disabled
+        :param report_interval: log aggregated timings each N seconds
+        """
+        Tracer.report_interval = report_interval
+        if sample_rate:
+            Tracer.enable(sample_rate)
+        else:
+            Tracer.disable()
+
+    @staticmethod
+    def enable(sample_rate=None):
+        Tracer.sample_rate = sample_rate if sample_rate else Tracer.DEFAULT_SAMPLE_RATE
+        Tracer.reset()
+        Tracer.enabled = True
+        logging.info("Tracing enabled, trace each %d event", Tracer.sample_rate)
+
+    @staticmethod
+    def disable():
+        if Tracer.enabled:
+            Tracer.report()
+            logging.info("Tracing disabled")
+        Tracer.enabled = False
+        Tracer.local.sampled = False
+
+    @staticmethod
+    def toggle(signum=None, frame=None):
+        """Request tracing switch on/off. Has signal handler signature, thus takes no locks"""
+        Tracer.toggle_requested = True
+
+    @staticmethod
+    def apply_toggle():
+        """Switch tracing on/off as requested by toggle()"""
+        with Tracer.toggle_lock:
+            if not Tracer.toggle_requested:
+                # switched by another thread
+                return
+            Tracer.toggle_requested = False
+            if Tracer.enabled:
+                Tracer.disable()
+            else:
+                Tracer.enable(Tracer.sample_rate)
+
+    @staticmethod
+    def reset():
+        with Tracer.lock:
+            Tracer.stats = {}
+            Tracer.events_num = 0
+        Tracer.local.sampled = False
+        Tracer.reported_at = time.time()
+
+    @staticmethod
+    def begin_event():
+        """Called by reader on each event read from the source - decides whether this event is sampled"""
+        if Tracer.toggle_requested:
+            Tracer.apply_toggle()
+
+        if not Tracer.enabled:
+            return
+
+        with Tracer.lock:
+            Tracer.events_num += 1
+            sampled = (Tracer.events_num % Tracer.sample_rate) == 0
+        Tracer.local.sampled = sampled
+
+        if sampled and (time.time() >= Tracer.reported_at + Tracer.report_interval):
+            Tracer.report()
+
+    @staticmethod
+    def start():
+        """
+        Start per-event stage
+        :return: start time in case current event is sampled, None otherwise
+        """
+        return time.time() if getattr(Tracer.local, 'sampled', False) else None
+
+    @staticmethod
+    def start_batch():
+        """
+        Start batch-level stage
+        :return: start time in case tracing is enabled, None otherwise
+        """
+        return time.time() if Tracer.enabled else None
+
+    @staticmethod
+    def stop(stage, started):
+        """
+        Complete stage
+        :param stage: stage name. Ex.: 'pool.insert'
+        :param started: value returned by start() or start_batch()
+        """
+        if started is None:
+            return
+
+        duration = time.time() - started
+        with Tracer.lock:
+            stat = Tracer.stats.get(stage)
+            if stat is None:
+                Tracer.stats[stage] = [1, duration, duration]
+            else:
+                stat[0] += 1
+                stat[1] += duration
+                if duration > stat[2]:
+                    stat[2] = duration
+
+    @staticmethod
+    def snapshot():
+        """
+        Copy of timings aggregated since last report
+        :return: dict of stage name -> (calls number, total sec, max sec)
+        """
+        with Tracer.lock:
+            return {stage: tuple(stat) for stage, stat in Tracer.stats.items()}
+
+    @staticmethod
+    def report():
+        """Log timings aggregated since last report and start new interval"""
+        now = time.time()
+        with Tracer.lock:
+            stats = Tracer.stats
+            Tracer.stats = {}
+        interval = now - Tracer.reported_at
+        Tracer.reported_at = now
+
+        for stage in sorted(stats):
+            calls, total, longest = stats[stage]
+            logging.info(
+                'TRACE - interval:%.1f sec stage:%s calls:%d total:%f sec avg:%f sec max:%f sec',
+                interval,
+                stage,
+                calls,
+                total,
+                total / calls,
+                longest,
+            )
@@ -3,6 +3,7 @@
 
 
 import logging
+import os
 import pprint
 import sys
 import importlib.util
@@ -39,3 +40,18 @@ class Util(object):
         spec.loader.exec_module(module)
         _class = getattr(module, class_name)
         return _class
+
+    @staticmethod
+    def package_file(path):
+        """
+        Absolute path of the file shipped along with the package
+        :param path: path relative to the package dir. Ex.: '../clickhouse_mysql.etc/clickhouse-mysql.conf'
+        :return: str
+        """
+        try:
+            import importlib.resources
+            package_dir = str(importlib.resources.files('clickhouse_mysql'))
+        except (ImportError, AttributeError):
+            # importlib.resources.files() is available since python 3.9
+            package_dir = os.path.dirname(os.path.realpath(__file__))
+        return os.path.abspath(os.path.join(package_dir, path))
@@ -1,15 +1,21 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import hashlib
+import json
 import logging
+import socket
 import sys
+import time
 
-from decimal import Decimal
+
+from clickhouse_driver import errors
 
 from clickhouse_mysql.dbclient.chclient import CHClient
 
 from clickhouse_mysql.writer.writer import Writer
 from clickhouse_mysql.tableprocessor import TableProcessor
+from clickhouse_mysql.tracer import Tracer
 import datetime
 
 
@@ -21,6 +27,58 @@ class CHWriter(Writer):
     dst_table = None
     dst_distribute = None
 
+    # ClickHouse error codes of failures, which are expected to pass by themselves
+    RETRYABLE_ERROR_CODES = {
+        159,  # TIMEOUT_EXCEEDED
+        164,  # READONLY
+        202,  # TOO_MANY_SIMULTANEOUS_QUERIES
+        209,  # SOCKET_TIMEOUT
+        210,  # NETWORK_ERROR
+        241,  # MEMORY_LIMIT_EXCEEDED
+        242,  # TABLE_IS_READ_ONLY
+        252,  # TOO_MANY_PARTS
+        319,  # UNKNOWN_STATUS_OF_INSERT
+        425,  # SYSTEM_ERROR
+        999,  # KEEPER_EXCEPTION
+    }
+
+    # ClickHouse error codes of failures caused by rows data
+    BAD_DATA_ERROR_CODES = {
+        6,    # CANNOT_PARSE_TEXT
+        27,   # CANNOT_PARSE_INPUT_ASSERTION_FAILED
+        38,   # CANNOT_PARSE_DATE
+        41,   # CANNOT_PARSE_DATETIME
+        53,   # TYPE_MISMATCH
+        69,   # ARGUMENT_OUT_OF_BOUND
+        70,   # CANNOT_CONVERT_TYPE
+        72,   # CANNOT_PARSE_NUMBER
+        117,  # INCORRECT_DATA
+        349,  # CANNOT_INSERT_NULL_IN_ORDINARY_COLUMN
+        376,  # CANNOT_PARSE_UUID
+        377,  # CANNOT_PARSE_DOMAIN_VALUE_FROM_STRING
+    }
+
+    # max pause between retries, sec
+    RETRY_BACKOFF_MAX = 60
+
+    # number of retries of failed INSERT, 0 - do not retry
+    insert_retries = 0
+
+    # pause before the first retry, sec. Each next pause is twice as long
+    insert_retry_backoff = 1
+
+    # attach insert_deduplication_token to each INSERT
+    insert_deduplicate = False
+
+    # file to append rows, which can not be inserted, to. None - rows are logged
+    dead_letter_file = None
+
+    # insert NULL into not Nullable column as column default value. Ex.: NULL SET as an empty array
+    null_as_default = False
+
+    # CHCluster to insert rows directly into local tables of its shards, None - insert via connection_settings
+    cluster = None
+
     def __init__(
             self,
             connection_settings,
@@ -30,18 +88,228 @@ class CHWriter(Writer):
             dst_distribute=False,
             next_writer_builder=None,
             converter_builder=None,
+            insert_retries=0,
+            insert_retry_backoff=1,
+            insert_deduplicate=False,
+            dead_letter_file=None,
+            cluster=None,
+            null_as_default=False,
     ):
-        if dst_distribute and dst_schema is not None:
+        # rows are inserted either into Distributed table or directly into local tables of the shards
+        if dst_distribute and cluster is None and dst_schema is not None:
             dst_schema += "_all"
-        if dst_distribute and dst_table is not None:
+        if dst_distribute and cluster is None and dst_table is not None:
             dst_table += "_all"
-        logging.info("CHWriter() connection_settings={} dst_schema={} dst_table={} dst_distribute={}".format(
-            connection_settings, dst_schema, dst_table, dst_distribute))
+        logging.info("CHWriter() connection_settings=%s dst_schema=%s dst_table=%s dst_distribute=%s "
+                     "insert_retries=%s insert_retry_backoff=%s insert_deduplicate=%s dead_letter_file=%s "
+                     "cluster=%s",
+                     connection_settings, dst_schema, dst_table, dst_distribute,
+                     insert_retries, insert_retry_backoff, insert_deduplicate, dead_letter_file,
+                     cluster.cluster if cluster is not None else None)
         self.client = CHClient(connection_settings)
         self.dst_schema = dst_schema
         self.dst_table = dst_table
         self.dst_table_prefix = dst_table_prefix
         self.dst_distribute = dst_distribute
+        self.insert_retries = insert_retries
+        self.insert_retry_backoff = insert_retry_backoff
+        self.insert_deduplicate = insert_deduplicate
+        self.dead_letter_file = dead_letter_file
+        self.cluster = cluster
+        self.null_as_default = null_as_default
+
+    @staticmethod
+    def deduplication_token(schema, table, events, offset=0):
+        """
+        Build INSERT deduplication token of the batch.
+        Token depends on target table, binlog positions of the first and the last rows and position of the batch
+        within the split original batch only, thus the same batch gets the same token when it is retried
+        or replayed after restart
+        :param schema: target db name
+        :param table: target table name
+        :param events: list of Event, one per row of the batch
+        :param offset: offset of the batch within the original batch, in case it was split
+        :return: str, None in case events have no binlog position
+        """
+        positions = [
+            (event.log_file, event.pymysqlreplication_event.packet.log_pos)
+            for event in events if event.pymysqlreplication_event is not None
+        ]
+        if not positions:
+            return None
+
+        key = '{}:{}.{}:{}:{}-{}:{}:{}:{}'.format(
+            events[0].source,
+            schema,
+            table,
+            positions[0][0],
+            positions[0][1],
+            positions[-1][0],
+            positions[-1][1],
+            offset,
+            len(events),
+        )
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def is_retryable(self, ex):
+        """
+        Check whether failed INSERT is worth retrying - connection problems and server overload are,
+        bad data is not
+        :param ex: exception INSERT failed with
+        :return: bool
+        """
+        if isinstance(ex, (errors.NetworkError, errors.SocketTimeoutError, EOFError, socket.timeout, ConnectionError)):
+            return True
+        if isinstance(ex, errors.ServerException):
+            return ex.code in CHWriter.RETRYABLE_ERROR_CODES
+        return False
+
+    def is_bad_data(self, ex):
+        """
+        Check whether INSERT failed because server can not accept rows data.
+        Only server errors are considered - they fail the same rows the same way each time, which makes
+        batch split deterministic. Driver side exceptions may be caused by bugs as well, rows are not
+        dead-lettered because of them
+        :param ex: exception INSERT failed with
+        :return: bool
+        """
+        return isinstance(ex, errors.ServerException) and ex.code in CHWriter.BAD_DATA_ERROR_CODES
+
+    def execute_insert(self, schema, table, rows, events, operation):
+        """
+        INSERT rows into ClickHouse
+        :param schema: target db name
+        :param table: target table name
+        :param rows: list of dict
+        :param events: list of Event, one per row - Event row is converted from
+        :param operation: operation name for logging. Ex.: 'INSERT'
+        """
+        if not rows:
+            logging.warning('No rows to insert into %s.%s. class: %s', schema, table, __class__)
+            return
+
+        sql = 'INSERT INTO `{0}`.`{1}` ({2}) VALUES'.format(
+            schema,
+            table,
+            ', '.join(map(lambda column: '`%s`' % column, rows[0].keys()))
+        )
+        logging.debug("CHWRITER QUERY %s: %s", operation, sql)
+
+        try:
+            if self.cluster is None:
+                self.insert_rows(sql, schema, table, rows, events)
+            else:
+                # each shard gets its part of rows into its local table, split depends on batch only
+                token = CHWriter.deduplication_token(schema, table, events)
+                parts = self.cluster.split(rows, seed=int(token[:8], 16) if token else 0)
+                for shard, indexes in parts.items():
+                    self.insert_rows(
+                        sql,
+                        schema,
+                        table,
+                        [rows[i] for i in indexes],
+                        [events[i] for i in indexes],
+                        shard=shard,
+                    )
+        except Exception as ex:
+            logging.critical('QUERY FAILED')
+            logging.critical('ex=%s', ex)
+            logging.critical('sql=%s rows=%d', sql, len(rows))
+            raise
+
+    def insert_rows(self, sql, schema, table, rows, events, offset=0, shard=None):
+        """
+        INSERT rows into ClickHouse.
+        Batch failed because of bad data is split in halves and each half is inserted separately,
+        so good rows get through and bad rows are isolated one by one and sent to dead letter.
+        Each half gets its own deduplication token of its offset and size. In case a half fails with another
+        error, the whole batch is raised and is written again later - it fails with the same bad data again
+        and is split the same way, thus halves already inserted get the same tokens and are deduplicated
+        :param sql: INSERT statement
+        :param schema: target db name
+        :param table: target table name
+        :param rows: list of dict
+        :param events: list of Event, one per row
+        :param offset: offset of the batch within the original batch
+        :param shard: shard index to insert rows into, None - insert via connection_settings
+        """
+        try:
+            self.execute_with_retries(sql, rows, CHWriter.deduplication_token(schema, table, events, offset), shard)
+        except Exception as ex:
+            if not self.is_bad_data(ex):
+                raise
+
+            if len(rows) == 1:
+                self.dead_letter(schema, table, rows[0], events[0], ex)
+                return
+
+            middle = len(rows) // 2
+            logging.warning('INSERT of %d rows into %s.%s failed, split batch. ex=%s', len(rows), schema, table, ex)
+            self.insert_rows(sql, schema, table, rows[:middle], events[:middle], offset, shard)
+            self.insert_rows(sql, schema, table, rows[middle:], events[middle:], offset + middle, shard)
+
+    def execute_with_retries(self, sql, rows, token=None, shard=None):
+        """
+        Execute INSERT, failed INSERT is retried with exponential backoff
+        :param sql: INSERT statement
+        :param rows: list of dict
+        :param token: insert deduplication token
+        :param shard: shard index to insert rows into, None - insert via connection_settings
+        """
+        settings = {}
+        if self.insert_deduplicate and token is not None:
+            settings['insert_deduplication_token'] = token
+        if self.null_as_default:
+            settings['input_format_null_as_default'] = True
+
+        attempt = 0
+        while True:
+            try:
+                started = Tracer.start_batch()
+                if shard is None:
+                    self.client.execute(sql, rows, settings=settings or None)
+                else:
+                    self.cluster.execute(shard, sql, rows, settings=settings or None)
+                Tracer.stop('chwriter.execute', started)
+                return
+            except Exception as ex:
+                if attempt >= self.insert_retries or not self.is_retryable(ex):
+                    raise
+
+                pause = min(self.insert_retry_backoff * (2 ** attempt), CHWriter.RETRY_BACKOFF_MAX)
+                attempt += 1
+                logging.warning('QUERY FAILED, retry %d of %d in %s sec. ex=%s',
+                                attempt, self.insert_retries, pause, ex)
+                time.sleep(pause)
+
+    def dead_letter(self, schema, table, row, event, ex):
+        """
+        Report row, which can not be inserted, along with its binlog position
+        :param schema: target db name
+        :param table: target table name
+        :param row: dict
+        :param event: Event row is converted from
+        :param ex: exception INSERT failed with
+        """
+        log_pos = event.pymysqlreplication_event.packet.log_pos if event.pymysqlreplication_event is not None else None
+        if not self.dead_letter_file:
+            logging.error('Skip row, which can not be inserted into %s.%s binlog pos %s:%s ex=%s row=%s',
+                          schema, table, event.log_file, log_pos, ex, row)
+            return
+
+        logging.error('Skip row, which can not be inserted into %s.%s binlog pos %s:%s ex=%s, see %s',
+                      schema, table, event.log_file, log_pos, ex, self.dead_letter_file)
+        with open(self.dead_letter_file, 'a') as f:
+            f.write(json.dumps({
+                'source': event.source,
+                'schema': schema,
+                'table': table,
+                'log_file': event.log_file,
+                'log_pos': log_pos,
+                'error': str(ex),
+                'row': row,
+            }, default=str))
+            f.write('\n')
 
     def insert(self, event_or_events=None):
         # event_or_events = [
@@ -64,7 +332,9 @@ class CHWriter(Writer):
 
         # verify and converts events and consolidate converted rows from all events into one batch
 
+        started = Tracer.start_batch()
         rows = []
+        row_events = []
         event_converted = None
         for event in events:
             if not event.verify:
@@ -72,6 +342,7 @@ class CHWriter(Writer):
                     'Event verification failed. Skip one event. Event: %s Class: %s', event.meta(), __class__)
                 continue  # for event
 
+            # Decimal, timedelta, etc values are converted by converter
             event_converted = self.convert(event)
             for row in event_converted:
                 # These columns are added to identify the last change (tb_upd) and the kind of operation performed
@@ -79,20 +350,17 @@ class CHWriter(Writer):
                 row['tb_upd'] = event.ts.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
                 row['operation'] = 0
 
-                for key in row.keys():
-                    # we need to convert Decimal or timedelta value to str value for suitable for table structure
-                    if type(row[key]) == [Decimal, datetime.timedelta]:
-                        row[key] = str(row[key])
-
                 rows.append(row)
+                row_events.append(event)
 
+        Tracer.stop('chwriter.convert', started)
         logging.debug('class:%s insert %d row(s)', __class__, len(rows))
 
         # determine target schema.table
 
         schema = self.dst_schema if self.dst_schema else event_converted.schema
         table = None
-        if self.dst_distribute:
+        if self.dst_distribute and self.cluster is None:
             table = TableProcessor.create_distributed_table_name(
                 db=event_converted.schema, table=event_converted.table)
         else:
@@ -101,26 +369,12 @@ class CHWriter(Writer):
                 table = TableProcessor.create_migrated_table_name(
                     prefix=self.dst_table_prefix, table=table)
 
-        logging.debug("schema={} table={} self.dst_schema={} self.dst_table={}".format(
-            schema, table, self.dst_schema, self.dst_table))
+        logging.debug("schema=%s table=%s self.dst_schema=%s self.dst_table=%s",
+                      schema, table, self.dst_schema, self.dst_table)
 
         # and INSERT converted rows
 
-        sql = ''
-        try:
-            sql = 'INSERT INTO `{0}`.`{1}` ({2}) VALUES'.format(
-                schema,
-                table,
-                ', '.join(map(lambda column: '`%s`' % column, rows[0].keys()))
-            )
-            logging.debug(f"CHWRITER QUERY INSERT: {sql}")
-            self.client.execute(sql, rows)
-        except Exception as ex:
-            logging.critical('QUERY FAILED')
-            logging.critical('ex={}'.format(ex))
-            logging.critical('sql={}'.format(sql))
-            logging.critical('data={}'.format(rows))
-            # sys.exit(0)
+        self.execute_insert(schema, table, rows, row_events, 'INSERT')
 
         # all DONE
 
@@ -147,7 +401,9 @@ class CHWriter(Writer):
 
         # verify and converts events and consolidate converted rows from all events into one batch
 
+        started = Tracer.start_batch()
         rows = []
+        row_events = []
         event_converted = None
         for event in events:
             if not event.verify:
@@ -155,6 +411,7 @@ class CHWriter(Writer):
                                 __class__)
                 continue  # for event
 
+            # Decimal, timedelta, etc values are converted by converter
             event_converted = self.convert(event)
             for row in event_converted:
                 # These columns are added to identify the last change (tb_upd) and the kind of operation performed
@@ -162,20 +419,17 @@ class CHWriter(Writer):
                 row['tb_upd'] = event.ts.strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
                 row['operation'] = 2
 
-                for key in row.keys():
-                    # we need to convert Decimal or timedelta value to str value for suitable for table structure
-                    if type(row[key]) in [Decimal, datetime.timedelta]:
-                        row[key] = str(row[key])
-
                 rows.append(row)
+                row_events.append(event)
 
+        Tracer.stop('chwriter.convert', started)
         logging.debug('class:%s delete %d row(s)', __class__, len(rows))
 
         # determine target schema.table
 
         schema = self.dst_schema if self.dst_schema else event_converted.schema
         table = None
-        if self.dst_distribute:
+        if self.dst_distribute and self.cluster is None:
             table = TableProcessor.create_distributed_table_name(
                 db=event_converted.schema, table=event_converted.table)
         else:
@@ -184,20 +438,12 @@ class CHWriter(Writer):
                 table = TableProcessor.create_migrated_table_name(
                     prefix=self.dst_table_prefix, table=table)
 
-        logging.debug("schema={} table={} self.dst_schema={} self.dst_table={}".format(schema, table, self.dst_schema,
-                                                                                       self.dst_table))
+        logging.debug("schema=%s table=%s self.dst_schema=%s self.dst_table=%s",
+                      schema, table, self.dst_schema, self.dst_table)
 
         # and DELETE converted rows
 
-        sql = ''
-        try:
-            sql = 'INSERT INTO `{0}`.`{1}` ({2}) VALUES'.format(
-                schema,
-                table,
-                ', '.join(map(lambda column: '`%s`' % column, rows[0].keys()))
-            )
-            logging.debug(f"CHWRITER QUERY DELETE: {sql}")
-            self.client.execute(sql, rows)
+        self.execute_insert(schema, table, rows, row_events, 'DELETE')
 
         # sql = ''
         # try:
@@ -211,12 +457,6 @@ class CHWriter(Writer):
         #
         #     self.client.execute(sql)
 
-        except Exception as ex:
-            logging.critical('QUERY FAILED')
-            logging.critical('ex={}'.format(ex))
-            logging.critical('sql={}'.format(sql))
-            # sys.exit(0)
-
         # all DONE
 
     """
@@ -262,7 +502,9 @@ class CHWriter(Writer):
 
         # verify and converts events and consolidate converted rows from all events into one batch
 
+        started = Tracer.start_batch()
         rows = []
+        row_events = []
         event_converted = None
         for event in events:
             if not event.verify:
@@ -270,27 +512,23 @@ class CHWriter(Writer):
                                 __class__)
                 continue  # for event
 
+            # Decimal, timedelta, etc values are converted by converter
             event_converted = self.convert(event)
             for row in event_converted.pymysqlreplication_event.rows:
-
-                for key in row['after_values'].keys():
-                    # we need to convert Decimal or timedelta value to str value for suitable for table structure
-                    if type(row['after_values'][key]) in [Decimal, datetime.timedelta]:
-                        row['after_values'][key] = str(
-                            row['after_values'][key])
-
                 # These columns are added to identify the last change (tb_upd) and when a row is deleted (1)
                 row['after_values']['tb_upd'] = datetime.datetime.now()
                 row['after_values']['operation'] = 1
                 rows.append(row['after_values'])
+                row_events.append(event)
 
+        Tracer.stop('chwriter.convert', started)
         logging.debug('class:%s update %d row(s)', __class__, len(rows))
 
         # determine target schema.table
 
         schema = self.dst_schema if self.dst_schema else event_converted.schema
         table = None
-        if self.dst_distribute:
+        if self.dst_distribute and self.cluster is None:
             table = TableProcessor.create_distributed_table_name(
                 db=event_converted.schema, table=event_converted.table)
         else:
@@ -299,8 +537,8 @@ class CHWriter(Writer):
                 table = TableProcessor.create_migrated_table_name(
                     prefix=self.dst_table_prefix, table=table)
 
-        logging.debug("schema={} table={} self.dst_schema={} self.dst_table={}".format(schema, table, self.dst_schema,
-                                                                                       self.dst_table))
+        logging.debug("schema=%s table=%s self.dst_schema=%s self.dst_table=%s",
+                      schema, table, self.dst_schema, self.dst_table)
 
         # and UPDATE converted rows
 
@@ -308,21 +546,7 @@ class CHWriter(Writer):
         rows[0]['tb_upd'] = datetime.datetime.now()
         rows[0]['operation'] = 1
 
-        sql = ''
-        try:
-            sql = 'INSERT INTO `{0}`.`{1}` ({2}) VALUES'.format(
-                schema,
-                table,
-                ', '.join(map(lambda column: '`%s`' % column, rows[0].keys()))
-            )
-            logging.debug(f"CHWRITER QUERY UPDATE: {sql}")
-            self.client.execute(sql, rows)
-        except Exception as ex:
-            logging.critical('QUERY FAILED')
-            logging.critical('ex={}'.format(ex))
-            logging.critical('sql={}'.format(sql))
-            logging.critical('data={}'.format(rows))
-            # sys.exit(0)
+        self.execute_insert(schema, table, rows, row_events, 'UPDATE')
 
         # all DONE
 
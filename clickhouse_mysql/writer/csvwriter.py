@@ -11,6 +11,7 @@ import json
 
 from clickhouse_mysql.writer.writer import Writer
 from clickhouse_mysql.event.event import Event
+from clickhouse_mysql.tracer import Tracer
 
 from datetime import datetime
 
@@ -18,10 +19,18 @@ from pymysqlreplication.row_event import WriteRowsEvent, UpdateRowsEvent, Delete
 
 
 class CSVWriter(Writer):
-    """Write CSV files"""
+    """
+    Write CSV files.
+    With max part size file is split into parts, each part is a complete CSV file with header:
+    /tmp/csvpool_1521813908.1152523_f42d7297.csv, /tmp/csvpool_1521813908.1152523_f42d7297_1.csv, ...
+    """
 
     file = None
     path = None
+    # paths of all parts written, the last one is the current part
+    paths = None
+    # bytes, start new part once current part reaches this size, None - one file
+    max_part_size = None
     writer = None
     dst_schema = None
     dst_table = None
@@ -42,6 +51,7 @@ class CSVWriter(Writer):
             dst_table_prefix=None,
             next_writer_builder=None,
             converter_builder=None,
+            csv_max_part_size=None,
     ):
         logging.info("CSVWriter() "
                      "csv_file_path={} "
@@ -61,7 +71,8 @@ class CSVWriter(Writer):
 
         self.path = csv_file_path
         self.path_prefix = csv_file_path_prefix
-        self.path_suffix_parts = csv_file_path_suffix_parts
+        # own copy - suffix parts are appended below and the same writer process may create many writers
+        self.path_suffix_parts = list(csv_file_path_suffix_parts)
         self.dst_schema = dst_schema
         self.dst_table = dst_table
         self.dst_table_prefix = dst_table_prefix
@@ -77,6 +88,9 @@ class CSVWriter(Writer):
             self.path = self.path_prefix + '_'.join(self.path_suffix_parts) + '.csv'
             self.delete = not csv_keep_file
 
+        self.paths = [self.path]
+        self.max_part_size = csv_max_part_size if csv_max_part_size else None
+
         logging.info("CSVWriter() self.path={}".format(self.path))
 
     def __del__(self):
@@ -94,6 +108,30 @@ class CSVWriter(Writer):
             # open file for write-at-the-end mode
             self.file = open(self.path, 'a+')
 
+    def part_path(self, part):
+        """
+        Path of the part of the file
+        :param part: part number, 0 - the first part
+        :return: str. Ex.: /tmp/csvpool_1521813908.1152523_f42d7297_1.csv
+        """
+        if part == 0:
+            return self.paths[0]
+        root, ext = os.path.splitext(self.paths[0])
+        return '{}_{}{}'.format(root, part, ext)
+
+    def rotate(self):
+        """Close current part and continue writing into the new one"""
+        self.close()
+        self.path = self.part_path(len(self.paths))
+        self.paths.append(self.path)
+        logging.debug('class:%s start part %s', __class__, self.path)
+
+        self.header_written = False
+        self.open()
+        self.writer = csv.DictWriter(self.file, fieldnames=self.fieldnames, quoting=csv.QUOTE_NONNUMERIC)
+        if not self.header_written:
+            self.writer.writeheader()
+
 
     def insert(self, event_or_events):
         # event_or_events = [
@@ -151,11 +189,16 @@ class CSVWriter(Writer):
             if not self.header_written:
                 self.writer.writeheader()
 
+        started = Tracer.start_batch()
         for event in events:
             if not event.verify:
                 logging.warning('Event verification failed. Skip one event. Event: %s Class: %s', event.meta(), __class__)
                 continue # for event
+            if self.max_part_size is not None and self.file.tell() >= self.max_part_size:
+                # checked before event is written - no empty part is left at the end
+                self.rotate()
             self.generate_row(event)
+        Tracer.stop('csvwriter.write', started)
 
     def convert_null_values(self, row):
         """ We need to mark those fields that are null to be able to distinguish between NULL and empty strings """
@@ -186,12 +229,16 @@ class CSVWriter(Writer):
         if not self.next_writer_builder or not self.fieldnames:
             return
 
-        event = Event()
-        event.schema = self.dst_schema
-        event.table = self.dst_table
-        event.filename = self.path
-        event.fieldnames = self.fieldnames
-        self.next_writer_builder.get().insert(event)
+        # one event per part
+        events = []
+        for path in self.paths:
+            event = Event()
+            event.schema = self.dst_schema
+            event.table = self.dst_table
+            event.filename = path
+            event.fieldnames = self.fieldnames
+            events.append(event)
+        self.next_writer_builder.get().insert(events)
 
     def close(self):
         if self.opened():
@@ -201,12 +248,17 @@ class CSVWriter(Writer):
             self.writer = None
 
     def destroy(self):
-        if self.delete and os.path.isfile(self.path):
+        if self.delete and any(os.path.isfile(path) for path in self.paths):
             self.close()
-            if self.next_writer_builder and self.next_writer_builder.get().not_uploaded:
-                logging.error(f"CSV { self.path } not uploaded into TB")
-                return
-            os.remove(self.path)
+            # parts uploaded are appended to data source already - they are removed, failed ones are kept
+            failed = set()
+            if self.next_writer_builder:
+                failed = getattr(self.next_writer_builder.get(), 'failed_files', None) or set()
+            if failed:
+                logging.error("CSV %s not uploaded into TB", ', '.join(path for path in self.paths if path in failed))
+            for path in self.paths:
+                if path not in failed and os.path.isfile(path):
+                    os.remove(path)
 
 if __name__ == '__main__':
     path = 'file.csv'
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import atexit
+import logging
+import queue
+import threading
+
+from clickhouse_mysql.observable import HandlerError
+from clickhouse_mysql.writer.writer import Writer
+
+
+class FanOutWriter(Writer):
+    """
+    Write the same events into several destinations.
+
+    Events are read and decoded once and handed over to each destination writer (typically PoolWriter
+    with its own writer chain) through destination's own bounded queue, consumed by destination's own thread.
+    Thus slow destination stalls the reader only when its queue is full, while the rest of destinations
+    keep on writing. Converters modify rows in place, so each destination gets its own copy of rows dicts -
+    values are shared.
+
+    Reader moves its binlog position forward as soon as events are queued, thus destination with write-ahead log
+    gets events appended to its log right away, in reader's thread, and only then queued - events queued and
+    not written yet are replayed from the log after crash.
+    Failed call is not retried and later calls are not made on failed destination - reader is stopped
+    by HandlerError on its next call instead, not acknowledged events are replayed from the log after restart.
+    """
+
+    # dict of destination name -> Writer
+    # {
+    #   'clickhouse': PoolWriter(...),
+    #   'csvpool': PoolWriter(...),
+    # }
+    writers = None
+
+    # dict of destination name -> queue of (method name, args) calls to be made on destination writer
+    queues = None
+    threads = None
+
+    # max number of calls queued per destination
+    buffer_size = 1000
+
+    # dict of destination name -> exception of failed call, None - destination is fine
+    errors = None
+
+    def __init__(self, writers, buffer_size=1000):
+        """
+        :param writers: dict of destination name -> Writer
+        :param buffer_size: max number of inserts queued per destination
+        """
+        logging.info("FanOutWriter() destinations: %s", ', '.join(writers))
+        super().__init__()
+        self.writers = writers
+        self.buffer_size = buffer_size
+        self.queues = {}
+        self.threads = {}
+        self.errors = {}
+
+        for name in self.writers:
+            self.queues[name] = queue.Queue(maxsize=self.buffer_size)
+            self.errors[name] = None
+            self.threads[name] = threading.Thread(target=self.consume, args=(name,), name='fanout-' + name, daemon=True)
+            self.threads[name].start()
+
+        # events queued but not written yet are handed over to destinations before the process exits
+        atexit.register(self.close)
+
+    def consume(self, name):
+        """
+        Destination thread body - make queued calls on destination writer
+        :param name: destination name
+        """
+        writer = self.writers[name]
+        calls = self.queues[name]
+        while True:
+            method, args = calls.get()
+            try:
+                if method is None:
+                    break
+                if self.errors[name] is None:
+                    getattr(writer, method)(*args)
+            except Exception as ex:
+                # later calls are not made, but queue is still consumed, otherwise reader would wait for room forever
+                self.errors[name] = ex
+                logging.critical('fan-out destination %s unable to %s, reader is to be stopped', name, method)
+                logging.exception(ex)
+            finally:
+                calls.task_done()
+
+    def check(self):
+        """
+        Stop the reader in case any of destinations failed
+        :raises HandlerError:
+        """
+        for name in self.writers:
+            if self.errors[name] is not None:
+                raise HandlerError("Fan-out destination {} failed: {}".format(name, self.errors[name]))
+
+    @staticmethod
+    def copy(event):
+        """
+        Copy of the event with its own rows dicts
+        :param event: Event
+        :return: Event
+        """
+        copied = event.copy()
+        if event.row is not None:
+            copied.row = dict(event.row)
+        if event.rows is not None:
+            copied.rows = [dict(row) for row in event.rows]
+
+        mysql_event = event.pymysqlreplication_event
+        if mysql_event is not None:
+            # rows are decoded here (once for all destinations) in case they are not decoded yet
+            copied_mysql_event = mysql_event.__class__.__new__(mysql_event.__class__)
+            copied_mysql_event.__dict__.update(mysql_event.__dict__)
+            # RowsEvent.rows returns these rows without decoding
+            copied_mysql_event.__dict__['_RowsEvent__rows'] = [
+                {values: dict(row[values]) for values in row} for row in mysql_event.rows
+            ]
+            copied.pymysqlreplication_event = copied_mysql_event
+
+        return copied
+
+    def dispatch(self, method, event_or_events):
+        """
+        Queue call on each destination writer
+        :param method: name of writer's method. Ex.: 'insert'
+        :param event_or_events: Event or list of Event
+        """
+        self.check()
+
+        names = list(self.writers)
+        events = self.listify(event_or_events)
+
+        # all copies are made before the first destination may start converting original rows
+        calls = {name: (method, ([FanOutWriter.copy(event) for event in events],)) for name in names[1:]}
+        calls[names[0]] = (method, (event_or_events,))
+
+        for name in names:
+            writer = self.writers[name]
+            if getattr(writer, 'wal', None) is not None:
+                # logged before reader saves its binlog position, queued call does not log events again
+                writer.log(calls[name][1][0])
+                calls[name] = ('pool_insert', calls[name][1])
+
+        for name in names:
+            self.queues[name].put(calls[name])
+
+    def insert(self, event_or_events=None):
+        self.dispatch('insert', event_or_events)
+
+    def update(self, event_or_events=None):
+        self.dispatch('update', event_or_events)
+
+    def delete_row(self, event_or_events=None):
+        self.dispatch('delete_row', event_or_events)
+
+    def flush(self):
+        self.check()
+        for name in self.writers:
+            self.queues[name].put(('flush', ()))
+
+    def flush_table(self, event):
+        """Write all rows of event's table into all destinations, returns when all of them are written"""
+        self.check()
+        for name in self.writers:
+            self.queues[name].put(('flush_table', (event,)))
+        for name in self.writers:
+            self.queues[name].join()
+        # table is not to be altered in case its rows are not written
+        self.check()
+
+    def flush_all(self):
+        """Write everything into all destinations, returns when all of them are written"""
+        self.check()
+        for name in self.writers:
+            self.queues[name].put(('flush_all', ()))
+        for name in self.writers:
+            self.queues[name].join()
+        self.check()
+
+    def close(self):
+        if self.threads is None:
+            return
+
+        for name in self.writers:
+            self.queues[name].put(('close', ()))
+            self.queues[name].put((None, None))
+        for name in self.writers:
+            self.threads[name].join()
+        self.threads = None
@@ -6,6 +6,7 @@ import logging
 from clickhouse_mysql.writer.writer import Writer
 from clickhouse_mysql.event.event import Event
 from clickhouse_mysql.pool.bbpool import BBPool
+from clickhouse_mysql.pool.wal import WAL
 
 
 class PoolWriter(Writer):
@@ -14,48 +15,91 @@ class PoolWriter(Writer):
     writer_builder = None
     max_pool_size = None
     pool = None
+    wal = None
 
     def __init__(
             self,
             writer_builder=None,
             max_pool_size=10000,
-            max_flush_interval=60
+            max_flush_interval=60,
+            spill_threshold=None,
+            spill_dir=None,
+            wal_dir=None,
+            wal_segment_size=10000,
+            wal_fsync=False,
+            batch_sizer=None,
     ):
         logging.info("PoolWriter()")
         self.writer_builder = writer_builder
         self.max_pool_size = max_pool_size
         self.max_flush_interval = max_flush_interval
 
+        if wal_dir:
+            self.wal = WAL(wal_dir, max_segment_size=wal_segment_size, fsync=wal_fsync)
+
         self.pool = BBPool(
             writer_builder=self.writer_builder,
             max_bucket_size=self.max_pool_size,
             max_interval_between_rotations=self.max_flush_interval,
+            spill_threshold=spill_threshold,
+            spill_dir=spill_dir,
+            wal=self.wal,
+            batch_sizer=batch_sizer,
         )
 
+        if self.wal is not None:
+            # events not flushed by previous run - back into the pool, they are in the log already
+            for event in self.wal.replay():
+                self.pool.insert(event)
+
+    def log(self, event_or_events):
+        """Append events to write-ahead log before they are placed into the pool"""
+        if self.wal is not None:
+            for event in self.listify(event_or_events):
+                self.wal.append(event)
+            self.wal.sync()
+
     def insert(self, event_or_events):
         """Insert data into Pool"""
         logging.debug('class:%s insert', __class__)
+        self.log(event_or_events)
+        self.pool.insert(event_or_events)
+
+    def pool_insert(self, event_or_events):
+        """Insert data already appended to write-ahead log with log() into Pool"""
+        logging.debug('class:%s pool_insert', __class__)
         self.pool.insert(event_or_events)
 
     # TODO delete if delete_row works
     def delete(self, event_or_events):
         """Insert delete data into Pool"""
         logging.debug('class:%s delete', __class__)
+        self.log(event_or_events)
         self.pool.insert(event_or_events)
 
     def delete_row(self, event_or_events):
         """Insert delete data into Pool"""
         logging.debug('class:%s delete', __class__)
+        self.log(event_or_events)
         self.pool.insert(event_or_events)
 
     def update(self, event_or_events):
         """Insert update data into Pool"""
         logging.debug('class:%s update', __class__)
+        self.log(event_or_events)
         self.pool.insert(event_or_events)
 
     def flush(self):
         self.pool.flush()
 
+    def flush_table(self, event):
+        """Write all pooled rows of event's table right now"""
+        self.pool.flush(key=self.pool.key_generator.generate(event), force=True)
+
+    def flush_all(self):
+        """Write all pooled rows right now, flush() writes expired belts only"""
+        self.pool.flush(force=True)
+
 
 if __name__ == '__main__':
     path = 'file.csv'
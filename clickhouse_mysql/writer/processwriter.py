@@ -3,16 +3,29 @@
 
 import multiprocessing as mp
 import logging
+import pickle
 
 from clickhouse_mysql.writer.writer import Writer
+from clickhouse_mysql.pool.segment import Segment
+from clickhouse_mysql.tracer import Tracer
 
 class ProcessWriter(Writer):
-    """Start write procedure as a separated process"""
+    """
+    Start write procedure as a separated process.
+    With ring buffer, events are handed over to long-living writer processes through shared memory
+    instead of starting new process for each insert
+    """
     args = None
 
+    # RingBuffer shared by all ProcessWriter instances, None - start new process for each insert
+    ring_buffer = None
+    ring_buffer_consumers_num = 1
+
     def __init__(self, **kwargs):
         next_writer_builder = kwargs.pop('next_writer_builder', None)
         converter_builder = kwargs.pop('converter_builder', None)
+        self.ring_buffer = kwargs.pop('ring_buffer', None)
+        self.ring_buffer_consumers_num = kwargs.pop('ring_buffer_consumers_num', 1)
         super().__init__(next_writer_builder=next_writer_builder, converter_builder=converter_builder)
         for arg in kwargs:
             self.next_writer_builder.param(arg, kwargs[arg])
@@ -27,13 +40,77 @@ class ProcessWriter(Writer):
         """Separate process body to be run"""
 
         logging.debug('class:%s process()', __class__)
+
+        # timings collected in this process are reported by this process
+        if Tracer.enabled:
+            Tracer.reset()
+
         writer = self.next_writer_builder.get()
         writer.insert(event_or_events)
         writer.close()
         writer.push()
         writer.destroy()
+
+        if Tracer.enabled:
+            Tracer.report()
         logging.debug('class:%s process() done', __class__)
 
+    def consume(self):
+        """Separate long-living process body - write batches of events taken from ring buffer"""
+
+        logging.debug('class:%s consume()', __class__)
+
+        # timings collected in this process are reported by this process
+        if Tracer.enabled:
+            Tracer.reset()
+
+        while True:
+            data = self.ring_buffer.get()
+            if data is None:
+                break
+
+            try:
+                # new writer for each batch, the same as process() does in its own process
+                writer = self.next_writer_builder.new()
+                writer.insert(pickle.loads(data))
+                writer.close()
+                writer.push()
+                writer.destroy()
+            except Exception as ex:
+                # keep on consuming, otherwise producer would wait for room in buffer forever
+                logging.critical('class:%s unable to write batch', __class__)
+                logging.exception(ex)
+
+        if Tracer.enabled:
+            Tracer.report()
+        logging.debug('class:%s consume() done', __class__)
+
+    def hand_over(self, event_or_events):
+        """
+        Place events into ring buffer
+        :return: bool whether events are handed over
+        """
+
+        # events are serialized once, as compact copies without pymysqlreplication internals
+        started = Tracer.start_batch()
+        data = pickle.dumps(
+            [Segment.detach(event) for event in self.listify(event_or_events)],
+            protocol=pickle.HIGHEST_PROTOCOL
+        )
+        Tracer.stop('processwriter.serialize', started)
+
+        if not self.ring_buffer.fits(data):
+            logging.warning('Batch of %d bytes does not fit into ring buffer, write it in separate process', len(data))
+            return False
+
+        self.ring_buffer.start_consumers(self.consume, self.ring_buffer_consumers_num)
+
+        # waits for room in case writers are slow
+        started = Tracer.start_batch()
+        self.ring_buffer.put(data)
+        Tracer.stop('processwriter.put', started)
+        return True
+
     def insert(self, event_or_events=None):
         # event_or_events = [
         #   event: {
@@ -44,9 +121,13 @@ class ProcessWriter(Writer):
         #   },
         # ]
 
+        logging.debug('class:%s insert', __class__)
+
+        if self.ring_buffer is not None and self.hand_over(event_or_events):
+            return
+
         # start separated process with event_or_events to be inserted
 
-        logging.debug('class:%s insert', __class__)
         process = mp.Process(target=self.process, args=(event_or_events,))
 
         logging.debug('class:%s insert.process.start()', __class__)
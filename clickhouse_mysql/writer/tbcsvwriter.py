@@ -5,7 +5,10 @@ import logging
 import time
 import subprocess
 
+from concurrent.futures import ThreadPoolExecutor
+
 from clickhouse_mysql.writer.writer import Writer
+from clickhouse_mysql.tracer import Tracer
 
 import requests
 from requests_toolbelt.multipart.encoder import MultipartEncoder
@@ -24,6 +27,12 @@ class TBCSVWriter(Writer):
 
     not_uploaded = None
 
+    # files not uploaded by the last insert(), the rest of its files are appended to data sources already
+    failed_files = None
+
+    # number of files uploaded concurrently
+    upload_workers = 1
+
     def __init__(
             self,
             tb_host,
@@ -33,6 +42,7 @@ class TBCSVWriter(Writer):
             dst_table_prefix=None,
             dst_distribute=False,
             not_uploaded=False,
+            upload_workers=1,
     ):
         # if dst_distribute and dst_schema is not None:
         #     dst_schema += "_all"
@@ -54,11 +64,14 @@ class TBCSVWriter(Writer):
         self.dst_table_prefix = dst_table_prefix
         self.dst_distribute = dst_distribute
         self.not_uploaded = not_uploaded
+        self.failed_files = set()
+        self.upload_workers = max(1, upload_workers)
 
 
     def uploadCSV(self, table, filename, tries=1):
+        # sets not_uploaded and adds to failed_files in case upload failed, both are reset by insert() -
+        # files may be uploaded concurrently
         limit_of_retries = 9
-        self.not_uploaded = False
         params = {
             'name': table,
             'mode': 'append',
@@ -98,6 +111,7 @@ class TBCSVWriter(Writer):
                     if tries > limit_of_retries:
                         logging.debug(f'Limit of retries reached for {filename}')
                         self.not_uploaded = True
+                        self.failed_files.add(filename)
                         return
 
                     retry_after = 2 ** tries
@@ -109,6 +123,7 @@ class TBCSVWriter(Writer):
                     logging.error(response.content)
                     logging.error(f"Not retrying {filename} when status {response.status_code}")
                     self.not_uploaded = True
+                    self.failed_files.add(filename)
                     return
 
         except Exception as e:
@@ -117,6 +132,7 @@ class TBCSVWriter(Writer):
             if tries > limit_of_retries:
                 logging.debug(f'Limit of retries reached for {filename}')
                 self.not_uploaded = True
+                self.failed_files.add(filename)
                 return
 
             retry_after = 2 ** tries
@@ -144,12 +160,26 @@ class TBCSVWriter(Writer):
 
         logging.debug('class:%s insert %d rows', __class__, len(events))
 
-        for event in events:
-            # schema = self.dst_schema if self.dst_schema else event.schema
-            table = self.dst_table if self.dst_table else event.table
-            self.uploadCSV(table, event.filename)
+        self.not_uploaded = False
+        self.failed_files = set()
+
+        if self.upload_workers > 1 and len(events) > 1:
+            # parts of a file are appended to data source in any order
+            started = Tracer.start_batch()
+            with ThreadPoolExecutor(max_workers=min(self.upload_workers, len(events))) as executor:
+                list(executor.map(self.upload_event, events))
+            Tracer.stop('tbcsvwriter.upload', started)
+            return
 
-        pass
+        for event in events:
+            started = Tracer.start_batch()
+            self.upload_event(event)
+            Tracer.stop('tbcsvwriter.upload', started)
+
+    def upload_event(self, event):
+        # schema = self.dst_schema if self.dst_schema else event.schema
+        table = self.dst_table if self.dst_table else event.table
+        self.uploadCSV(table, event.filename)
 
     def deleteRow(self, event_or_events=None):
         # event_or_events = [
@@ -86,6 +86,14 @@ class Writer(object):
     def flush(self):
         pass
 
+    def flush_table(self, event):
+        # write everything of event's table, writers which do not keep rows per table just flush
+        self.flush()
+
+    def flush_all(self):
+        # write everything kept, writers which do not keep rows just flush
+        self.flush()
+
     def push(self):
         pass
 
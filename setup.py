@@ -78,11 +78,20 @@ setup(
         'mysql-replication==1.0.6',
         'clickhouse-driver',
         'configobj',
-        'setuptools',
         'requests_toolbelt',
         'requests'
     ],
 
+    # optional dependencies
+    extras_require={
+        # native protocol compression of data sent to ClickHouse
+        'compression': [
+            'clickhouse-cityhash',
+            'lz4',
+            'zstd',
+        ],
+    },
+
     # cross-platform support for pip to create the appropriate form of executable
     entry_points={
         'console_scripts': [